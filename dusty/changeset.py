@@ -1,5 +1,5 @@
-from .compiler.spec_assembler import get_repo_of_app_or_library, get_expanded_libs_specs
-from .config import get_config_value, save_config_value
+from .compiler.spec_assembler import get_same_container_repos
+from .config import get_config_value, save_config_value, config_lock
 from . import constants
 
 class RepoChangeSet(object):
@@ -17,14 +17,7 @@ class RepoChangeSet(object):
     def __init__(self, set_key, app_or_library_name):
         self.set_key = set_key
         self.app_or_library_name = app_or_library_name
-        self.repos = {get_repo_of_app_or_library(self.app_or_library_name)}
-        for lib_name in self.primary_spec['depends']['libs']:
-            self.repos.add(get_repo_of_app_or_library(lib_name))
-
-    @property
-    def primary_spec(self):
-        expanded_specs = get_expanded_libs_specs()
-        return expanded_specs.get_app_or_lib(self.app_or_library_name)
+        self.repos = get_same_container_repos(self.app_or_library_name)
 
     def _get_current_sha_dict(self):
         return {repo.remote_path: repo.local_commit_sha
@@ -35,8 +28,10 @@ class RepoChangeSet(object):
         return self._get_current_sha_dict() != stored.get(self.set_key, {}).get(self.app_or_library_name, {})
 
     def update(self):
-        stored = get_config_value(constants.CONFIG_CHANGESET_KEY) or {}
-        if self.set_key not in stored:
-            stored[self.set_key] = {}
-        stored[self.set_key][self.app_or_library_name] = self._get_current_sha_dict()
-        save_config_value(constants.CONFIG_CHANGESET_KEY, stored)
+        current_sha_dict = self._get_current_sha_dict()
+        with config_lock:
+            stored = get_config_value(constants.CONFIG_CHANGESET_KEY) or {}
+            if self.set_key not in stored:
+                stored[self.set_key] = {}
+            stored[self.set_key][self.app_or_library_name] = current_sha_dict
+            save_config_value(constants.CONFIG_CHANGESET_KEY, stored)
@@ -32,6 +32,7 @@ Options:
 For help on a specific command, provide the '-h' flag to the command, e.g. 'dusty repos -h'
 """
 
+import importlib
 import logging
 import os
 import sys
@@ -40,60 +41,61 @@ import threading
 
 from docopt import docopt
 
-from ..daemon import main as run_daemon
 from ..config import get_config_value
 from ..log import configure_client_logging, log_to_client
 from ..payload import Payload
-from . import (assets, bundles, config, cp, dump, disk, env, logs, repos, restart, scripts, shell, stop,
-               up, upgrade, validate, version, setup, test, status)
+from ..protocol import send_frame, recv_frame, FRAME_ACK, FRAME_REQUEST, FRAME_EXIT
 from .. import constants
 
+# Subcommand modules are only imported once we know which one was asked for
 MODULE_MAP = {
-    'assets': assets,
-    'bundles': bundles,
-    'config': config,
-    'cp': cp,
-    'disk': disk,
-    'dump': dump,
-    'env': env,
-    'logs': logs,
-    'repos': repos,
-    'restart': restart,
-    'scripts': scripts,
-    'setup': setup,
-    'shell': shell,
-    'status': status,
-    'stop': stop,
-    'test': test,
-    'up': up,
-    'upgrade': upgrade,
-    'validate': validate,
-    'version': version,
+    'assets': 'dusty.cli.assets',
+    'bundles': 'dusty.cli.bundles',
+    'config': 'dusty.cli.config',
+    'cp': 'dusty.cli.cp',
+    'disk': 'dusty.cli.disk',
+    'dump': 'dusty.cli.dump',
+    'env': 'dusty.cli.env',
+    'logs': 'dusty.cli.logs',
+    'repos': 'dusty.cli.repos',
+    'restart': 'dusty.cli.restart',
+    'scripts': 'dusty.cli.scripts',
+    'setup': 'dusty.cli.setup',
+    'shell': 'dusty.cli.shell',
+    'status': 'dusty.cli.status',
+    'stop': 'dusty.cli.stop',
+    'test': 'dusty.cli.test',
+    'up': 'dusty.cli.up',
+    'upgrade': 'dusty.cli.upgrade',
+    'validate': 'dusty.cli.validate',
+    'version': 'dusty.cli.version',
 }
 
+def load_command_module(command):
+    return importlib.import_module(MODULE_MAP[command])
+
 def _run_command(sock, command):
-    error_response = False
+    """Send a request frame for `command` and stream the daemon's response
+    frames to stdout until it sends an exit frame. Returns True if the
+    command failed on the daemon."""
     timer = threading.Timer(2, _notify_on_hang)
     timer.start()
-    sock.sendall(command)
-    while True:
-        data = sock.recv(65535)
+    try:
+        send_frame(sock, FRAME_REQUEST, command)
+        while True:
+            frame_type, body = recv_frame(sock)
+            timer.cancel()
+            if frame_type is None:
+                return True
+            elif frame_type == FRAME_EXIT:
+                return int(body) != 0
+            elif frame_type != FRAME_ACK:
+                sys.stdout.write(body)
+    finally:
         timer.cancel()
-        if data:
-            stripped = data.decode('utf-8').replace(constants.SOCKET_ACK, '').replace(constants.SOCKET_TERMINATOR, '').replace(constants.SOCKET_ERROR_TERMINATOR, '')
-            sys.stdout.write(stripped)
-            if data.endswith(constants.SOCKET_TERMINATOR):
-                break
-            elif data.endswith(constants.SOCKET_ERROR_TERMINATOR):
-                error_response = True
-                break
-        else:
-            break
-
-    return error_response
 
 def _notify_on_hang():
-    print 'The Dusty daemon will run your command once it\'s finished running previous commands'
+    print 'Waiting for the Dusty daemon to accept your command...'
 
 def _connect_to_daemon():
     if not os.path.exists(constants.SOCKET_PATH):
@@ -128,6 +130,7 @@ def main():
     # Dispatch to daemon's docopt immediately so
     # we can process daemon-specific options
     if '-d' in sys.argv:
+        from ..daemon import main as run_daemon
         return run_daemon()
 
     args = docopt(__doc__, options_first=True)
@@ -148,7 +151,7 @@ def main():
       if not get_config_value(constants.CONFIG_SETUP_KEY):
           log_to_client('You must run `dusty setup` before you run any other commands')
           sys.exit(1)
-    result = MODULE_MAP[command].main(command_args)
+    result = load_command_module(command).main(command_args)
     if isinstance(result, Payload):
         errored = _run_payload(result)
         sys.exit(1 if errored else 0)
@@ -22,14 +22,13 @@ Commands:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.bundles import list_bundles, activate_bundle, deactivate_bundle
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
     if args['list']:
-        return Payload(list_bundles)
+        return Payload(LazyCommand('dusty.commands.bundles.list_bundles'))
     elif args['activate']:
-        return Payload(activate_bundle, args['<bundle_names>'])
+        return Payload(LazyCommand('dusty.commands.bundles.activate_bundle'), args['<bundle_names>'])
     elif args['deactivate']:
-        return Payload(deactivate_bundle, args['<bundle_names>'])
+        return Payload(LazyCommand('dusty.commands.bundles.deactivate_bundle'), args['<bundle_names>'])
@@ -16,14 +16,13 @@ Commands:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.manage_config import list_config, list_config_values, save_value
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
     if args['list']:
-        return Payload(list_config)
+        return Payload(LazyCommand('dusty.commands.manage_config.list_config'))
     elif args['listvalues']:
-        return Payload(list_config_values)
+        return Payload(LazyCommand('dusty.commands.manage_config.list_config_values'))
     elif args['set']:
-        return Payload(save_value, args['<key>'], args['<value>'])
+        return Payload(LazyCommand('dusty.commands.manage_config.save_value'), args['<key>'], args['<value>'])
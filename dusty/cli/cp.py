@@ -5,8 +5,16 @@ To specify a file or directory location, either give just a path to
 indicate a location on your local filesystem, or prefix a path with
 `<service>:` to indicate a location inside a running container.
 
+Copies between containers are streamed from one to the other
+inside the VM. Copies from your local filesystem are streamed into
+the container as a tar archive, with progress reported as they go.
+
 Usage:
-  cp <source> <destination>
+  cp [--compress] <source> <destination>
+
+Options:
+  --compress  Gzip files copied from your local filesystem on their way
+              to the container. Worth it for large, compressible files.
 
 Examples:
   To copy a file from your local filesystem to the container of an app called `website`:
@@ -23,8 +31,7 @@ import os
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.cp import copy_between_containers, copy_from_local, copy_to_local
+from ..payload import Payload, LazyCommand
 
 def _split_path(path):
     split = path.split(':')
@@ -49,10 +56,11 @@ def main(argv):
     _validate_path_pair(dest_name, dest_path)
     source_path, dest_path = _resolve_path(source_path), _resolve_path(dest_path)
     if source_name and dest_name:
-        return Payload(copy_between_containers, source_name, source_path, dest_name, dest_path)
+        return Payload(LazyCommand('dusty.commands.cp.copy_between_containers'), source_name, source_path, dest_name, dest_path)
     elif dest_name:
-        return Payload(copy_from_local, source_path, dest_name, dest_path)
+        return Payload(LazyCommand('dusty.commands.cp.copy_from_local'), source_path, dest_name, dest_path,
+                       compress=args['--compress'])
     elif source_name:
-        return Payload(copy_to_local, dest_path, source_name, source_path)
+        return Payload(LazyCommand('dusty.commands.cp.copy_to_local'), dest_path, source_name, source_path)
     else:
         raise ValueError('Refusing to copy files between your local filesystem.')
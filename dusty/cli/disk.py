@@ -6,6 +6,7 @@ Usage:
   disk cleanup_images
   disk backup <destination>
   disk restore <source>
+  disk bench [<repo_name>...]
 
 Commands:
   inspect             Prints VM disk usage information
@@ -13,31 +14,34 @@ Commands:
   cleanup_images      Removes docker images that can be removed without the --force flag
   backup              Backs up the /persist directory on your Docker VM to your local file system
   restore             Restores a backed up /persist directory
+  bench               Measures file performance inside a container against the VM's
+                      copy of each given repo, or of each active repo. Use this to
+                      compare NFS mount profiles (see `dusty repos nfs-profile`)
 """
 
 from docopt import docopt
 import os
 
-from ..payload import Payload
+from ..payload import Payload, LazyCommand
 from ..log import log_to_client
-from ..commands.disk import (inspect_vm_disk, cleanup_inactive_containers, cleanup_images,
-                             backup, restore)
 
 def main(argv):
     args = docopt(__doc__, argv)
     if args['inspect']:
-        return Payload(inspect_vm_disk)
+        return Payload(LazyCommand('dusty.commands.disk.inspect_vm_disk'))
     elif args['cleanup_containers']:
-        return Payload(cleanup_inactive_containers)
+        return Payload(LazyCommand('dusty.commands.disk.cleanup_inactive_containers'))
     elif args['cleanup_images']:
-        return Payload(cleanup_images)
+        return Payload(LazyCommand('dusty.commands.disk.cleanup_images'))
     elif args['backup']:
         path = os.path.abspath(args['<destination>'])
-        return Payload(backup, path)
+        return Payload(LazyCommand('dusty.commands.disk.backup'), path)
+    elif args['bench']:
+        return Payload(LazyCommand('dusty.commands.disk.bench_repo_mounts'), args['<repo_name>'])
     elif args['restore']:
         path = os.path.abspath(args['<source>'])
         print "Warning: this will overwrite the /persist directory on your VM with the contents of {}".format(path)
         if raw_input("Continue? (y/n) ").strip().upper() == 'Y':
-            return Payload(restore, path)
+            return Payload(LazyCommand('dusty.commands.disk.restore'), path)
         else:
             log_to_client("Restore cancelled")
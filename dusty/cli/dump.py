@@ -9,9 +9,8 @@ Commands:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.dump import dump_diagnostics
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
-    return Payload(dump_diagnostics)
+    return Payload(LazyCommand('dusty.commands.dump.dump_diagnostics'))
@@ -18,23 +18,22 @@ import os
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands import env
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
     if args['list']:
         if args['<app_or_service>']:
-            return Payload(env.list_app_or_service, args['<app_or_service>'])
+            return Payload(LazyCommand('dusty.commands.env.list_app_or_service'), args['<app_or_service>'])
         else:
-            return Payload(env.list_all)
+            return Payload(LazyCommand('dusty.commands.env.list_all'))
     elif args['set']:
         if args['--file']:
-            return Payload(env.set_from_file, args['<app_or_service>'], os.path.abspath(args['<local_file>']))
+            return Payload(LazyCommand('dusty.commands.env.set_from_file'), args['<app_or_service>'], os.path.abspath(args['<local_file>']))
         else:
-            return Payload(env.set_var, args['<app_or_service>'], args['<var_name>'], args['<value>'])
+            return Payload(LazyCommand('dusty.commands.env.set_var'), args['<app_or_service>'], args['<var_name>'], args['<value>'])
     elif args['unset']:
         if args['--all']:
-            return Payload(env.unset_all, args['<app_or_service>'])
+            return Payload(LazyCommand('dusty.commands.env.unset_all'), args['<app_or_service>'])
         else:
-            return Payload(env.unset_var, args['<app_or_service>'], args['<var_name>'])
+            return Payload(LazyCommand('dusty.commands.env.unset_var'), args['<app_or_service>'], args['<var_name>'])
@@ -12,11 +12,10 @@ Options:
 """
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.logs import tail_container_logs
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
-    payload = Payload(tail_container_logs, args['<service>'], args['-f'], args['--tail'], args['-t'])
+    payload = Payload(LazyCommand('dusty.commands.logs.tail_container_logs'), args['<service>'], args['-f'], args['--tail'], args['-t'])
     payload.run_on_daemon = False
     return payload
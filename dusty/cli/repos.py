@@ -8,18 +8,41 @@ Alternatively, you can override a repo to manage it yourself. This
 is useful for actively developing apps and libs that depend on that
 repo. To override a repo, use the `override` or `from` commands.
 
+Repos are mounted into the VM over NFS by default. File-heavy repos
+can instead be copied onto the VM's disk and kept in sync with rsync
+as they change, which makes file access from containers much faster.
+Use `sync-method` to choose how a repo is synced. Files deleted locally
+are deleted from a synced repo's copy too, except for files ignored by
+the repo's .gitignore files: these are never synced, and files which
+containers write to ignored paths (installed dependencies, build output)
+are left alone.
+
+Repos mounted over NFS use the mount options of an NFS profile,
+chosen with `nfs-profile` or the `nfs_profile` key of an app or lib
+spec. `dusty disk bench` measures how fast each mount is.
+  default      async,udp,noatime
+  tcp          async,tcp,noatime,rsize=65536,wsize=65536
+  cached       Like tcp, caching file attributes for 30 seconds
+  read-mostly  Like tcp, caching file attributes for 60 seconds and
+               skipping revalidation on open (nocto). Best for repos
+               which aren't edited while their containers run.
+
 Usage:
   repos from <source_path>
   repos list
   repos manage (--all | <repo_name>)
+  repos nfs-profile <repo_name> <profile>
   repos override <repo_name> <source_path>
+  repos sync-method <repo_name> (nfs | rsync)
   repos update
 
 Commands:
   from        Override all repos from a given directory
   list        Show state of all repos referenced in specs
   manage      Tell Dusty to manage a repo or all repos, removing any overrides
+  nfs-profile Choose the NFS mount options a repo is mounted with
   override    Override a repo with a local copy that you manage
+  sync-method Choose whether a repo is mounted over NFS or synced with rsync
   update      Pull latest master on Dusty-managed repos
 
 Options:
@@ -28,22 +51,26 @@ Options:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.repos import (list_repos, override_repo, manage_repo, manage_all_repos,
-                              override_repos_from_directory, update_managed_repos)
+from .. import constants
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
     if args['list']:
-        return Payload(list_repos)
+        return Payload(LazyCommand('dusty.commands.repos.list_repos'))
     elif args['override']:
-        return Payload(override_repo, args['<repo_name>'], args['<source_path>'])
+        return Payload(LazyCommand('dusty.commands.repos.override_repo'), args['<repo_name>'], args['<source_path>'])
     elif args['manage']:
         if args['--all']:
-            return Payload(manage_all_repos)
+            return Payload(LazyCommand('dusty.commands.repos.manage_all_repos'))
         else:
-            return Payload(manage_repo, args['<repo_name>'])
+            return Payload(LazyCommand('dusty.commands.repos.manage_repo'), args['<repo_name>'])
     elif args['from']:
-        return Payload(override_repos_from_directory, args['<source_path>'])
+        return Payload(LazyCommand('dusty.commands.repos.override_repos_from_directory'), args['<source_path>'])
+    elif args['nfs-profile']:
+        return Payload(LazyCommand('dusty.commands.repos.set_repo_nfs_profile'), args['<repo_name>'], args['<profile>'])
+    elif args['sync-method']:
+        sync_method = constants.SYNC_METHOD_RSYNC if args['rsync'] else constants.SYNC_METHOD_NFS
+        return Payload(LazyCommand('dusty.commands.repos.set_repo_sync_method'), args['<repo_name>'], sync_method)
     elif args['update']:
-        return Payload(update_managed_repos)
+        return Payload(LazyCommand('dusty.commands.repos.update_managed_repos'))
@@ -18,11 +18,10 @@ Options:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.run import restart_apps_or_services, restart_apps_by_repo
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
     if args['--repos']:
-        return Payload(restart_apps_by_repo, args['--repos'])
-    return Payload(restart_apps_or_services, args['<services>'])
+        return Payload(LazyCommand('dusty.commands.run.restart_apps_by_repo'), args['--repos'])
+    return Payload(LazyCommand('dusty.commands.run.restart_apps_or_services'), args['<services>'])
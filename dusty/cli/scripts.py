@@ -16,14 +16,13 @@ Examples:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.scripts import script_info_for_app, execute_script
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv, options_first=True)
     if not args['<script_name>']:
-        return Payload(script_info_for_app, args['<app_name>'])
+        return Payload(LazyCommand('dusty.commands.scripts.script_info_for_app'), args['<app_name>'])
     else:
-        payload = Payload(execute_script, args['<app_name>'], args['<script_name>'], script_arguments=args['<args>'])
+        payload = Payload(LazyCommand('dusty.commands.scripts.execute_script'), args['<app_name>'], args['<script_name>'], script_arguments=args['<args>'])
         payload.run_on_daemon = False
         return payload
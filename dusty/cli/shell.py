@@ -11,11 +11,10 @@ Example:
 
 from docopt import docopt
 
-from ..commands.shell import execute_shell
-from ..payload import Payload
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
-    payload = Payload(execute_shell, args['<service>'])
+    payload = Payload(LazyCommand('dusty.commands.shell.execute_shell'), args['<service>'])
     payload.run_on_daemon = False
     return payload
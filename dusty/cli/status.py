@@ -8,9 +8,8 @@ Usage:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.status import get_dusty_status
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     docopt(__doc__, argv)
-    return Payload(get_dusty_status)
+    return Payload(LazyCommand('dusty.commands.status.get_dusty_status'))
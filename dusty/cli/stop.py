@@ -11,9 +11,8 @@ Options:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.run import stop_apps_or_services
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
-    return Payload(stop_apps_or_services, args['<services>'], rm_containers=args['--rm'])
+    return Payload(LazyCommand('dusty.commands.run.stop_apps_or_services'), args['<services>'], rm_containers=args['--rm'])
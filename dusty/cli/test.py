@@ -10,39 +10,47 @@ Options:
   <args>        A list of arguments to be passed to the test script
   --recreate    Ensures that the testing image will be recreated
   --no-pull     Do not pull dusty managed repos from remotes.
+  --workers=<count>  How many suites to run at once when running `all`
+                     [default: 4]
 
 Examples:
   To call test suite frontend with default arguments:
     dusty test web frontend
   To call test suite frontend with arguments in place of the defaults:
     dusty test web frontend /web/javascript
+  To run every test suite of web, two at a time:
+    dusty test --workers=2 web all
 
 """
 
-from docopt import docopt
+from docopt import docopt, DocoptExit
 
-from ..payload import Payload
-from ..commands.test import (run_one_suite, run_all_suites, test_info_for_app_or_lib, setup_for_test,
-                             ensure_valid_suite_name)
+from ..payload import Payload, LazyCommand
+
+def _workers(value):
+    if not value.isdigit() or int(value) < 1:
+        raise DocoptExit('--workers must be a whole number of at least 1')
+    return int(value)
 
 def main(argv):
     args = docopt(__doc__, argv, options_first=True)
     if args['<suite_name>'] == 'all':
-        payload0 = Payload(setup_for_test,
+        payload0 = Payload(LazyCommand('dusty.commands.test.setup_for_test'),
                            args['<app_or_lib_name>'],
                            pull_repos=not args['--no-pull'],
                            force_recreate=args['--recreate'])
-        payload1 = Payload(run_all_suites,
-                           args['<app_or_lib_name>'])
+        payload1 = Payload(LazyCommand('dusty.commands.test.run_all_suites'),
+                           args['<app_or_lib_name>'],
+                           workers=_workers(args['--workers']))
         payload1.run_on_daemon = False
         return [payload0, payload1]
     elif args['<suite_name>']:
-        payload0 = Payload(ensure_valid_suite_name, args['<app_or_lib_name>'], args['<suite_name>'])
-        payload1 = Payload(setup_for_test,
+        payload0 = Payload(LazyCommand('dusty.commands.test.ensure_valid_suite_name'), args['<app_or_lib_name>'], args['<suite_name>'])
+        payload1 = Payload(LazyCommand('dusty.commands.test.setup_for_test'),
                            args['<app_or_lib_name>'],
                            pull_repos=not args['--no-pull'],
                            force_recreate=args['--recreate'])
-        payload2 = Payload(run_one_suite,
+        payload2 = Payload(LazyCommand('dusty.commands.test.run_one_suite'),
                            args['<app_or_lib_name>'],
                            args['<suite_name>'],
                            args['<args>'])
@@ -50,4 +58,4 @@ def main(argv):
         return [payload0, payload1, payload2]
 
     else:
-        return Payload(test_info_for_app_or_lib, args['<app_or_lib_name>'])
+        return Payload(LazyCommand('dusty.commands.test.test_info_for_app_or_lib'), args['<app_or_lib_name>'])
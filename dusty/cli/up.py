@@ -6,22 +6,29 @@ nginx, initializes your Docker VM and prepares it for
 use by Dusty, and starts any containers specified by your
 currently activated bundles.
 
+Containers whose config, image or command files have not changed
+since the last `dusty up` are left running. Up prints a plan of
+the containers it will create, recreate and remove before
+starting them.
+
 Usage:
-  up [--no-recreate] [--no-pull]
+  up [--no-recreate] [--no-pull] [--profile]
 
 Options:
-  --no-recreate   If a container already exists, do not recreate
-                  it from scratch. This is faster, but containers
-                  may get out of sync over time.
+  --no-recreate   If a changed container already exists, restart it
+                  instead of recreating it from scratch. This is
+                  faster, but containers may get out of sync over time.
   --no-pull       Do not pull dusty managed repos from remotes.
+  --profile       Report how long each step of up, and each command
+                  run during it, took. Profiles are kept, and recent
+                  ones are shown by `dusty dump`.
 """
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.run import start_local_env
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
-    return Payload(start_local_env, recreate_containers=not args['--no-recreate'],
-                   pull_repos=not args['--no-pull'])
+    return Payload(LazyCommand('dusty.commands.run.start_local_env'), recreate_containers=not args['--no-recreate'],
+                   pull_repos=not args['--no-pull'], profile=args['--profile'])
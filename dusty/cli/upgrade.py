@@ -15,11 +15,10 @@ Options:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.upgrade import upgrade_dusty_binary
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
     if args['<version>']:
-        return Payload(upgrade_dusty_binary, args['<version>'])
-    return Payload(upgrade_dusty_binary)
+        return Payload(LazyCommand('dusty.commands.upgrade.upgrade_dusty_binary'), args['<version>'])
+    return Payload(LazyCommand('dusty.commands.upgrade.upgrade_dusty_binary'))
@@ -6,14 +6,13 @@ Usage:
 
 from docopt import docopt
 
-from ..payload import Payload
-from ..commands.validate import validate_specs, validate_specs_from_path
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
     if args.get('<specs-path>'):
-        payload = Payload(validate_specs_from_path, args['<specs-path>'])
+        payload = Payload(LazyCommand('dusty.commands.validate.validate_specs_from_path'), args['<specs-path>'])
         payload.run_on_daemon = False
         return payload
     else:
-        return Payload(validate_specs)
+        return Payload(LazyCommand('dusty.commands.validate.validate_specs'))
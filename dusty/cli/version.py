@@ -6,11 +6,10 @@ Usage:
 
 from docopt import docopt
 
-from ..commands.version import version
 from ..constants import VERSION
-from ..payload import Payload
+from ..payload import Payload, LazyCommand
 
 def main(argv):
     args = docopt(__doc__, argv)
     print 'Dusty client version: {}'.format(VERSION)
-    return Payload(version)
+    return Payload(LazyCommand('dusty.commands.version.version'))
@@ -1,14 +1,67 @@
+"""Generates the shell scripts containers run: each app's startup command,
+its scripts, and the setup and suite commands of tests.
+
+Each app's directory of command files holds a manifest of the hash of every
+file in it. Files are only rewritten when their contents change, and only
+the directories of apps whose manifest differs from the copy on the VM are
+synced to it."""
+
+import hashlib
+import json
 import os
 
 from . import constants
 from .source import Repo
 from .compiler.compose.common import container_code_path
+from .memoize import memoized, SCOPE_VM
+from .subprocess import check_output_demoted
 from .systems.docker.common import spec_for_service
-from .systems.rsync import sync_local_path_to_vm
+from .systems.rsync import sync_local_dirs_to_vm
+from .systems.virtualbox import vm_ssh_command
 from .path import case_insensitive_rename, parent_dir
 
+MANIFEST_NAME = '.manifest.json'
+
+def _app_command_files_dir(app_name):
+    return '{}/{}'.format(constants.COMMAND_FILES_DIR, app_name)
+
+def _manifest_path(app_name):
+    return os.path.join(_app_command_files_dir(app_name), MANIFEST_NAME)
+
+def _read_manifest(app_name):
+    """Returns the hash of each command file of the app, keyed by its
+    path within the app's command file directory"""
+    try:
+        with open(_manifest_path(app_name), 'r') as f:
+            return json.load(f)['files']
+    except (IOError, ValueError, KeyError):
+        return {}
+
+def _write_manifest(app_name, files):
+    with open(_manifest_path(app_name), 'w') as f:
+        # One line per manifest, so the VM's copies can be read back with a single cat
+        json.dump({'app': app_name, 'files': files}, f, sort_keys=True)
+        f.write('\n')
+
+def _dir_name_has_same_case(app_name):
+    """On a case-insensitive host filesystem, the app's directory may exist
+    under a name differing only in case, which we must rewrite"""
+    return app_name in os.listdir(constants.COMMAND_FILES_DIR)
+
+def _contents_hash(contents):
+    return hashlib.sha1(contents).hexdigest()
+
 def _write_commands_to_file(list_of_commands, app_name, file_location):
-    file_location_parent = '{}/{}'.format(constants.COMMAND_FILES_DIR, app_name)
+    """Writes the command file, unless the manifest shows it already has
+    these contents"""
+    contents = _command_file_contents(list_of_commands)
+    contents_hash = _contents_hash(contents)
+    manifest = _read_manifest(app_name)
+    relative_location = os.path.relpath(file_location, _app_command_files_dir(app_name))
+    if (manifest.get(relative_location) == contents_hash and os.path.exists(file_location)
+            and _dir_name_has_same_case(app_name)):
+        return
+    file_location_parent = _app_command_files_dir(app_name)
     if os.path.exists(file_location_parent):
         # This looks insane but it's necessary to handle case-insensitive host filesystems
         # like HFS on Mac. The filesystems in our VM are case-sensitive, so we need to make
@@ -22,8 +75,12 @@ def _write_commands_to_file(list_of_commands, app_name, file_location):
     if os.path.exists(file_location):
         os.remove(file_location)
     with open(file_location, 'w+') as f:
-        for command in list_of_commands:
-            f.write('{} \n'.format(command))
+        f.write(contents)
+    manifest[relative_location] = contents_hash
+    _write_manifest(app_name, manifest)
+
+def _command_file_contents(list_of_commands):
+    return ''.join('{} \n'.format(command) for command in list_of_commands)
 
 def _tee_output_commands(command_to_tee):
     tee_function_name = 'tee_{}'.format(command_to_tee)
@@ -156,6 +213,7 @@ def _write_up_command(app_name, assembled_specs, port_spec):
     command_file_name = dusty_command_file_name(app_name)
     local_path = '{}/{}/{}'.format(constants.COMMAND_FILES_DIR, app_name, command_file_name)
     _write_commands_to_file(commands, app_name, local_path)
+    return _command_file_contents(commands)
 
 def _write_up_script_command(app_name, app_spec, script_spec):
     commands = ["cd {}".format(container_code_path(app_spec))] + script_spec['command']
@@ -177,14 +235,46 @@ def _write_test_suite_command(app_or_lib_spec, suite_spec):
     local_path = '{}/{}/test/{}'.format(constants.COMMAND_FILES_DIR, app_or_lib_spec.name, command_file_name)
     _write_commands_to_file(commands, app_or_lib_spec.name, local_path)
 
+@memoized(scope=SCOPE_VM)
+def _vm_manifests():
+    """The manifests of the command files currently on the VM, by app. Read
+    once per VM, then kept up to date as we sync."""
+    output = check_output_demoted(vm_ssh_command('cat {}/*/{} 2> /dev/null || true'.format(
+        constants.VM_COMMAND_FILES_DIR, MANIFEST_NAME)))
+    manifests = {}
+    for line in output.splitlines():
+        try:
+            manifest = json.loads(line)
+            manifests[manifest['app']] = manifest['files']
+        except (ValueError, KeyError, TypeError):
+            continue
+    return manifests
+
+def _sync_command_files(app_names):
+    """Syncs the command file directories of `app_names` whose contents
+    differ from what the VM has, in one rsync"""
+    vm_manifests = _vm_manifests()
+    local_manifests = {app_name: _read_manifest(app_name) for app_name in app_names}
+    changed_apps = sorted(app_name for app_name in app_names
+                          if not local_manifests[app_name] or vm_manifests.get(app_name) != local_manifests[app_name])
+    if not changed_apps:
+        return
+    sync_local_dirs_to_vm(constants.COMMAND_FILES_DIR, constants.VM_COMMAND_FILES_DIR, changed_apps)
+    for app_name in changed_apps:
+        vm_manifests[app_name] = local_manifests[app_name]
+
 def make_up_command_files(assembled_specs, port_spec):
+    """Writes the command files of every app and syncs them to the VM.
+    Returns the contents of the command file each app runs on startup, by app."""
+    up_command_files = {}
     for app_name in assembled_specs['apps'].keys():
         spec = assembled_specs['apps'][app_name]
-        _write_up_command(app_name, assembled_specs, port_spec)
+        up_command_files[app_name] = _write_up_command(app_name, assembled_specs, port_spec)
         script_specs = spec['scripts']
         for script_spec in script_specs:
             _write_up_script_command(app_name, spec, script_spec)
-    sync_local_path_to_vm(constants.COMMAND_FILES_DIR, constants.VM_COMMAND_FILES_DIR)
+    _sync_command_files(assembled_specs['apps'].keys())
+    return up_command_files
 
 def make_test_command_files(app_or_lib_name, expanded_specs):
     app_or_lib_spec = expanded_specs.get_app_or_lib(app_or_lib_name)
@@ -194,4 +284,4 @@ def make_test_command_files(app_or_lib_name, expanded_specs):
     _write_test_command(app_or_lib_spec, expanded_specs)
     for suite_spec in test_spec['suites']:
         _write_test_suite_command(app_or_lib_spec, suite_spec)
-    sync_local_path_to_vm(constants.COMMAND_FILES_DIR, constants.VM_COMMAND_FILES_DIR)
+    _sync_command_files([app_or_lib_name])
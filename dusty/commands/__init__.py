@@ -0,0 +1,9 @@
+import importlib
+import pkgutil
+
+def import_all_command_modules():
+    """Daemon commands register themselves with the payload module when
+    their module is imported. The CLI only refers to them lazily, so the
+    daemon imports every command module up front."""
+    for _, module_name, _ in pkgutil.iter_modules(__path__):
+        importlib.import_module('{}.{}'.format(__name__, module_name))
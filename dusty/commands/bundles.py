@@ -6,9 +6,9 @@ from ..config import get_config_value, save_config_value
 from ..compiler.spec_assembler import get_specs
 from ..log import log_to_client
 from .. import constants
-from ..payload import daemon_command
+from ..payload import daemon_command, read_only_daemon_command
 
-@daemon_command
+@read_only_daemon_command
 def list_bundles():
     specs, activated_bundles = get_specs(), get_config_value(constants.CONFIG_BUNDLES_KEY)
     table = PrettyTable(["Name", "Description", "Activated?"])
@@ -1,64 +1,80 @@
 import os
-import uuid
+import subprocess
 import tempfile
-from contextlib import contextmanager
-import shutil
+import uuid
 
 from .. import constants
 from ..log import log_to_client
-from ..path import vm_cp_path
-from ..systems.rsync import sync_local_path_to_vm, sync_local_path_from_vm, vm_path_is_directory
-from ..systems.docker.files import (move_dir_inside_container, move_file_inside_container,
-                               copy_path_inside_container, container_path_exists)
+from ..path import vm_cp_path, parent_dir
+from ..subprocess import run_subprocess
+from ..systems.rsync import sync_local_path_from_vm, vm_path_is_directory
+from ..systems.docker.files import (copy_path_inside_container, container_path_exists,
+                                    copy_path_between_containers, put_archive_at_path)
 from ..payload import daemon_command
 
-@contextmanager
-def _cleanup_path(path):
-    """Recursively delete a path upon exiting this context
-    manager. Supports targets that are files or directories."""
-    try:
-        yield
-    finally:
-        if os.path.exists(path):
-            if os.path.isdir(path):
-                shutil.rmtree(path)
-            else:
-                os.remove(path)
+STREAM_CHUNK_SIZE = 64 * 1024
+PROGRESS_INTERVAL_BYTES = 10 * 1024 * 1024
+
+def _megabytes(byte_count):
+    return '{:.1f} MB'.format(byte_count / (1024.0 * 1024))
+
+def _archive_chunks(process, error_file, destination):
+    """Yields the archive `process` writes in chunks, telling the client
+    how much has been sent every PROGRESS_INTERVAL_BYTES. Raises once the
+    archive ends if tar failed, which aborts the upload."""
+    sent, next_report = 0, PROGRESS_INTERVAL_BYTES
+    for chunk in iter(lambda: process.stdout.read(STREAM_CHUNK_SIZE), ''):
+        sent += len(chunk)
+        if sent >= next_report:
+            log_to_client('Sent {} to {}'.format(_megabytes(sent), destination))
+            next_report += PROGRESS_INTERVAL_BYTES
+        yield chunk
+    if process.wait() != 0:
+        error_file.seek(0)
+        raise RuntimeError('ERROR: Could not archive local files: {}'.format(error_file.read().strip()))
+    log_to_client('Sent {} to {}'.format(_megabytes(sent), destination))
+
+def _local_tar_process(local_path, compress, demote, error_file):
+    """Runs tar on `local_path`, writing the archive to stdout and any
+    errors to `error_file`. Running it demoted means the archive only
+    contains what the user can read."""
+    command = ['tar', '-cz' if compress else '-c', '-f', '-',
+               '-C', parent_dir(local_path), os.path.basename(local_path)]
+    # COPYFILE_DISABLE stops OS X's tar adding AppleDouble (._*) files
+    return run_subprocess(subprocess.Popen, command, demote=demote, env={'COPYFILE_DISABLE': '1'},
+                          stdout=subprocess.PIPE, stderr=error_file)
 
 @daemon_command
 def copy_between_containers(source_name, source_path, dest_name, dest_path):
-    """Copy a file from the source container to an intermediate staging
-    area on the local filesystem, then from that staging area to the
-    destination container.
+    """Copy a path from one container to another. The files are
+    streamed from one container's Docker archive to the other's,
+    without leaving the VM.
 
-    These moves take place without demotion for two reasons:
-      1. There should be no permissions vulnerabilities with copying
-         between containers because it is assumed the non-privileged
-         user has full access to all Dusty containers.
-      2. The temp dir created by mkdtemp is owned by the owner of the
-         Dusty daemon process, so if we demoted our moves to/from that location
-         they would encounter permission errors."""
+    This takes place without demotion, because it is assumed the
+    non-privileged user has full access to all Dusty containers."""
     if not container_path_exists(source_name, source_path):
         raise RuntimeError('ERROR: Path {} does not exist inside container {}.'.format(source_path, source_name))
-    temp_path = os.path.join(tempfile.mkdtemp(), str(uuid.uuid1()))
-    with _cleanup_path(temp_path):
-        copy_to_local(temp_path, source_name, source_path, demote=False)
-        copy_from_local(temp_path, dest_name, dest_path, demote=False)
+    copy_path_between_containers(source_name, source_path, dest_name, dest_path)
 
 @daemon_command
-def copy_from_local(local_path, remote_name, remote_path, demote=True):
+def copy_from_local(local_path, remote_name, remote_path, demote=True, compress=False):
     """Copy a path from the local filesystem to a path inside a Dusty
-    container. The files on the local filesystem must be accessible
+    container, streaming it there as a tar archive, gzipped if `compress`
+    is set. The files on the local filesystem must be accessible
     by the user specified in mac_username."""
     if not os.path.exists(local_path):
         raise RuntimeError('ERROR: Path {} does not exist'.format(local_path))
-    temp_identifier = str(uuid.uuid1())
-    if os.path.isdir(local_path):
-        sync_local_path_to_vm(local_path, os.path.join(vm_cp_path(remote_name), temp_identifier), demote=demote)
-        move_dir_inside_container(remote_name, os.path.join(constants.CONTAINER_CP_DIR, temp_identifier), remote_path)
-    else:
-        sync_local_path_to_vm(local_path, os.path.join(vm_cp_path(remote_name), temp_identifier), demote=demote)
-        move_file_inside_container(remote_name, os.path.join(constants.CONTAINER_CP_DIR, temp_identifier), remote_path)
+    local_path = local_path.rstrip(os.sep)
+    error_file = tempfile.TemporaryFile()
+    process = _local_tar_process(local_path, compress, demote, error_file)
+    try:
+        put_archive_at_path(remote_name, _archive_chunks(process, error_file, '{}:{}'.format(remote_name, remote_path)),
+                            os.path.basename(local_path), remote_path)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        error_file.close()
 
 @daemon_command
 def copy_to_local(local_path, remote_name, remote_path, demote=True):
@@ -1,6 +1,7 @@
 import os
 
 import docker
+from prettytable import PrettyTable
 
 from .. import constants
 from ..log import log_to_client
@@ -8,6 +9,10 @@ from ..path import dir_modified_time, set_mac_user_ownership
 from ..systems.docker.cleanup import remove_exited_dusty_containers, remove_images
 from ..systems.virtualbox import get_docker_vm_disk_info, ensure_docker_vm_is_started, initialize_docker_vm
 from ..systems.rsync import sync_local_path_to_vm, sync_local_path_from_vm
+from ..systems import nfs
+from ..systems.nfs.bench import bench_repo_mount
+from ..systems.nfs.client import nfs_mount_profile
+from ..compiler.spec_assembler import get_all_repos, get_repo_index
 from ..payload import daemon_command
 
 @daemon_command
@@ -54,3 +59,31 @@ def restore(source_path):
     initialize_docker_vm()
     log_to_client("Restoring your backup last modified at {}".format(dir_modified_time(source_path)))
     sync_local_path_to_vm(source_path, constants.VM_PERSIST_DIR)
+
+def _describe_mount(repo):
+    if repo.sync_method == constants.SYNC_METHOD_NFS:
+        return 'nfs ({})'.format(nfs_mount_profile(repo))
+    return repo.sync_method
+
+@daemon_command
+def bench_repo_mounts(repo_names=None):
+    """Runs a file workload inside a container against the VM's copy of each
+    repo, or of each active repo if none are given, and reports how fast
+    each step of it ran"""
+    initialize_docker_vm()
+    if repo_names:
+        repo_index = get_repo_index()
+        repos = [repo_index.resolve(repo_name) for repo_name in repo_names]
+    else:
+        repos = sorted(get_all_repos(active_only=True, include_specs_repo=False), key=lambda repo: repo.remote_path)
+    if not repos:
+        raise RuntimeError('No repos to benchmark. Activate some bundles or name the repos to benchmark.')
+    nfs.update_nfs_with_repos(repos)
+    table = None
+    for repo in repos:
+        log_to_client('Benchmarking {} ({})'.format(repo.short_name, _describe_mount(repo)))
+        results = bench_repo_mount(repo)
+        if table is None:
+            table = PrettyTable(['Repo', 'Mount'] + ['{} ({})'.format(workload.name, workload.unit) for workload, _ in results])
+        table.add_row([repo.short_name, _describe_mount(repo)] + ['{:.0f}'.format(rate) for _, rate in results])
+    log_to_client(table.get_string())
@@ -1,10 +1,18 @@
 import subprocess
+import time
+
+from prettytable import PrettyTable
 
 from .. import constants
 from ..log import log_to_client
 from ..subprocess import check_output_demoted
 from ..warnings import daemon_warnings
-from ..payload import daemon_command
+from ..payload import read_only_daemon_command
+from ..schemas.base_schema_class import get_spec_cache_stats
+from ..memoize import memoize_stats
+from ..timing import read_profile_history
+
+PROFILE_HISTORY_RUNS_SHOWN = 5
 
 DIAGNOSTIC_SUBPROCESS_COMMANDS = [
     ['which', 'rsync'],
@@ -19,13 +27,38 @@ DIAGNOSTIC_SUBPROCESS_COMMANDS = [
     ['ssh-add', '-l']
 ]
 
+def _format_memoize_stats(stats):
+    return '\n'.join('{} ({} scope): hits: {}, misses: {}'.format(fn_key, fn_stats['scope'], fn_stats['hits'], fn_stats['misses'])
+                     for fn_key, fn_stats in sorted(stats.iteritems()))
+
+def _format_profile_history(history):
+    """Phase timings of several profiles, one column per run"""
+    if not history:
+        return 'No profiled runs recorded. Run `dusty up --profile` to record one.'
+    phases = []
+    for profile_dict in history:
+        phases.extend(phase for phase in profile_dict['phases'] if phase not in phases)
+    columns = ['{}. {} {}'.format(index, profile_dict['command'],
+                                  time.strftime('%m-%d %H:%M', time.localtime(profile_dict['started_at'])))
+               for index, profile_dict in enumerate(history, 1)]
+    table = PrettyTable(['Phase'] + columns)
+    for phase in phases:
+        table.add_row([phase] + ['{:.2f}'.format(profile_dict['phases'][phase]) if phase in profile_dict['phases'] else '-'
+                                 for profile_dict in history])
+    table.add_row(['total'] + ['{:.2f}{}'.format(profile_dict['seconds'], '' if profile_dict['succeeded'] else ' (failed)')
+                               for profile_dict in history])
+    return table.get_string()
+
 DIAGNOSTIC_DUSTY_COMMANDS = [
     ('Dusty Version', lambda: constants.VERSION),
     ('Dusty Binary', lambda: constants.BINARY),
-    ('Daemon Warnings', daemon_warnings.pretty)
+    ('Daemon Warnings', daemon_warnings.pretty),
+    ('Spec Cache', lambda: 'hits: {hits}, misses: {misses}, cached files: {entries}'.format(**get_spec_cache_stats())),
+    ('Memoize Cache', lambda: _format_memoize_stats(memoize_stats())),
+    ('Profiled Runs', lambda: _format_profile_history(read_profile_history()[-PROFILE_HISTORY_RUNS_SHOWN:]))
 ]
 
-@daemon_command
+@read_only_daemon_command
 def dump_diagnostics():
     for title, fn in DIAGNOSTIC_DUSTY_COMMANDS:
         log_to_client('COMMAND: {}'.format(title))
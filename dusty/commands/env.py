@@ -6,7 +6,7 @@ from ..log import log_to_client
 from ..compiler.spec_assembler import get_assembled_specs, get_specs
 from ..config import get_env_config, save_config_value
 from .. import constants
-from ..payload import daemon_command
+from ..payload import daemon_command, read_only_daemon_command
 
 def _save_env(env_config):
     save_config_value(constants.CONFIG_ENV_KEY, env_config)
@@ -18,7 +18,7 @@ def _assert_app_or_service_exists(app_or_service):
     """
     get_specs().get_app_or_service(app_or_service)
 
-@daemon_command
+@read_only_daemon_command
 def list_app_or_service(app_or_service):
     _assert_app_or_service_exists(app_or_service)
     env_dict = get_env_config().get(app_or_service)
@@ -30,7 +30,7 @@ def list_app_or_service(app_or_service):
         table.add_row([var_name, value])
     log_to_client(table.get_string())
 
-@daemon_command
+@read_only_daemon_command
 def list_all():
     env_config = get_env_config()
     if not env_config:
@@ -3,27 +3,31 @@ import urlparse
 
 from prettytable import PrettyTable
 
-from ..config import get_config_value, save_config_value
-from ..compiler.spec_assembler import get_specs, get_specs_repo, get_all_repos, get_assembled_specs
-from ..source import Repo
+from ..config import get_config_value, save_config_value, get_repo_sync_methods, get_nfs_mount_profiles
+from ..compiler.spec_assembler import get_specs, get_specs_repo, get_all_repos, get_repo_index, get_assembled_specs
 from ..log import log_to_client
 from .. import constants
-from ..payload import daemon_command
+from ..payload import daemon_command, read_only_daemon_command
 from ..parallel import parallel_task_queue
 from ..systems.known_hosts import ensure_known_hosts
+from ..systems import sync
+from ..systems.nfs.client import nfs_mount_profile
 
-@daemon_command
+@read_only_daemon_command
 def list_repos():
     repos, overrides = get_all_repos(), get_config_value(constants.CONFIG_REPO_OVERRIDES_KEY)
-    table = PrettyTable(['Full Name', 'Short Name', 'Local Override'])
+    table = PrettyTable(['Full Name', 'Short Name', 'Local Override', 'Sync Method'])
     for repo in repos:
+        sync_method = repo.sync_method
+        if sync_method == constants.SYNC_METHOD_NFS:
+            sync_method = '{} ({})'.format(sync_method, nfs_mount_profile(repo))
         table.add_row([repo.remote_path, repo.short_name,
-                       repo.override_path if repo.is_overridden else ''])
+                       repo.override_path if repo.is_overridden else '', sync_method])
     log_to_client(table.get_string(sortby='Full Name'))
 
 @daemon_command
 def override_repo(repo_name, source_path):
-    repo = Repo.resolve(get_all_repos(), repo_name)
+    repo = get_repo_index().resolve(repo_name)
     if not os.path.exists(source_path):
         raise OSError('Source path {} does not exist'.format(source_path))
     if not os.path.isdir(source_path):
@@ -34,7 +38,7 @@ def override_repo(repo_name, source_path):
     log_to_client('Locally overriding repo {} to use source at {}'.format(repo.remote_path, source_path))
 
 def _manage_repo(repo_name):
-    repo = Repo.resolve(get_all_repos(), repo_name)
+    repo = get_repo_index().resolve(repo_name)
     config = get_config_value(constants.CONFIG_REPO_OVERRIDES_KEY)
     if repo.remote_path in config:
         del config[repo.remote_path]
@@ -61,6 +65,31 @@ def override_repos_from_directory(source_path):
         if os.path.isdir(repo_path):
             override_repo(repo.remote_path, repo_path)
 
+@daemon_command
+def set_repo_sync_method(repo_name, sync_method):
+    repo = get_repo_index().resolve(repo_name)
+    if sync_method not in constants.SYNC_METHODS:
+        raise RuntimeError('Unknown sync method {}, must be one of {}'.format(sync_method, ', '.join(constants.SYNC_METHODS)))
+    sync_methods = get_repo_sync_methods()
+    if sync_method == constants.SYNC_METHOD_NFS:
+        sync_methods.pop(repo.remote_path, None)
+        sync.stop_syncing_repos([repo])
+    else:
+        sync_methods[repo.remote_path] = sync_method
+    save_config_value(constants.CONFIG_REPO_SYNC_METHODS_KEY, sync_methods)
+    log_to_client('Repo {} will be synced to the VM with {}. Run `dusty up` or restart its apps to use it.'.format(repo.remote_path, sync_method))
+
+@daemon_command
+def set_repo_nfs_profile(repo_name, profile):
+    repo = get_repo_index().resolve(repo_name)
+    if profile not in constants.NFS_MOUNT_PROFILES:
+        raise RuntimeError('Unknown NFS mount profile {}, must be one of {}'.format(profile, ', '.join(sorted(constants.NFS_MOUNT_PROFILES))))
+    profiles = get_nfs_mount_profiles()
+    profiles[repo.remote_path] = profile
+    save_config_value(constants.CONFIG_NFS_MOUNT_PROFILES_KEY, profiles)
+    log_to_client('Repo {} will be mounted with NFS options {}. Run `dusty up` or restart its apps to remount it.'.format(
+        repo.remote_path, ','.join(constants.NFS_MOUNT_PROFILES[profile])))
+
 def add_known_hosts_for_repos(repos):
     hosts = set()
     for repo in repos:
@@ -1,46 +1,114 @@
+import collections
 import os
 from subprocess import CalledProcessError
 
+from docker.errors import APIError
+
 from ..compiler import (compose as compose_compiler, nginx as nginx_compiler,
                         port_spec as port_spec_compiler, spec_assembler)
-from ..systems import docker, hosts, nginx, virtualbox, nfs
-from ..systems.docker import compose
+from ..systems import docker, hosts, nginx, virtualbox, nfs, sync
+from ..systems.docker import compose, pull
 from ..log import log_to_client
 from .repos import update_managed_repos
-from .. import constants
+from .. import constants, timing, up_plan
 from ..command_file import make_up_command_files
-from ..source import Repo
 from ..payload import daemon_command
 from ..warnings import daemon_warnings
+from ..parallel import TaskGraph
+from ..context import current_context
 
 @daemon_command
-def start_local_env(recreate_containers=True, pull_repos=True):
+def start_local_env(recreate_containers=True, pull_repos=True, profile=False):
     """This command will use the compilers to get compose specs
     will pass those specs to the systems that need them. Those
     systems will in turn launch the services needed to make the
-    local environment go."""
-    if pull_repos:
-        update_managed_repos(force=True)
+    local environment go. Steps which don't depend on each other
+    run in parallel; see _up_task_graph."""
+    task_graph = _up_task_graph(recreate_containers, pull_repos)
+    if not profile:
+        task_graph.execute()
+    else:
+        _execute_profiled(task_graph, 'up')
+    log_to_client(task_graph.describe_critical_path())
+    log_to_client("Your local environment is now started!")
+
+def _execute_profiled(task_graph, command):
+    """Times every step of the graph and every subprocess run during it,
+    then reports the breakdown and adds it to the profile history"""
+    profile = timing.Profile(command)
+    current_context().profile = profile
+    try:
+        task_graph.execute()
+    except:
+        profile.finish(succeeded=False)
+        raise
+    else:
+        profile.finish(succeeded=True)
+    finally:
+        current_context().profile = None
+        timing.save_profile(profile)
+        log_to_client(timing.format_profile(profile.to_dict()))
+
+def _up_task_graph(recreate_containers, pull_repos):
+    task_graph = TaskGraph()
+    result = task_graph.result
+    task_graph.add_task('pull_repos', lambda: update_managed_repos(force=True) if pull_repos else None)
+    task_graph.add_task('assemble_specs', _assemble_active_specs, depends=['pull_repos'])
+    task_graph.add_task('init_vm', virtualbox.initialize_docker_vm)
+    task_graph.add_task('check_assets', lambda: _check_required_assets(result('assemble_specs')),
+                        depends=['assemble_specs', 'init_vm'])
+    task_graph.add_task('check_disk', _check_vm_disk, depends=['init_vm'])
+    task_graph.add_task('get_vm_ip', virtualbox.get_docker_vm_ip, depends=['init_vm'])
+    task_graph.add_task('compile_port_spec', lambda: _compile_port_spec(result('assemble_specs'), result('get_vm_ip')),
+                        depends=['assemble_specs', 'get_vm_ip'])
+    task_graph.add_task('compile_nginx_config', lambda: _compile_nginx_config(result('compile_port_spec')),
+                        depends=['compile_port_spec'])
+    task_graph.add_task('write_command_files', lambda: _write_command_files(result('assemble_specs'), result('compile_port_spec')),
+                        depends=['compile_port_spec', 'init_vm'])
+    task_graph.add_task('compile_compose_config', lambda: _compile_compose_config(result('assemble_specs'), result('compile_port_spec')),
+                        depends=['compile_port_spec'])
+    task_graph.add_task('check_repo_mounts', nfs.active_repos_to_mount, depends=['assemble_specs', 'init_vm'])
+    task_graph.add_task('pull_images', lambda: _pull_images(result('compile_compose_config')),
+                        depends=['compile_compose_config', 'init_vm'])
+    task_graph.add_task('plan_containers', lambda: _plan_containers(result('compile_compose_config'),
+                                                                    result('write_command_files'),
+                                                                    result('compile_nginx_config'),
+                                                                    result('check_repo_mounts')),
+                        depends=['compile_compose_config', 'write_command_files', 'compile_nginx_config',
+                                 'check_repo_mounts', 'pull_images'])
+    task_graph.add_task('stop_replaced_containers', lambda: _stop_planned_services(result('plan_containers'), recreate_containers),
+                        depends=['plan_containers'])
+    task_graph.add_task('update_hosts_file', lambda: _update_hosts_file(result('compile_port_spec')),
+                        depends=['compile_port_spec'])
+    # Remounting and syncing repos under containers which are about to be replaced would
+    # leave them running against the old mount, or see their files change underneath them
+    task_graph.add_task('configure_nfs', _configure_nfs, depends=['assemble_specs', 'init_vm', 'stop_replaced_containers'])
+    task_graph.add_task('sync_repos', sync.sync_active_repos, depends=['assemble_specs', 'init_vm', 'stop_replaced_containers'])
+    task_graph.add_task('update_nginx', lambda: _update_nginx(result('compile_nginx_config')),
+                        depends=['compile_nginx_config', 'init_vm'])
+    task_graph.add_task('start_containers', lambda: _start_containers(result('compile_compose_config'),
+                                                                      result('plan_containers'),
+                                                                      result('stop_replaced_containers')),
+                        depends=['check_assets', 'stop_replaced_containers', 'update_hosts_file',
+                                 'configure_nfs', 'sync_repos', 'update_nginx', 'pull_images'])
+    return task_graph
+
+def _pull_images(compose_config):
+    pull.pull_images([service_config['image'] for service_config in compose_config.values() if 'image' in service_config])
+
+def _assemble_active_specs():
+    log_to_client("Compiling together the assembled specs")
     assembled_spec = spec_assembler.get_assembled_specs()
     if not assembled_spec[constants.CONFIG_BUNDLES_KEY]:
         raise RuntimeError('No bundles are activated. Use `dusty bundles` to activate bundles before running `dusty up`.')
+    return assembled_spec
 
-    virtualbox.initialize_docker_vm()
-
+def _check_required_assets(assembled_spec):
     required_absent_assets = virtualbox.required_absent_assets(assembled_spec)
     if required_absent_assets:
         raise RuntimeError('Assets {} are specified as required but are not set. Set them with `dusty assets set`'.format(required_absent_assets))
 
-    docker_ip = virtualbox.get_docker_vm_ip()
-
-    # Stop will fail if we've never written a Composefile before
-    if os.path.exists(constants.COMPOSEFILE_PATH):
-        try:
-            stop_apps_or_services(rm_containers=recreate_containers)
-        except CalledProcessError as e:
-            log_to_client("WARNING: docker-compose stop failed")
-            log_to_client(str(e))
-
+def _check_vm_disk():
     daemon_warnings.clear_namespace('disk')
     df_info = virtualbox.get_docker_vm_disk_info(as_dict=True)
     if 'M' in df_info['free'] or 'K' in df_info['free']:
@@ -48,27 +116,95 @@ def start_local_env(recreate_containers=True, pull_repos=True):
         daemon_warnings.warn('disk', warning_msg)
         log_to_client(warning_msg)
 
-    log_to_client("Compiling together the assembled specs")
-    active_repos = spec_assembler.get_all_repos(active_only=True, include_specs_repo=False)
+def _compile_port_spec(assembled_spec, docker_ip):
     log_to_client("Compiling the port specs")
-    port_spec = port_spec_compiler.get_port_spec_document(assembled_spec, docker_ip)
+    return port_spec_compiler.get_port_spec_document(assembled_spec, docker_ip)
+
+def _compile_nginx_config(port_spec):
     log_to_client("Compiling the nginx config")
-    nginx_config = nginx_compiler.get_nginx_configuration_spec(port_spec)
+    return nginx_compiler.get_nginx_configuration_spec(port_spec)
+
+def _write_command_files(assembled_spec, port_spec):
     log_to_client("Creating setup and script bash files")
-    make_up_command_files(assembled_spec, port_spec)
+    return make_up_command_files(assembled_spec, port_spec)
+
+def _compile_compose_config(assembled_spec, port_spec):
     log_to_client("Compiling docker-compose config")
-    compose_config = compose_compiler.get_compose_dict(assembled_spec, port_spec)
+    return compose_compiler.get_compose_dict(assembled_spec, port_spec)
+
+def _image_ids(compose_config):
+    """The ID of the image each service runs, or None if it isn't in the VM.
+    Compose names the images it builds after the project and service."""
+    client = docker.get_docker_client()
+    image_ids = {}
+    for service, service_config in compose_config.iteritems():
+        image_name = service_config.get('image', 'dusty_{}'.format(service))
+        try:
+            image_ids[service] = client.inspect_image(image_name)['Id']
+        except APIError:
+            image_ids[service] = None
+    return image_ids
+
+def _repo_states(repo_index):
+    """Where each repo an app mounts comes from and how it gets to the VM,
+    keyed by app"""
+    states = collections.defaultdict(list)
+    for repo in repo_index:
+        state = [repo.remote_path, repo.local_path, repo.sync_method]
+        if repo.sync_method == constants.SYNC_METHOD_NFS:
+            state.append(nfs.client.nfs_mount_profile(repo))
+        for app in repo_index.mounted_by(repo)['apps']:
+            states[app].append(state)
+    return {app: sorted(app_states) for app, app_states in states.iteritems()}
 
+def _plan_containers(compose_config, up_command_files, nginx_config, repos_to_mount):
+    repo_index = spec_assembler.get_repo_index(active_only=True, include_specs_repo=False)
+    forced_recreates = {}
+    for repo in repos_to_mount:
+        for app in repo_index.mounted_by(repo)['apps']:
+            forced_recreates.setdefault(app, 'repo {} will be remounted'.format(repo.short_name))
+    plan = up_plan.get_up_plan(compose_config, up_command_files, nginx_config,
+                               image_ids=_image_ids(compose_config),
+                               repo_states=_repo_states(repo_index),
+                               forced_recreates=forced_recreates)
+    log_to_client(plan.describe())
+    return plan
+
+def _update_hosts_file(port_spec):
     log_to_client("Saving port forwarding to hosts file")
     hosts.update_hosts_file_from_port_spec(port_spec)
+
+def _configure_nfs():
     log_to_client("Configuring NFS")
     nfs.configure_nfs()
+
+def _update_nginx(nginx_config):
     log_to_client("Saving updated nginx config to the VM")
     nginx.update_nginx_from_config(nginx_config)
+
+def _start_containers(compose_config, plan, recreated):
     log_to_client("Saving Docker Compose config and starting all containers")
-    compose.update_running_containers_from_spec(compose_config, recreate_containers=recreate_containers)
+    compose.update_running_containers_from_spec(compose_config, recreate_containers=False)
+    up_plan.record_applied_plan(plan, recreated=recreated)
 
-    log_to_client("Your local environment is now started!")
+def _stop_planned_services(plan, recreate_containers):
+    """Stops (and removes, if we're recreating containers) the containers
+    the plan replaces, so that the `up` which follows creates them from the
+    new config while leaving unchanged containers running. Returns whether
+    the replaced containers are gone."""
+    # Stop will fail if we've never written a Composefile before
+    if not os.path.exists(constants.COMPOSEFILE_PATH):
+        return True
+    services_to_stop = plan.services_to_stop
+    if services_to_stop == []:
+        return True
+    try:
+        stop_apps_or_services(services_to_stop, rm_containers=recreate_containers)
+    except CalledProcessError as e:
+        log_to_client("WARNING: docker-compose stop failed")
+        log_to_client(str(e))
+        return False
+    return recreate_containers
 
 @daemon_command
 def stop_apps_or_services(app_or_service_names=None, rm_containers=False):
@@ -100,18 +236,18 @@ def restart_apps_or_services(app_or_service_names=None):
         for spec in specs_list:
             if spec['repo']:
                 repos = repos.union(spec_assembler.get_same_container_repos_from_spec(spec))
-        nfs.update_nfs_with_repos(repos)
     else:
-        nfs.update_nfs_with_repos(spec_assembler.get_all_repos(active_only=True, include_specs_repo=False))
+        repos = spec_assembler.get_all_repos(active_only=True, include_specs_repo=False)
+    nfs.update_nfs_with_repos(repos)
+    sync.sync_repos(repos)
     compose.restart_running_services(app_or_service_names)
 
 @daemon_command
 def restart_apps_by_repo(repo_names):
-    all_repos = spec_assembler.get_all_repos()
-    resolved_repos = set([Repo.resolve(all_repos, repo_name) for repo_name in repo_names])
-    specs = spec_assembler.get_assembled_specs()
+    repo_index = spec_assembler.get_repo_index()
+    resolved_repos = set([repo_index.resolve(repo_name) for repo_name in repo_names])
+    active_repo_index = spec_assembler.get_repo_index(active_only=True)
     apps_with_repos = set()
-    for app_spec in specs['apps'].itervalues():
-        if spec_assembler.get_same_container_repos_from_spec(app_spec).intersection(resolved_repos):
-            apps_with_repos.add(app_spec.name)
+    for repo in resolved_repos:
+        apps_with_repos |= active_repo_index.mounted_by(repo)['apps']
     restart_apps_or_services(apps_with_repos)
@@ -1,29 +1,93 @@
+import datetime
+
+from docker.errors import APIError
 from prettytable import PrettyTable
 
 from ..compiler.spec_assembler import get_assembled_specs
 from ..log import log_to_client
-from ..systems.docker import get_dusty_containers
+from ..parallel import parallel_task_queue
+from ..systems.docker import get_docker_client, get_container_snapshot
 from ..systems.virtualbox import docker_vm_is_running
-from ..payload import daemon_command
+from ..payload import read_only_daemon_command
 from .. import constants
 
-def _has_active_container(spec_type, service_name):
-    if spec_type == 'lib':
-        return False
-    return get_dusty_containers([service_name]) != []
+def _human_duration(seconds):
+    """Describes a duration the way Docker's listing status does"""
+    minutes, hours = seconds / 60, int(seconds / 3600.0 + 0.5)
+    if seconds < 1:
+        return 'Less than a second'
+    elif seconds < 2:
+        return '1 second'
+    elif minutes < 1:
+        return '{} seconds'.format(seconds)
+    elif minutes == 1:
+        return 'About a minute'
+    elif minutes < 46:
+        return '{} minutes'.format(minutes)
+    elif hours == 1:
+        return 'About an hour'
+    elif hours < 48:
+        return '{} hours'.format(hours)
+    elif hours < 24 * 7 * 2:
+        return '{} days'.format(hours / 24)
+    elif hours < 24 * 30 * 2:
+        return '{} weeks'.format(hours / 24 / 7)
+    elif hours < 24 * 365 * 2:
+        return '{} months'.format(hours / 24 / 30)
+    return '{} years'.format(hours / 24 / 365)
+
+def _uptime(inspection, now=None):
+    """How long the container has been up, worked out from when it last
+    started. The listing's own status text can be as old as the last
+    Docker event the daemon saw, so it isn't used."""
+    state = inspection.get('State', {})
+    if not state.get('Running') or not state.get('StartedAt'):
+        return ''
+    # Docker gives nanoseconds, which strptime can't parse
+    started_at = datetime.datetime.strptime(state['StartedAt'].split('.')[0].rstrip('Z'), '%Y-%m-%dT%H:%M:%S')
+    now = now or datetime.datetime.utcnow()
+    return _human_duration(max(int((now - started_at).total_seconds()), 0))
+
+def _inspect_containers(containers):
+    """Inspects `containers` in parallel, since restart counts and health
+    aren't in a container listing. Returns inspections keyed by Id."""
+    client = get_docker_client()
+    inspections = {}
+    def inspect(container_id):
+        try:
+            inspections[container_id] = client.inspect_container(container_id)
+        except APIError:
+            # Removed since it was listed
+            pass
+    with parallel_task_queue() as queue:
+        for container in containers:
+            queue.enqueue_task(inspect, container['Id'])
+    return inspections
+
+def _status_row(name, spec_type, container, inspections, now=None):
+    if container is None:
+        return [name, spec_type, '', '', '', '']
+    inspection = inspections.get(container['Id'], {})
+    # Health is only reported by Docker 1.12 and later, for containers with a health check
+    health = inspection.get('State', {}).get('Health', {}).get('Status', '')
+    return [name, spec_type, 'X', _uptime(inspection, now), inspection.get('RestartCount', ''), health]
 
-@daemon_command
+@read_only_daemon_command
 def get_dusty_status():
     if not docker_vm_is_running():
         log_to_client('Docker VM is powered off.  You can start it with `dusty up`')
         return
     assembled_specs = get_assembled_specs()
-    table = PrettyTable(["Name", "Type", "Has Active Container"])
-    # Check for Dusty's special nginx container (used for host forwarding)
-    table.add_row([constants.DUSTY_NGINX_NAME, '', 'X' if get_dusty_containers([constants.DUSTY_NGINX_NAME]) != [] else ''])
+    snapshot = get_container_snapshot()
+    # Dusty's special nginx container is used for host forwarding
+    containers = [(constants.DUSTY_NGINX_NAME, '', snapshot.get(constants.DUSTY_NGINX_NAME))]
     for spec in assembled_specs.get_apps_libs_and_services():
-        spec_type = spec.type_singular
-        service_name = spec.name
-        has_activate_container = _has_active_container(spec_type, service_name)
-        table.add_row([service_name, spec_type, 'X' if has_activate_container else ''])
+        # Libs never have containers of their own
+        container = None if spec.type_singular == 'lib' else snapshot.get(spec.name)
+        containers.append((spec.name, spec.type_singular, container))
+    inspections = _inspect_containers([container for _, _, container in containers if container is not None])
+    table = PrettyTable(["Name", "Type", "Has Active Container", "Uptime", "Restarts", "Health"])
+    now = datetime.datetime.utcnow()
+    for name, spec_type, container in containers:
+        table.add_row(_status_row(name, spec_type, container, inspections, now))
     log_to_client(table.get_string(sortby="Type"))
@@ -12,16 +12,16 @@ from ..compiler.compose import get_volume_mounts, get_testing_compose_dict, cont
 from ..systems.docker.testing_image import test_image_exists, create_test_image, update_test_image, test_image_name, ImageCreationError
 from ..systems.docker import get_docker_client
 from ..systems.docker.compose import write_composefile, compose_up
-from ..systems import nfs
+from ..systems import nfs, sync
 from ..systems.virtualbox import initialize_docker_vm
 from ..log import log_to_client
 from ..command_file import make_test_command_files, dusty_command_file_name
 from ..source import Repo
-from ..payload import daemon_command
+from ..payload import daemon_command, read_only_daemon_command
 from ..parallel import parallel_task_queue
 from ..changeset import RepoChangeSet
 
-@daemon_command
+@read_only_daemon_command
 def test_info_for_app_or_lib(app_or_lib_name):
     expanded_specs = get_expanded_libs_specs()
     spec = expanded_specs.get_app_or_lib(app_or_lib_name)
@@ -53,7 +53,7 @@ def _get_suite_spec(app_or_lib_name, suite_name):
             return suite_spec
     raise RuntimeError('Suite {} not found for {}'.format(suite_name, app_or_lib_name))
 
-@daemon_command
+@read_only_daemon_command
 def ensure_valid_suite_name(app_or_lib_name, suite_name):
     _get_suite_spec(app_or_lib_name, suite_name)
 
@@ -65,7 +65,9 @@ def setup_for_test(app_or_lib_name, pull_repos=False, force_recreate=False):
     if pull_repos:
         _update_test_repos(app_or_lib_name)
     spec = expanded_specs.get_app_or_lib(app_or_lib_name)
-    nfs.update_nfs_with_repos(get_same_container_repos_from_spec(spec))
+    repos = get_same_container_repos_from_spec(spec)
+    nfs.update_nfs_with_repos(repos)
+    sync.sync_repos(repos)
     ensure_current_image(app_or_lib_name, force_recreate)
 
 def ensure_current_image(app_or_lib_name, force_recreate):
@@ -83,24 +85,44 @@ def run_one_suite(app_or_lib_name, suite_name, test_arguments):
     log_to_client('TESTS {} {}'.format(suite_name, 'FAILED' if exit_code != 0 else 'PASSED'))
     sys.exit(exit_code)
 
-def run_all_suites(app_or_lib_name):
+def _run_suite(app_or_lib_name, suite_name, results):
+    log_prefix = '[{}] '.format(suite_name)
+    log_to_client('{}Running test {}'.format(log_prefix, suite_name))
+    start_time = time.time()
+    try:
+        test_result = _run_tests_with_image(app_or_lib_name, suite_name, None, log_prefix=log_prefix)
+        result_str = 'FAIL' if test_result else 'PASS'
+    except Exception as e:
+        log_to_client('{}{}'.format(log_prefix, e.message or str(e)))
+        test_result, result_str = 1, 'ERROR'
+    results[suite_name] = (test_result, result_str, time.time() - start_time)
+    log_to_client('{}TESTS {}'.format(log_prefix, 'FAILED' if test_result != 0 else 'PASSED'))
+
+def run_all_suites(app_or_lib_name, workers):
+    """Runs every suite of `app_or_lib_name`, up to `workers` of them at
+    once. Each suite has its own compose project and files, so suites
+    running together don't touch each other's containers."""
     spec = get_expanded_libs_specs().get_app_or_lib(app_or_lib_name)
+    suite_specs = spec['test']['suites']
+
+    start_time = time.time()
+    results = {}
+    with parallel_task_queue(pool_size=workers) as queue:
+        for suite_spec in suite_specs:
+            queue.enqueue_task(_run_suite, app_or_lib_name, suite_spec['name'], results)
+    wall_time = time.time() - start_time
 
     summary_table = PrettyTable(['Suite', 'Description', 'Result', 'Time (s)'])
     exit_code = 0
-
-    for suite_spec in spec['test']['suites']:
-        log_to_client('Running test {}'.format(suite_spec['name']))
-        start_time = time.time()
-
-        test_result = _run_tests_with_image(app_or_lib_name, suite_spec['name'], None)
-
-        result_str = 'FAIL' if test_result else 'PASS'
-        elapsed_time = "{0:.1f}".format(time.time() - start_time)
-        summary_table.add_row([suite_spec['name'], suite_spec['description'], result_str, elapsed_time])
+    for suite_spec in suite_specs:
+        test_result, result_str, elapsed_time = results[suite_spec['name']]
+        summary_table.add_row([suite_spec['name'], suite_spec['description'], result_str, "{0:.1f}".format(elapsed_time)])
         exit_code |= test_result
+    serial_time = sum(elapsed_time for _, _, elapsed_time in results.itervalues())
 
     log_to_client(summary_table.get_string())
+    log_to_client('Ran {} suites in {:.1f}s, up to {} at a time ({:.1f}s if run one after another, {:.1f}s saved)'.format(
+        len(suite_specs), wall_time, workers, serial_time, max(serial_time - wall_time, 0)))
     log_to_client('TESTS {}'.format('FAILED' if exit_code != 0 else 'PASSED'))
     sys.exit(exit_code)
 
@@ -110,8 +132,9 @@ def _construct_test_command(app_or_lib_name, suite_name, test_arguments):
         test_arguments = suite_spec['default_args'].split(' ')
     return 'sh {}/{} {}'.format(constants.CONTAINER_COMMAND_FILES_DIR, dusty_command_file_name(app_or_lib_name, test_name=suite_name), ' '.join(test_arguments))
 
-def _test_composefile_path(service_name):
-    return os.path.expanduser('~/.dusty-testing/test_{}.yml'.format(service_name))
+def _test_composefile_path(project_name, service_name):
+    # Keyed by project as well, so that suites running at once don't overwrite each other's files
+    return os.path.expanduser('~/.dusty-testing/{}/test_{}.yml'.format(project_name, service_name))
 
 def _compose_project_name(service_name, suite_name):
     # Suite names should be able to have underscores. docker-compose does not allow project name to have underscores
@@ -126,11 +149,12 @@ def _services_compose_up(expanded_specs, app_or_lib_name, services, suite_name):
             kwargs['net_container_identifier'] = previous_container_names[-1]
         service_compose_config = get_testing_compose_dict(service_name, service_spec.plain_dict(), **kwargs)
 
-        composefile_path = _test_composefile_path(service_name)
+        project_name = _compose_project_name(app_or_lib_name, suite_name)
+        composefile_path = _test_composefile_path(project_name, service_name)
         write_composefile(service_compose_config, composefile_path)
 
-        compose_up(composefile_path, _compose_project_name(app_or_lib_name, suite_name), quiet=True)
-        previous_container_names.append("{}_{}_1".format(_compose_project_name(app_or_lib_name, suite_name), service_name))
+        compose_up(composefile_path, project_name, quiet=True)
+        previous_container_names.append("{}_{}_1".format(project_name, service_name))
     return previous_container_names
 
 def _app_or_lib_compose_up(test_suite_compose_spec, app_or_lib_name, app_or_lib_volumes, test_command, previous_container_name, suite_name):
@@ -141,13 +165,14 @@ def _app_or_lib_compose_up(test_suite_compose_spec, app_or_lib_name, app_or_lib_
 
     if previous_container_name is not None:
         kwargs['net_container_identifier'] = previous_container_name
-    composefile_path = _test_composefile_path(app_or_lib_name)
+    project_name = _compose_project_name(app_or_lib_name, suite_name)
+    composefile_path = _test_composefile_path(project_name, app_or_lib_name)
     compose_config = get_testing_compose_dict(app_or_lib_name, test_suite_compose_spec, **kwargs)
     write_composefile(compose_config, composefile_path)
-    compose_up(composefile_path, _compose_project_name(app_or_lib_name, suite_name), quiet=True)
-    return '{}_{}_1'.format(_compose_project_name(app_or_lib_name, suite_name), app_or_lib_name)
+    compose_up(composefile_path, project_name, quiet=True)
+    return '{}_{}_1'.format(project_name, app_or_lib_name)
 
-def _run_tests_with_image(app_or_lib_name, suite_name, test_arguments):
+def _run_tests_with_image(app_or_lib_name, suite_name, test_arguments, log_prefix=''):
     client = get_docker_client()
     expanded_specs = get_expanded_libs_specs()
     suite_spec = _get_suite_spec(app_or_lib_name, suite_name)
@@ -159,13 +184,14 @@ def _run_tests_with_image(app_or_lib_name, suite_name, test_arguments):
     test_container_name = _app_or_lib_compose_up(suite_spec['compose'], app_or_lib_name,
                                                  volumes, test_command, previous_container_name, suite_name)
 
-    for line in client.logs(test_container_name, stdout=True, stderr=True, stream=True):
-        log_to_client(line.strip())
+    for chunk in client.logs(test_container_name, stdout=True, stderr=True, stream=True):
+        for line in chunk.strip().splitlines():
+            log_to_client('{}{}'.format(log_prefix, line))
     exit_code = client.wait(test_container_name)
     client.remove_container(container=test_container_name, v=True)
 
     for service_container in previous_container_names:
-        log_to_client('Killing service container {}'.format(service_container))
+        log_to_client('{}Killing service container {}'.format(log_prefix, service_container))
         client.kill(service_container)
         client.remove_container(container=service_container, v=True)
     return exit_code
@@ -1,14 +1,14 @@
-from copy import copy
 import os
 
 from schemer import ValidationException
 
 from ..compiler.spec_assembler import get_specs_path, get_specs_from_path
+from ..compiler.dependency_graph import DependencyGraph
 from ..log import log_to_client
 from ..schemas import app_schema, bundle_schema, lib_schema
 from ..schemas.base_schema_class import notifies_validation_exception
 from .. import constants
-from ..payload import daemon_command
+from ..payload import read_only_daemon_command
 
 def _check_bare_minimum(specs):
     if not specs.get('bundles'):
@@ -66,19 +66,12 @@ def _validate_spec_names(specs):
     for lib in specs['libs'].values():
         _validate_lib_references(lib, specs)
 
-def _cycle_check(spec, specs, upstream):
-    for dependent in spec['depends'][spec.spec_type]:
-        if dependent in upstream:
-            raise ValidationException("Cycle found for {0} {1}.  Upstream: {2}".format(spec.type_singular, spec.name, upstream))
-        else:
-            new_upstream = copy(upstream)
-            new_upstream.add(dependent)
-            _cycle_check(specs[spec.spec_type][dependent], specs, new_upstream)
-
 def _validate_cycle_free(specs):
+    graph = DependencyGraph(specs)
     for spec_type in ['apps', 'libs']:
-        for spec in specs[spec_type].values():
-            _cycle_check(spec, specs, set([spec.name]))
+        cycle = graph.find_cycle(spec_type)
+        if cycle:
+            raise ValidationException("Cycle found for {0} {1}.  Cycle: {2}".format(spec_type.rstrip('s'), cycle[0], ' -> '.join(cycle)))
 
 def validate_specs_from_path(specs_path):
     """
@@ -100,7 +93,7 @@ def validate_specs_from_path(specs_path):
     _validate_cycle_free(specs)
     log_to_client("Validation Complete!")
 
-@daemon_command
+@read_only_daemon_command
 def validate_specs():
     """
     Validates specs using the path configured in Dusty's configuration
@@ -1,7 +1,7 @@
 from ..constants import VERSION
 from ..log import log_to_client
-from ..payload import daemon_command
+from ..payload import read_only_daemon_command
 
-@daemon_command
+@read_only_daemon_command
 def version():
     log_to_client('Dusty daemon version: {}'.format(VERSION))
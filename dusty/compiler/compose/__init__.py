@@ -8,6 +8,7 @@ from ..spec_assembler import get_assembled_specs
 from ...path import vm_cp_path
 from ... import constants
 from ...config import get_env_config
+from ...schemas.base_schema_class import to_plain
 from ...command_file import dusty_command_file_name
 from .common import container_code_path, get_volume_mounts, get_app_volume_mounts, get_lib_volume_mounts
 
@@ -99,7 +100,7 @@ def _composed_app_dict(app_name, assembled_specs, port_specs):
     """ This function returns a dictionary of the docker-compose.yml specifications for one app """
     logging.info("Compose Compiler: Compiling dict for app {}".format(app_name))
     app_spec = assembled_specs['apps'][app_name]
-    compose_dict = app_spec["compose"]
+    compose_dict = to_plain(app_spec["compose"])
     _apply_env_overrides(env_overrides_for_app_or_service(app_name), compose_dict)
     if 'image' in app_spec and 'build' in app_spec:
         raise RuntimeError("image and build are both specified in the spec for {}".format(app_name))
@@ -0,0 +1,157 @@
+"""Index of the dependencies declared between specs.
+
+Apps can depend on apps, libs and services, and libs can depend on libs.
+The graph is built once for a set of specs, and the transitive closures
+answering "everything X depends on" are memoized as they are computed,
+so shared (diamond-shaped) dependencies are only ever walked once."""
+
+import collections
+
+GRAPH_SPEC_TYPES = ('apps', 'libs')
+DEPENDENCY_TYPES = ('apps', 'libs', 'services')
+
+class DependencyCycle(Exception):
+    def __init__(self, spec_type, cycle):
+        self.spec_type = spec_type
+        self.cycle = cycle
+        super(DependencyCycle, self).__init__('Cycle found in {} dependencies: {}'.format(spec_type, ' -> '.join(cycle)))
+
+class DependencyGraph(object):
+    def __init__(self, specs):
+        self._names = {}
+        self._edges = {}
+        self._reverse_edges = collections.defaultdict(lambda: collections.defaultdict(set))
+        self._closures = {}
+        for spec_type in GRAPH_SPEC_TYPES:
+            self._names[spec_type] = set(specs.get(spec_type, {}).keys())
+            for name, spec in specs.get(spec_type, {}).iteritems():
+                depends = spec.get('depends') or {}
+                edges = {dependency_type: list(depends.get(dependency_type) or [])
+                         for dependency_type in DEPENDENCY_TYPES}
+                self._edges[(spec_type, name)] = edges
+                for dependency_type, dependency_names in edges.iteritems():
+                    for dependency_name in dependency_names:
+                        self._reverse_edges[(dependency_type, dependency_name)][spec_type].add(name)
+
+    def contains(self, spec_type, name):
+        return name in self._names.get(spec_type, ())
+
+    def direct_dependencies(self, dependency_type, name, spec_type):
+        """Names of everything of `dependency_type` which the spec `name`
+        of `spec_type` lists directly in its depends"""
+        if (spec_type, name) not in self._edges:
+            raise RuntimeError("{} {} was referenced but not found".format(spec_type, name))
+        return self._edges[(spec_type, name)][dependency_type]
+
+    def dependencies(self, dependency_type, name, spec_type):
+        """Names of everything of `dependency_type` which the spec `name`
+        of `spec_type` depends on, directly or indirectly"""
+        key = (dependency_type, spec_type, name)
+        if key not in self._closures:
+            direct = self.direct_dependencies(dependency_type, name, spec_type)
+            closure = set(direct)
+            if dependency_type in GRAPH_SPEC_TYPES:
+                for dependency_name in direct:
+                    closure |= self._same_type_closure(dependency_type, dependency_name)
+            self._closures[key] = frozenset(closure)
+        return set(self._closures[key])
+
+    def _same_type_closure(self, spec_type, name):
+        key = (spec_type, spec_type, name)
+        if key not in self._closures:
+            is_closed = lambda name: (spec_type, spec_type, name) in self._closures
+            for ordered_name in self._post_order(spec_type, name, is_closed, self._direct_same_type):
+                closure = set(self._direct_same_type(spec_type, ordered_name))
+                for dependency_name in list(closure):
+                    closure |= self._closures[(spec_type, spec_type, dependency_name)]
+                self._closures[(spec_type, spec_type, ordered_name)] = frozenset(closure)
+        return self._closures[key]
+
+    def _post_order(self, spec_type, root, is_done, dependencies_of):
+        """Depth-first walk from `root` returning the names it reaches,
+        each one after all of its dependencies. Names for which `is_done`
+        is true are not walked into. Raises DependencyCycle."""
+        order, finished = [], set()
+        path, on_path = [root], set([root])
+        stack = [iter(dependencies_of(spec_type, root))]
+        while stack:
+            for dependency_name in stack[-1]:
+                if dependency_name in finished or is_done(dependency_name):
+                    continue
+                if dependency_name in on_path:
+                    raise DependencyCycle(spec_type, path[path.index(dependency_name):] + [dependency_name])
+                path.append(dependency_name)
+                on_path.add(dependency_name)
+                stack.append(iter(dependencies_of(spec_type, dependency_name)))
+                break
+            else:
+                stack.pop()
+                name = path.pop()
+                on_path.discard(name)
+                finished.add(name)
+                order.append(name)
+        return order
+
+    def topological_order(self, spec_type):
+        """All specs of `spec_type` (apps or libs) ordered so that each one
+        comes after everything of the same type it depends on.
+        Raises DependencyCycle."""
+        order = []
+        ordered = set()
+        for name in sorted(self._names[spec_type]):
+            if name not in ordered:
+                newly_ordered = self._post_order(spec_type, name, ordered.__contains__, self._direct_same_type)
+                ordered.update(newly_ordered)
+                order.extend(newly_ordered)
+        return order
+
+    def find_cycle(self, spec_type):
+        """Returns a list of names making up a dependency cycle among specs of
+        `spec_type`, starting and ending with the same name, or None. References
+        to specs which don't exist are ignored here; validation reports those."""
+        done = set()
+        for name in sorted(self._names[spec_type]):
+            if name not in done:
+                try:
+                    done.update(self._post_order(spec_type, name, done.__contains__, self._existing_dependencies))
+                except DependencyCycle as e:
+                    return e.cycle
+        return None
+
+    def _direct_same_type(self, spec_type, name):
+        return self.direct_dependencies(spec_type, name, spec_type)
+
+    def _existing_dependencies(self, spec_type, name):
+        return [dependency_name for dependency_name in self._edges[(spec_type, name)][spec_type]
+                if self.contains(spec_type, dependency_name)]
+
+    def direct_dependents(self, spec_type, name):
+        """Returns a dict of the apps and libs which list `name` of
+        `spec_type` directly in their depends"""
+        return {dependent_type: set(self._reverse_edges[(spec_type, name)][dependent_type])
+                for dependent_type in GRAPH_SPEC_TYPES}
+
+    def dependents(self, spec_type, name):
+        """Returns a dict of the apps and libs which depend on `name` of
+        `spec_type`, directly or indirectly"""
+        found = {dependent_type: set() for dependent_type in GRAPH_SPEC_TYPES}
+        to_visit = [(spec_type, name)]
+        while to_visit:
+            current = to_visit.pop()
+            for dependent_type, dependent_names in self._reverse_edges[current].iteritems():
+                for dependent_name in dependent_names:
+                    if dependent_name not in found[dependent_type]:
+                        found[dependent_type].add(dependent_name)
+                        to_visit.append((dependent_type, dependent_name))
+        return found
+
+def get_dependency_graph(specs):
+    """Returns the DependencyGraph of `specs`, building it the first time
+    it is asked for. DustySpecs hold on to their graph, so it is shared by
+    every caller (and every overlay) using the same specs."""
+    graph = getattr(specs, 'dependency_graph', None)
+    if graph is None:
+        graph = DependencyGraph(specs)
+        if hasattr(specs, 'dependency_graph'):
+            specs.dependency_graph = graph
+    return graph
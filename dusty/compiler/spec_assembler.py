@@ -3,25 +3,19 @@ import logging
 from ..config import get_config_value
 from .. import constants
 from ..memoize import memoized
-from ..source import Repo
+from ..source import Repo, RepoIndex
 from ..schemas.app_schema import app_schema
 from ..schemas.bundle_schema import bundle_schema
 from ..schemas.lib_schema import lib_schema
 from ..schemas.base_schema_class import DustySchema, DustySpecs
+from .dependency_graph import get_dependency_graph
 
 def _get_dependent(dependent_type, name, specs, root_spec_type):
     """
     Returns everything of type <dependent_type> that <name>, of type <root_spec_type> depends on
     Names only are returned in a set
     """
-    spec = specs[root_spec_type].get(name)
-    if spec is None:
-        raise RuntimeError("{} {} was referenced but not found".format(root_spec_type, name))
-    dependents = spec['depends'][dependent_type]
-    all_dependents = set(dependents)
-    for dep in dependents:
-        all_dependents |= _get_dependent(dependent_type, dep, specs, dependent_type)
-    return all_dependents
+    return get_dependency_graph(specs).dependencies(dependent_type, name, root_spec_type)
 
 def _get_active_bundles(specs):
     return set(get_config_value(constants.CONFIG_BUNDLES_KEY))
@@ -30,30 +24,33 @@ def _get_referenced_apps(specs):
     """
     Returns a set of all apps that are required to run any bundle in specs[constants.CONFIG_BUNDLES_KEY]
     """
+    graph = get_dependency_graph(specs)
     activated_bundles = specs[constants.CONFIG_BUNDLES_KEY].keys()
     all_active_apps = set()
     for active_bundle in activated_bundles:
         bundle_spec = specs[constants.CONFIG_BUNDLES_KEY].get(active_bundle)
         for app_name in bundle_spec['apps']:
             all_active_apps.add(app_name)
-            all_active_apps |= _get_dependent('apps', app_name, specs, 'apps')
+            all_active_apps |= graph.dependencies('apps', app_name, 'apps')
     return all_active_apps
 
 def _expand_libs_in_apps(specs):
     """
     Expands specs.apps.depends.libs to include any indirectly required libs
     """
+    graph = get_dependency_graph(specs)
     for app_name, app_spec in specs['apps'].iteritems():
         if 'depends' in app_spec and 'libs' in app_spec['depends']:
-            app_spec['depends']['libs'] = _get_dependent('libs', app_name, specs, 'apps')
+            app_spec['depends']['libs'] = graph.dependencies('libs', app_name, 'apps')
 
 def _expand_libs_in_libs(specs):
     """
     Expands specs.libs.depends.libs to include any indirectly required libs
     """
+    graph = get_dependency_graph(specs)
     for lib_name, lib_spec in specs['libs'].iteritems():
         if 'depends' in lib_spec and 'libs' in lib_spec['depends']:
-            lib_spec['depends']['libs'] = _get_dependent('libs', lib_name, specs, 'libs')
+            lib_spec['depends']['libs'] = graph.dependencies('libs', lib_name, 'libs')
 
 def _get_referenced_libs(specs):
     """
@@ -126,15 +123,22 @@ def _get_expanded_libs_specs(specs):
     _expand_libs_in_apps(specs)
     _expand_libs_in_libs(specs)
 
+def _overlay_specs_with_graph():
+    """Builds the dependency graph of the current specs before overlaying
+    them, so that every overlay made during a request shares it"""
+    specs = get_specs()
+    get_dependency_graph(specs)
+    return specs.overlay()
+
 @memoized
 def get_assembled_specs():
     logging.debug("Spec Assembler: running...")
-    specs = get_specs()
+    specs = _overlay_specs_with_graph()
     _get_expanded_active_specs(specs)
     return specs
 
 def get_expanded_libs_specs():
-    specs = get_specs()
+    specs = _overlay_specs_with_graph()
     _get_expanded_libs_specs(specs)
     return specs
 
@@ -161,15 +165,39 @@ def get_repo_of_app_or_library(app_or_library_name):
 def get_specs_from_path(specs_path):
     return DustySpecs(specs_path)
 
-def get_all_repos(active_only=False, include_specs_repo=True):
-    repos = set()
+@memoized
+def get_repo_index(active_only=False, include_specs_repo=True):
+    """Returns a RepoIndex of every repo used by the specs, mapping each one
+    to the apps and libs whose containers mount it: the spec's own repo plus
+    the repos of every lib it depends on, directly or indirectly"""
+    index = RepoIndex()
     if include_specs_repo:
-        repos.add(get_specs_repo())
+        index.add(get_specs_repo())
     specs = get_assembled_specs() if active_only else get_specs()
+    graph = get_dependency_graph(specs)
     for spec in specs.get_apps_and_libs():
+        mounted_by = {spec.spec_type: [spec.name]}
         if spec['repo']:
-            repos.add(Repo(spec['repo']))
-    return repos
+            index.add(Repo(spec['repo']), **mounted_by)
+        for lib_name in graph.dependencies('libs', spec.name, spec.spec_type):
+            lib_repo = specs['libs'][lib_name]['repo']
+            if lib_repo:
+                index.add(Repo(lib_repo), **mounted_by)
+    return index
+
+def get_all_repos(active_only=False, include_specs_repo=True):
+    return get_repo_index(active_only=active_only, include_specs_repo=include_specs_repo).repos
+
+@memoized
+def get_spec_nfs_mount_profiles():
+    """Returns the NFS mount profile app and lib specs ask for their repos
+    to be mounted with, keyed by repo. If specs sharing a repo disagree,
+    the first spec by name wins, whether it is an app or a lib."""
+    profiles = {}
+    for spec in sorted(get_specs().get_apps_and_libs(), key=lambda spec: (spec.name, spec.spec_type)):
+        if spec['repo'] and spec.get('nfs_profile'):
+            profiles.setdefault(Repo(spec['repo']).remote_path, spec['nfs_profile'])
+    return profiles
 
 def get_same_container_repos_from_spec(app_or_library_spec):
     """Given the spec of an app or library, returns all repos that are guaranteed
@@ -178,13 +206,13 @@ def get_same_container_repos_from_spec(app_or_library_spec):
     app_or_lib_repo = get_repo_of_app_or_library(app_or_library_spec.name)
     if app_or_lib_repo is not None:
         repos.add(app_or_lib_repo)
-    for dependent_name in app_or_library_spec['depends']['libs']:
+    graph = get_dependency_graph(get_specs())
+    for dependent_name in graph.dependencies('libs', app_or_library_spec.name, app_or_library_spec.spec_type):
         repos.add(get_repo_of_app_or_library(dependent_name))
     return repos
 
 def get_same_container_repos(app_or_library_name):
     """Given the name of an app or library, returns all repos that are guaranteed
     to live in the same container"""
-    specs = get_expanded_libs_specs()
-    spec = specs.get_app_or_lib(app_or_library_name)
+    spec = get_specs().get_app_or_lib(app_or_library_name)
     return get_same_container_repos_from_spec(spec)
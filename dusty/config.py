@@ -8,14 +8,20 @@ import os
 import logging
 import pwd
 import subprocess
+import tempfile
+import threading
 import yaml
 import platform
-
-import psutil
+from copy import deepcopy
 
 from . import constants
 from .warnings import daemon_warnings
 
+# Held across any read-modify-write of the config, so that concurrent
+# writers (e.g. RepoChangeSet.update running in parallel threads) can't
+# lose each other's changes
+config_lock = threading.RLock()
+
 def _load(filepath):
     with open(filepath, 'r') as f:
         return yaml.load(f.read())
@@ -23,6 +29,57 @@ def _load(filepath):
 def _dump(doc):
     return yaml.dump(doc, default_flow_style=False)
 
+def _file_signature(filepath):
+    stat = os.stat(filepath)
+    return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+def _write_atomically(filepath, contents):
+    """Write to a temp file alongside `filepath`, then rename it into place,
+    so readers only ever see the complete old or complete new file."""
+    directory = os.path.dirname(filepath) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.{}.'.format(os.path.basename(filepath)))
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(contents)
+            f.flush()
+            os.fsync(f.fileno())
+        mode = os.stat(filepath).st_mode & 0o777 if os.path.exists(filepath) else 0o644
+        os.chmod(temp_path, mode)
+        os.rename(temp_path, filepath)
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class _ConfigStore(object):
+    """Keeps the parsed config in memory. The file is only re-read when
+    its inode, size or mtime change, which covers both our own atomic
+    writes and anybody editing the file by hand."""
+    def __init__(self):
+        self._path = None
+        self._signature = None
+        self._config = None
+
+    def load(self, filepath):
+        with config_lock:
+            signature = _file_signature(filepath)
+            if filepath != self._path or signature != self._signature:
+                self._config = _load(filepath)
+                self._path, self._signature = filepath, signature
+            return deepcopy(self._config)
+
+    def save(self, filepath, config):
+        with config_lock:
+            _write_atomically(filepath, _dump(config))
+            self._path, self._signature = filepath, _file_signature(filepath)
+            self._config = deepcopy(config)
+
+    def reset(self):
+        with config_lock:
+            self._path = self._signature = self._config = None
+
+_store = _ConfigStore()
+
 def write_default_config():
     default_config = {constants.CONFIG_BUNDLES_KEY: [],
                       constants.CONFIG_REPO_OVERRIDES_KEY: {},
@@ -32,11 +89,10 @@ def write_default_config():
     save_config(default_config)
 
 def get_config():
-    return _load(constants.CONFIG_PATH)
+    return _store.load(constants.CONFIG_PATH)
 
 def save_config(config):
-    with open(constants.CONFIG_PATH, 'w') as f:
-        f.write(_dump(config))
+    _store.save(constants.CONFIG_PATH, config)
 
 def get_config_value(key):
     return get_config().get(key)
@@ -44,18 +100,23 @@ def get_config_value(key):
 def get_env_config():
     return get_config_value(constants.CONFIG_ENV_KEY) or {}
 
+def get_repo_sync_methods():
+    return get_config_value(constants.CONFIG_REPO_SYNC_METHODS_KEY) or {}
+
+def get_nfs_mount_profiles():
+    return get_config_value(constants.CONFIG_NFS_MOUNT_PROFILES_KEY) or {}
+
 def save_config_value(key, value):
-    current_config = get_config()
-    current_config[key] = value
-    if key == constants.CONFIG_MAC_USERNAME_KEY:
-        verify_mac_username(value)
+    with config_lock:
+        current_config = get_config()
+        current_config[key] = value
+        if key == constants.CONFIG_REPO_OVERRIDES_KEY:
+            verify_overrides_without_colons(current_config)
+        elif key == constants.CONFIG_MAC_USERNAME_KEY:
+            verify_mac_username(value)
         save_config(current_config)
+    if key == constants.CONFIG_MAC_USERNAME_KEY:
         check_and_load_ssh_auth()
-    elif key == constants.CONFIG_REPO_OVERRIDES_KEY:
-        verify_overrides_without_colons(current_config)
-        save_config(current_config)
-    else:
-        save_config(current_config)
 
 def verify_overrides_without_colons(current_config):
     for local_path in current_config[constants.CONFIG_REPO_OVERRIDES_KEY].itervalues():
@@ -99,6 +160,7 @@ def _load_ssh_auth_pre_yosemite():
     in Yosemite doesn't work, since it gets routed to the wrong launchd. We instead need
     to find the running ssh-agent process and use its PID to navigate ourselves
     to the correct launchd."""
+    import psutil # only needed on the daemon, keep it out of client startup
     for process in psutil.process_iter():
         if process.name() == 'ssh-agent':
             ssh_auth_sock = subprocess.check_output(['launchctl', 'bsexec', str(process.pid), 'launchctl', 'getenv', 'SSH_AUTH_SOCK']).rstrip()
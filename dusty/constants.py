@@ -12,10 +12,6 @@ DUSTY_CONFIG_END = '# END section for Dusty\n'
 DUSTY_CONFIG_REGEX = re.compile('\\{}.*\\{}'.format(DUSTY_CONFIG_BEGIN, DUSTY_CONFIG_END), flags=re.DOTALL | re.MULTILINE)
 DUSTY_CONFIG_GROUP_REGEX = re.compile('.*\\{}(?P<dusty_config>.*)\\{}.*'.format(DUSTY_CONFIG_BEGIN, DUSTY_CONFIG_END), flags=re.DOTALL | re.MULTILINE)
 
-SOCKET_ACK = '\1\1'
-SOCKET_TERMINATOR = '\0\0'
-SOCKET_ERROR_TERMINATOR = '\0\1'
-
 SOCKET_LOGGER_NAME = 'socket_logger'
 
 RUN_DIR = '/var/run/dusty'
@@ -29,17 +25,24 @@ CONFIG_PATH = os.path.join(CONFIG_DIR, 'config.yml')
 REPOS_DIR = os.path.join(CONFIG_DIR, 'repos')
 COMPOSE_DIR = os.path.join(CONFIG_DIR, 'compose')
 COMPOSEFILE_PATH = os.path.join(COMPOSE_DIR, 'docker-compose.yml')
+UP_STATE_PATH = os.path.join(COMPOSE_DIR, 'up_state.json')
+PROFILE_HISTORY_PATH = os.path.join(CONFIG_DIR, 'profile_history.json')
 COMMAND_FILES_DIR = os.path.join(CONFIG_DIR, 'commands')
 
 DUSTY_GITHUB_PATH = 'gamechanger/dusty'
 DUSTY_BINARY_NAME = 'dusty'
 
 VM_MACHINE_NAME = 'dusty'
+# Kept short, since unix socket paths are limited to ~100 characters on OS X
+# Holds a directory of SSH control sockets for each user who runs ssh to the VM
+VM_SSH_CONTROL_DIR = os.path.join(RUN_DIR, 'ssh')
+VM_SSH_CONTROL_PERSIST = '10m'
 VM_IP_FROM_DOCKER = '172.17.42.1'
 VM_NIC_TYPE = 'Am79C973'
 
 VM_PERSIST_DIR = '/persist'
 VM_REPOS_DIR = '/dusty_repos'
+VM_SYNCED_REPOS_DIR = os.path.join(VM_PERSIST_DIR, 'dusty_synced_repos')
 LOCAL_BACKUP_DIR = 'dusty-backup'
 
 VM_ASSETS_DIR = os.path.join(VM_PERSIST_DIR, 'dusty_assets')
@@ -109,6 +112,9 @@ CONFIG_SETUP_KEY = 'setup_has_run'
 CONFIG_ENV_KEY = 'dusty_env_overrides'
 CONFIG_VM_MEM_SIZE = 'vm_memory_size'
 CONFIG_CHANGESET_KEY = 'changeset'
+CONFIG_REPO_SYNC_METHODS_KEY = 'repo_sync_methods'
+CONFIG_NFS_MOUNT_PROFILES_KEY = 'nfs_mount_profiles'
+CONFIG_CONTAINER_ENGINE_KEY = 'container_engine'
 CHANGESET_TESTING_KEY = 'testing_image'
 
 CONFIG_SETTINGS = {
@@ -119,6 +125,33 @@ CONFIG_SETTINGS = {
     CONFIG_SETUP_KEY: 'Key indicating if you have run the required command `dusty setup`',
     CONFIG_VM_MEM_SIZE: 'Specifies how much memory (in megabytes) you want your Docker VM to have',
     CONFIG_ENV_KEY: 'Environment overrides for apps and services that are specified with `dusty env`',
+    CONFIG_CONTAINER_ENGINE_KEY: 'How Dusty starts, stops and removes containers. "compose" (the default) runs Docker Compose; "api" drives the Docker API directly, starting containers in parallel and leaving unchanged ones alone',
+}
+
+CONTAINER_ENGINE_COMPOSE = 'compose'
+CONTAINER_ENGINE_API = 'api'
+CONTAINER_ENGINES = [CONTAINER_ENGINE_COMPOSE, CONTAINER_ENGINE_API]
+
+SYNC_METHOD_NFS = 'nfs'
+SYNC_METHOD_RSYNC = 'rsync'
+SYNC_METHODS = [SYNC_METHOD_NFS, SYNC_METHOD_RSYNC]
+# Changes to rsync-synced repos are batched up for this many seconds before being synced
+SYNC_BATCH_DELAY = 0.5
+# How often repos are scanned for changes if watchdog can't be imported
+SYNC_POLL_INTERVAL = 2
+
+# Options repos can be mounted into the VM with over NFS. A repo's profile is
+# set with `dusty repos nfs-profile`, or by the `nfs_profile` of its app or lib spec
+NFS_DEFAULT_MOUNT_PROFILE = 'default'
+NFS_MOUNT_PROFILES = {
+    NFS_DEFAULT_MOUNT_PROFILE: ['async', 'udp', 'noatime'],
+    # Larger reads and writes over TCP, for repos with big files
+    'tcp': ['async', 'tcp', 'noatime', 'rsize=65536', 'wsize=65536'],
+    # Caches file attributes for longer, for repos with many small files
+    'cached': ['async', 'tcp', 'noatime', 'rsize=65536', 'wsize=65536', 'actimeo=30'],
+    # Also skips revalidating files when they are opened, for repos which
+    # are rarely edited while containers are running, such as libs
+    'read-mostly': ['async', 'tcp', 'noatime', 'rsize=65536', 'wsize=65536', 'actimeo=60', 'nocto'],
 }
 
 WARN_ON_MISSING_CONFIG_KEYS = [CONFIG_MAC_USERNAME_KEY, CONFIG_SPECS_REPO_KEY, CONFIG_VM_MEM_SIZE]
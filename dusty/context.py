@@ -0,0 +1,36 @@
+"""State scoped to a single client request handled by the daemon.
+
+The daemon serves each client connection on its own thread. Anything
+which must not leak between concurrently running requests (the client
+connection, the socket log handler, the memoize cache) lives on the
+RequestContext bound to the current thread. Worker threads started on
+behalf of a request, e.g. by the parallel TaskQueue, bind the context
+of the request which spawned them."""
+
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+class RequestContext(object):
+    def __init__(self, connection=None):
+        self.connection = connection
+        self.log_handler = None
+        self.memoize_cache = {}
+        self.profile = None
+
+def current_context():
+    """Return the RequestContext bound to this thread, or None if
+    we are not currently serving a request (e.g. in the client)."""
+    return getattr(_local, 'context', None)
+
+@contextmanager
+def bound_context(context):
+    """Bind `context` to the current thread for the duration of the
+    block, restoring whatever was bound before on exit."""
+    previous = current_context()
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
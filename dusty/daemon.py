@@ -11,19 +11,29 @@ Options:
 import os
 import logging
 import socket
+import threading
 
 from docopt import docopt
 
 from .preflight import preflight_check, refresh_preflight_warnings
-from .log import configure_logging, make_socket_logger, close_socket_logger
-from .constants import SOCKET_PATH, SOCKET_ACK, SOCKET_TERMINATOR, SOCKET_ERROR_TERMINATOR
-from .payload import Payload, get_payload_function, init_yaml_constructor
+from .log import configure_logging, make_socket_logger, close_socket_logger, log_to_client
+from .constants import SOCKET_PATH
+from .context import RequestContext, current_context, bound_context
+from .payload import Payload, get_payload_function, init_yaml_constructor, is_read_only_command
+from .protocol import (send_frame, send_exit_frame, recv_frame, ProtocolError,
+                       FRAME_ACK, FRAME_REQUEST, FRAME_WARNING, FRAME_ERROR)
 from .memoize import reset_memoize_cache
 from .warnings import daemon_warnings
 from .config import refresh_config_warnings, check_and_load_ssh_auth
+from .commands import import_all_command_modules
+from .systems import virtualbox
+from .systems.docker import container_state
 from . import constants
 
-connection = None
+# Commands which change Dusty's state (config, VM, containers) run one at a time
+mutating_command_lock = threading.Lock()
+# Warning refreshes and the SSH_AUTH_SOCK lookup touch process-wide state
+_pre_command_lock = threading.Lock()
 
 def clean_up_socket():
     _clean_up_existing_socket(SOCKET_PATH)
@@ -37,7 +47,7 @@ def _clean_up_existing_socket(socket_path):
 
 def _send_warnings_to_client(connection, suppress_warnings):
     if daemon_warnings.has_warnings and not suppress_warnings:
-        connection.sendall("{}\n".format(daemon_warnings.pretty()))
+        send_frame(connection, FRAME_WARNING, "{}\n".format(daemon_warnings.pretty()))
 
 def _get_payload_function_data(payload):
     return get_payload_function(payload['fn_key']), payload['args'], payload['kwargs']
@@ -48,21 +58,76 @@ def _refresh_warnings():
         refresh_preflight_warnings()
 
 def _run_pre_command_functions(connection, suppress_warnings, client_version):
-    check_and_load_ssh_auth()
-    _refresh_warnings()
+    with _pre_command_lock:
+        check_and_load_ssh_auth()
+        _refresh_warnings()
 
-def close_client_connection(terminator=SOCKET_TERMINATOR):
+def close_client_connection(exit_code=0):
     """This function allows downstream functions to close the connection with the client.
     This is necessary for the upgrade command, where execvp replaces the process before
     the main daemon loop can close the client connection"""
+    connection = current_context().connection
     try:
-        connection.sendall(terminator)
+        send_exit_frame(connection, exit_code)
     finally:
         close_socket_logger()
         connection.close()
 
+def _run_command(fn_key, fn, args, kwargs):
+    if is_read_only_command(fn_key):
+        return fn(*args, **kwargs)
+    if not mutating_command_lock.acquire(False):
+        log_to_client('Waiting for a previous command to finish before running this one')
+        mutating_command_lock.acquire()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        mutating_command_lock.release()
+
+def _handle_connection(connection, suppress_warnings):
+    """Serve a single client request. Runs on its own thread, with its
+    own request context, so that read-only commands can be answered
+    while a long-running command is still in progress."""
+    with bound_context(RequestContext(connection)):
+        try:
+            send_frame(connection, FRAME_ACK)
+            make_socket_logger(connection)
+            frame_type, data = recv_frame(connection)
+            if frame_type is None:
+                close_socket_logger()
+                connection.close()
+                return
+            if frame_type != FRAME_REQUEST:
+                raise ProtocolError('Expected a request frame, received {!r}'.format(frame_type))
+            payload = Payload.deserialize(data)
+            client_version = payload['client_version']
+            fn, args, kwargs = _get_payload_function_data(payload)
+            suppress_warnings = suppress_warnings or payload['suppress_warnings']
+            logging.info('Received command. fn: {} args: {} kwargs: {}'.format(fn.__name__, args, kwargs))
+            try:
+                if client_version != constants.VERSION:
+                    raise RuntimeError("Dusty daemon is running version: {}, and client is running version: {}".format(constants.VERSION, client_version))
+                _run_pre_command_functions(connection, suppress_warnings, client_version)
+                _send_warnings_to_client(connection, suppress_warnings)
+                _run_command(payload['fn_key'], fn, args, kwargs)
+            except Exception as e:
+                logging.exception("Daemon encountered exception while processing command")
+                error_msg = e.message if e.message else str(e)
+                _send_warnings_to_client(connection, suppress_warnings)
+                send_frame(connection, FRAME_ERROR, 'ERROR: {}\n'.format(error_msg))
+                close_client_connection(1)
+            else:
+                close_client_connection()
+            finally:
+                reset_memoize_cache()
+        except:
+            logging.exception('Exception while handling client connection')
+            try:
+                close_client_connection(1)
+            except:
+                pass
+
 def _listen_on_socket(socket_path, suppress_warnings):
-    global connection
     _clean_up_existing_socket(socket_path)
     sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
     sock.bind(socket_path)
@@ -73,35 +138,9 @@ def _listen_on_socket(socket_path, suppress_warnings):
     while True:
         try:
             connection, client_address = sock.accept()
-            connection.sendall(SOCKET_ACK)
-            make_socket_logger(connection)
-            try:
-                data = connection.recv(1024)
-                if not data:
-                    continue
-                payload = Payload.deserialize(data)
-                client_version = payload['client_version']
-                fn, args, kwargs = _get_payload_function_data(payload)
-                suppress_warnings |= payload['suppress_warnings']
-                logging.info('Received command. fn: {} args: {} kwargs: {}'.format(fn.__name__, args, kwargs))
-                try:
-                    if client_version != constants.VERSION:
-                        raise RuntimeError("Dusty daemon is running version: {}, and client is running version: {}".format(constants.VERSION, client_version))
-                    _run_pre_command_functions(connection, suppress_warnings, client_version)
-                    _send_warnings_to_client(connection, suppress_warnings)
-                    fn(*args, **kwargs)
-                except Exception as e:
-                    logging.exception("Daemon encountered exception while processing command")
-                    error_msg = e.message if e.message else str(e)
-                    _send_warnings_to_client(connection, suppress_warnings)
-                    connection.sendall('ERROR: {}\n'.format(error_msg).encode('utf-8'))
-                    close_client_connection(SOCKET_ERROR_TERMINATOR)
-                else:
-                    close_client_connection()
-                finally:
-                    reset_memoize_cache()
-            except:
-                close_client_connection()
+            handler_thread = threading.Thread(target=_handle_connection, args=(connection, suppress_warnings))
+            handler_thread.daemon = True
+            handler_thread.start()
         except KeyboardInterrupt:
             break
         except:
@@ -112,10 +151,13 @@ def main():
     args = docopt(__doc__)
     configure_logging()
     init_yaml_constructor()
+    import_all_command_modules()
     preflight_check()
     if args['--preflight-only']:
         return
     refresh_config_warnings()
+    container_state.enable()
+    virtualbox.enable_vm_state_check()
     _listen_on_socket(SOCKET_PATH, args['--suppress-warnings'])
 
 if __name__ == '__main__':
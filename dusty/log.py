@@ -2,22 +2,37 @@ import sys
 import logging
 import logging.handlers
 from .constants import SOCKET_PATH, SOCKET_LOGGER_NAME
+from .context import current_context
+from .protocol import send_frame, FRAME_OUTPUT
 from threading import RLock
 
-handler = None
 log_to_client_lock = RLock()
 
 class DustySocketHandler(logging.Handler):
+    """Sends log records to a single client connection. Several of these
+    handlers can be attached to the socket logger at once when the daemon
+    is serving concurrent requests, so each one only accepts records
+    emitted from threads bound to its own request."""
     def __init__(self, connection_socket):
         super(DustySocketHandler, self).__init__()
         self.connection_socket = connection_socket
+        self.addFilter(_BoundToHandlerFilter(self))
 
     def emit(self, record):
         msg = self.format(record)
         if isinstance(msg, unicode):
             msg = msg.encode('utf-8')
         msg = msg.strip()
-        self.connection_socket.sendall("{}\n".format(msg))
+        send_frame(self.connection_socket, FRAME_OUTPUT, "{}\n".format(msg))
+
+class _BoundToHandlerFilter(logging.Filter):
+    def __init__(self, handler):
+        super(_BoundToHandlerFilter, self).__init__()
+        self.handler = handler
+
+    def filter(self, record):
+        context = current_context()
+        return context is not None and context.log_handler is self.handler
 
 class DustyClientTestingSocketHandler(logging.Handler):
     def __init__(self):
@@ -38,20 +53,23 @@ def configure_logging():
     logging.captureWarnings(True)
 
 def make_socket_logger(connection_socket):
-    global handler
-    logger = logging.getLogger(SOCKET_LOGGER_NAME)
+    """Attach a handler for `connection_socket` to the socket logger and
+    bind it to the current request context."""
     handler = DustySocketHandler(connection_socket)
-    logger.addHandler(handler)
+    current_context().log_handler = handler
+    client_logger.addHandler(handler)
+    return handler
 
 def log_to_client(message):
     with log_to_client_lock:
         client_logger.info(message)
 
 def close_socket_logger():
-    global handler
-    logger = logging.getLogger(SOCKET_LOGGER_NAME)
-    logger.removeHandler(handler)
-    handler = None
+    context = current_context()
+    if context is None or context.log_handler is None:
+        return
+    client_logger.removeHandler(context.log_handler)
+    context.log_handler = None
 
 def configure_client_logging():
     logging.basicConfig(stream=sys.stdout,
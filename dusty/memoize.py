@@ -1,28 +1,195 @@
+"""Memoization with a few different cache lifetimes.
+
+SCOPE_REQUEST values last for the duration of a single daemon request
+(or until reset_memoize_cache is called outside of one). SCOPE_DAEMON
+values last for the life of the daemon process. SCOPE_VM values last
+until the Dusty VM is started or stopped, at which point
+invalidate_scope(SCOPE_VM) throws them away. A long-lived scope can also
+be given a key with set_scope_key, which is checked once per request,
+so that it is invalidated by changes Dusty didn't make itself."""
+
+import collections
 import functools
 import operator
 import pickle
+import threading
 
+from .context import current_context
 from .payload import function_key
 
+SCOPE_REQUEST = 'request'
+SCOPE_DAEMON = 'daemon'
+SCOPE_VM = 'vm'
+
+SCOPES = (SCOPE_REQUEST, SCOPE_DAEMON, SCOPE_VM)
+
 cache = {}
 
+# Long-lived caches of every function memoized outside of the request scope,
+# by scope
+_scoped_caches = {SCOPE_DAEMON: [], SCOPE_VM: []}
+_stats = {}
+_stats_lock = threading.Lock()
+
+# Functions returning a value which identifies what a long-lived scope's
+# values describe (e.g. the current boot of the VM), and the value each
+# returned last, by scope
+_scope_keys = {}
+_scope_key_values = {}
+_scope_keys_lock = threading.Lock()
+
+class _LRUCache(object):
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._values = collections.OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._values.pop(key)
+            self._values[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._values.pop(key, None)
+            self._values[key] = value
+            if self.max_size is not None:
+                while len(self._values) > self.max_size:
+                    self._values.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def __len__(self):
+        return len(self._values)
+
 def _hash_kwargs(kwargs):
     return sorted(kwargs.items(), key=operator.itemgetter(0))
 
-def memoized(fn):
+def _current_cache():
+    """Requests served by the daemon each get their own cache on the
+    request context. Outside of a request (the client, tests) we fall
+    back to the module-level cache."""
+    context = current_context()
+    if context is not None:
+        return context.memoize_cache
+    return cache
+
+def _request_cache(fn_key, max_size):
+    request_cache = _current_cache()
+    if fn_key not in request_cache:
+        request_cache[fn_key] = _LRUCache(max_size)
+    return request_cache[fn_key]
+
+def set_scope_key(scope, key_fn, on_change=None):
+    """Invalidate `scope` whenever the value `key_fn` returns changes.
+    `key_fn` is called at most once per request which reads the scope,
+    before its first cached value is read. `on_change` is called after the
+    scope has been invalidated because of a change. Passing None as
+    `key_fn` stops checking."""
+    with _scope_keys_lock:
+        if key_fn is None:
+            _scope_keys.pop(scope, None)
+        else:
+            _scope_keys[scope] = (key_fn, on_change)
+        _scope_key_values.pop(scope, None)
+
+def _check_scope_key(scope):
+    key_fn, on_change = _scope_keys.get(scope, (None, None))
+    if key_fn is None:
+        return
+    request_cache = _current_cache()
+    checked_marker = ('scope key checked', scope)
+    if checked_marker in request_cache:
+        return
+    request_cache[checked_marker] = True
+    value = key_fn()
+    with _scope_keys_lock:
+        changed = scope in _scope_key_values and _scope_key_values[scope] != value
+    if changed:
+        invalidate_scope(scope)
+    with _scope_keys_lock:
+        _scope_key_values[scope] = value
+    if changed and on_change is not None:
+        on_change()
+
+def _record(fn_key, scope, hit):
+    with _stats_lock:
+        stats = _stats.setdefault(fn_key, {'scope': scope, 'hits': 0, 'misses': 0})
+        stats['hits' if hit else 'misses'] += 1
+
+def memoized(fn=None, scope=SCOPE_REQUEST, max_size=None):
     """
     Decorator. Caches a function's return value each time it is called.
     If called later with the same arguments, the cached value is returned
-    (not reevaluated).  The cache lasts for the duration of each request.
+    (not reevaluated). How long the value is kept is controlled by `scope`,
+    and `max_size` bounds the number of argument combinations cached for
+    the function, evicting the least recently used.
+
+    Can be used either as @memoized or @memoized(scope=SCOPE_VM).
+    The decorated function's `invalidate()` throws away everything
+    cached for it in the current scope.
     """
+    if scope not in SCOPES:
+        raise ValueError('Unknown memoize scope {}'.format(scope))
+    if fn is None:
+        return functools.partial(memoized, scope=scope, max_size=max_size)
+
+    fn_key = function_key(fn)
+    if scope == SCOPE_REQUEST:
+        get_cache = lambda: _request_cache(fn_key, max_size)
+    else:
+        scoped_cache = _LRUCache(max_size)
+        _scoped_caches[scope].append(scoped_cache)
+        def get_cache():
+            _check_scope_key(scope)
+            return scoped_cache
+
     @functools.wraps(fn)
     def memoizer(*args, **kwargs):
-        key = function_key(fn) + pickle.dumps(args) + pickle.dumps(_hash_kwargs(kwargs))
-        if key not in cache:
-            cache[key] = fn(*args, **kwargs)
-        return cache[key]
+        key = pickle.dumps(args) + pickle.dumps(_hash_kwargs(kwargs))
+        fn_cache = get_cache()
+        try:
+            value = fn_cache.get(key)
+        except KeyError:
+            _record(fn_key, scope, False)
+            value = fn(*args, **kwargs)
+            fn_cache.set(key, value)
+        else:
+            _record(fn_key, scope, True)
+        return value
+    memoizer.invalidate = lambda: get_cache().clear()
     return memoizer
 
+def invalidate_scope(scope):
+    """Throw away everything cached in a long-lived scope, e.g. because
+    the VM the values describe has been restarted. The scope's key, if it
+    has one, is read afresh by the next request without invalidating it
+    again."""
+    for scoped_cache in _scoped_caches[scope]:
+        scoped_cache.clear()
+    with _scope_keys_lock:
+        _scope_key_values.pop(scope, None)
+
+def memoize_stats():
+    """Returns hit and miss counts of every memoized function which has
+    been called, keyed by function"""
+    with _stats_lock:
+        return {fn_key: dict(stats) for fn_key, stats in _stats.iteritems()}
+
 def reset_memoize_cache():
+    """Reset the request-scoped cache of the current request"""
     global cache
     cache = {}
+    context = current_context()
+    if context is not None:
+        context.memoize_cache = {}
+
+def reset_all_memoize_caches():
+    reset_memoize_cache()
+    for scope in _scoped_caches:
+        invalidate_scope(scope)
+    with _stats_lock:
+        _stats.clear()
@@ -1,5 +1,8 @@
 """Utilities for multithreaded parallel execution of tasks."""
 
+import sys
+import time
+import collections
 import threading
 import multiprocessing
 import multiprocessing.pool
@@ -7,7 +10,9 @@ from contextlib import contextmanager
 from Queue import Queue
 import logging
 
+from .context import current_context, bound_context
 from .log import log_to_client
+from .timing import current_phase, in_phase, profiled_phase
 
 class TaskQueue(Queue, object):
     """Executable task queue used for multithreaded execution of multiple
@@ -20,17 +25,20 @@ class TaskQueue(Queue, object):
     def enqueue_task(self, fn, *args, **kwargs):
         self.put((fn, args, kwargs))
 
-    def _task_executor(self, fn, args, kwargs):
+    def _task_executor(self, fn, args, kwargs, context=None, phase=None):
         try:
-            fn(*args, **kwargs)
+            with bound_context(context), in_phase(phase):
+                fn(*args, **kwargs)
         except Exception as e:
             self.errors.append(e)
 
     def execute(self):
         self.pool = multiprocessing.pool.ThreadPool(self.pool_size)
+        # Tasks log to the client, memoize and are profiled on behalf of the request which queued them
+        context, phase = current_context(), current_phase()
         while not self.empty():
             fn, args, kwargs = self.get()
-            self.pool.apply_async(self._task_executor, args=(fn, args, kwargs))
+            self.pool.apply_async(self._task_executor, args=(fn, args, kwargs, context, phase))
         self.pool.close()
         self.pool.join()
 
@@ -49,3 +57,101 @@ def parallel_task_queue(pool_size=multiprocessing.cpu_count()*2):
     task_queue = TaskQueue(pool_size)
     yield task_queue
     task_queue.execute()
+
+class TaskGraph(object):
+    """Runs named tasks on a pool of `pool_size` threads, starting each
+    task as soon as every task it depends on has finished, so that
+    independent tasks overlap. Each task's return value is available
+    from `result` to the tasks which depend on it.
+
+    If a task raises, tasks which haven't started yet are skipped and
+    the first exception is re-raised from `execute` once running tasks
+    have finished."""
+    def __init__(self, pool_size=multiprocessing.cpu_count()*2):
+        self.pool_size = pool_size
+        self._tasks = collections.OrderedDict()
+        self._results = {}
+        self.timings = {}
+
+    def add_task(self, name, fn, depends=()):
+        if name in self._tasks:
+            raise ValueError('Task {} was already added'.format(name))
+        for dependency in depends:
+            if dependency not in self._tasks:
+                raise ValueError('Task {} depends on unknown task {}'.format(name, dependency))
+        self._tasks[name] = (fn, tuple(depends))
+
+    def result(self, name):
+        return self._results[name]
+
+    def _run_task(self, name, fn, context, finished):
+        start = time.time()
+        try:
+            with bound_context(context), profiled_phase(name):
+                self._results[name] = fn()
+            error = None
+        except Exception:
+            error = sys.exc_info()
+        finished(name, start, time.time(), error)
+
+    def execute(self):
+        context = current_context()
+        condition = threading.Condition()
+        remaining = collections.OrderedDict((name, set(depends)) for name, (fn, depends) in self._tasks.iteritems())
+        running = set()
+        errors = []
+
+        def finished(name, start, end, error):
+            with condition:
+                running.discard(name)
+                self.timings[name] = (start, end)
+                if error is not None:
+                    errors.append(error)
+                for dependencies in remaining.itervalues():
+                    dependencies.discard(name)
+                condition.notify()
+
+        pool = multiprocessing.pool.ThreadPool(self.pool_size)
+        try:
+            with condition:
+                while True:
+                    if not errors:
+                        for name in [name for name, dependencies in remaining.iteritems() if not dependencies]:
+                            del remaining[name]
+                            running.add(name)
+                            pool.apply_async(self._run_task, args=(name, self._tasks[name][0], context, finished))
+                    if not running:
+                        break
+                    condition.wait()
+        finally:
+            pool.close()
+            pool.join()
+
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+        return self._results
+
+    def critical_path(self):
+        """Returns the chain of tasks which determined how long the graph
+        took to run: the last task to finish, preceded by whichever of its
+        dependencies finished last, and so on."""
+        if not self.timings:
+            return []
+        path = [max(self.timings, key=lambda name: self.timings[name][1])]
+        while True:
+            depends = [name for name in self._tasks[path[0]][1] if name in self.timings]
+            if not depends:
+                return path
+            path.insert(0, max(depends, key=lambda name: self.timings[name][1]))
+
+    def describe_critical_path(self):
+        path = self.critical_path()
+        if not path:
+            return 'No tasks were run'
+        durations = [(name, self.timings[name][1] - self.timings[name][0]) for name in path]
+        wall_time = max(end for start, end in self.timings.itervalues()) - \
+                    min(start for start, end in self.timings.itervalues())
+        serial_time = sum(end - start for start, end in self.timings.itervalues())
+        return 'Critical path ({:.1f}s of {:.1f}s total, {:.1f}s if run serially): {}'.format(
+            sum(duration for name, duration in durations), wall_time, serial_time,
+            ' -> '.join('{} ({:.1f}s)'.format(name, duration) for name, duration in durations))
@@ -1,8 +1,33 @@
+import importlib
 import json
 import yaml
 
 from .constants import VERSION
 
+class LazyCommand(object):
+    """Stands in for a command function without importing the module it
+    lives in. The CLI builds its Payloads from these so that the client
+    doesn't have to import the command modules (and docker, git etc. with
+    them) just to send a function key over the socket. The real function
+    is only imported if the command is actually run in this process."""
+    def __init__(self, fn_key):
+        self.__module__, self.__name__ = fn_key.rsplit('.', 1)
+
+    def resolve(self):
+        return getattr(importlib.import_module(self.__module__), self.__name__)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __eq__(self, other):
+        return hasattr(other, '__module__') and hasattr(other, '__name__') and function_key(self) == function_key(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<LazyCommand {}>'.format(function_key(self))
+
 class Payload(object):
     def __init__(self, fn, *args, **kwargs):
         self.fn = fn
@@ -22,7 +47,8 @@ class Payload(object):
 
     def serialize(self):
         fn_key = function_key(self.fn)
-        if fn_key not in _daemon_command_mapping:
+        # LazyCommands are checked by the daemon, which has every command module loaded
+        if not isinstance(self.fn, LazyCommand) and fn_key not in _daemon_command_mapping:
             raise RuntimeError('Function key {} not found; you may need to decorate your function'.format(fn_key))
         doc = {'fn_key': fn_key, 'client_version': self.client_version, 'suppress_warnings': self.suppress_warnings,
                'args': self.args, 'kwargs': self.kwargs}
@@ -30,9 +56,21 @@ class Payload(object):
 
     @staticmethod
     def deserialize(doc):
-        return yaml.safe_load(doc)
+        return _encode_strings(json.loads(doc))
+
+def _encode_strings(doc):
+    """json returns unicode for every string; the rest of Dusty expects
+    utf-8 encoded strs, the same as our yaml constructor produces"""
+    if isinstance(doc, unicode):
+        return doc.encode('utf-8')
+    elif isinstance(doc, list):
+        return [_encode_strings(item) for item in doc]
+    elif isinstance(doc, dict):
+        return {_encode_strings(key): _encode_strings(value) for key, value in doc.iteritems()}
+    return doc
 
 _daemon_command_mapping = {}
+_read_only_command_keys = set()
 
 def function_key(fn):
     return '{}.{}'.format(fn.__module__, fn.__name__)
@@ -44,6 +82,17 @@ def daemon_command(fn):
     _daemon_command_mapping[key] = fn
     return fn
 
+def read_only_daemon_command(fn):
+    """Registers a daemon command which does not change any Dusty state.
+    The daemon runs these concurrently with other commands instead of
+    queueing them behind whatever mutating command is in progress."""
+    daemon_command(fn)
+    _read_only_command_keys.add(function_key(fn))
+    return fn
+
+def is_read_only_command(fn_key):
+    return fn_key in _read_only_command_keys
+
 def get_payload_function(fn_key):
     if fn_key not in _daemon_command_mapping:
         raise RuntimeError('Function key {} not found'.format(fn_key))
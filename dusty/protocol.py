@@ -0,0 +1,71 @@
+"""Wire protocol between the Dusty client and daemon.
+
+Everything sent over the daemon's socket is a frame: a 4-byte big-endian
+body length, a 1-byte frame type, then the body itself. The client sends
+a single request frame containing a serialized Payload. The daemon answers
+with an ack frame as soon as it accepts the connection, any number of
+output and warning frames while the command runs, an optional error frame,
+and finally an exit frame whose body is the command's exit code.
+
+Because each frame announces its own length, neither side ever has to
+scan the stream for sentinel bytes, and payloads of any size arrive intact."""
+
+import struct
+
+FRAME_ACK = 'A'
+FRAME_REQUEST = 'R'
+FRAME_OUTPUT = 'O'
+FRAME_WARNING = 'W'
+FRAME_ERROR = 'E'
+FRAME_EXIT = 'X'
+
+FRAME_TYPES = frozenset([FRAME_ACK, FRAME_REQUEST, FRAME_OUTPUT, FRAME_WARNING, FRAME_ERROR, FRAME_EXIT])
+
+# Guards against reading a garbage length off of a non-Dusty peer
+MAX_FRAME_SIZE = 64 * 2**20
+
+_HEADER = struct.Struct('!Ic')
+_RECV_SIZE = 65536
+
+class ProtocolError(Exception):
+    pass
+
+def encode_frame(frame_type, body=''):
+    if isinstance(body, unicode):
+        body = body.encode('utf-8')
+    return _HEADER.pack(len(body), frame_type) + body
+
+def send_frame(sock, frame_type, body=''):
+    sock.sendall(encode_frame(frame_type, body))
+
+def send_exit_frame(sock, exit_code):
+    send_frame(sock, FRAME_EXIT, str(exit_code))
+
+def _recv_exactly(sock, size):
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, _RECV_SIZE))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return ''.join(chunks)
+
+def recv_frame(sock):
+    """Read the next frame off of `sock`, returning a (frame_type, body)
+    tuple. Returns (None, None) if the peer closed the connection before
+    a new frame started, and raises ProtocolError if it closed midway
+    through a frame or sent something which isn't a Dusty frame."""
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None, None
+    length, frame_type = _HEADER.unpack(header)
+    if frame_type not in FRAME_TYPES:
+        raise ProtocolError('Unknown frame type {!r}'.format(frame_type))
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError('Frame of {} bytes exceeds the maximum frame size'.format(length))
+    body = _recv_exactly(sock, length)
+    if body is None:
+        raise ProtocolError('Connection closed in the middle of a frame')
+    return frame_type, body
@@ -3,6 +3,7 @@ from schemer.validators import one_of
 
 from .test_schema import test_schema
 from .asset_schema import asset_schema
+from .. import constants
 
 def image_build_isolation_validator():
     def validator(document):
@@ -63,6 +64,7 @@ app_schema = Schema({
     'image': {'type': basestring},
     'build': {'type': basestring},
     'mount': {'type': basestring, 'default': str},
+    'nfs_profile': {'type': basestring, 'validates': one_of(*sorted(constants.NFS_MOUNT_PROFILES))},
     'commands': {'type': commands_schema, 'required': True},
     'scripts': {'type': Array(script_schema), 'default': list},
     'assets': {'type': Array(asset_schema), 'default': list},
@@ -1,7 +1,7 @@
 import collections
-from copy import deepcopy
 import glob
 import os
+import threading
 import yaml
 
 from schemer import ValidationException
@@ -9,7 +9,143 @@ from schemer import ValidationException
 from . import app_schema, lib_schema, bundle_schema
 from ..log import log_to_client
 
-class BaseMutable(collections.MutableMapping):
+class _MappingMethods(object):
+    """The dict-like methods MutableMapping would give us, for classes
+    below which define __slots__ (the collections ABCs don't, so
+    inheriting from them would give every instance a __dict__ anyway)."""
+    __slots__ = ()
+    __hash__ = None
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return list(self)
+
+    def iterkeys(self):
+        return iter(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def itervalues(self):
+        return (self[key] for key in self)
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def iteritems(self):
+        return ((key, self[key]) for key in self)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def update(self, other=(), **kwargs):
+        for key, value in dict(other, **kwargs).iteritems():
+            self[key] = value
+
+    def __eq__(self, other):
+        if not isinstance(other, collections.Mapping):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return repr(to_plain(self))
+
+# Guards the copies views make of nested values the first time they are
+# read, since one spec view may be read from several worker threads
+_copy_lock = threading.RLock()
+
+class CopyOnWriteDict(_MappingMethods):
+    """A mutable view of `base` which never changes `base` itself.
+    Nested dicts are wrapped in views of their own the first time they
+    are read, and nested lists are copied, so any number of views can
+    share a single parsed spec document."""
+    __slots__ = ('_base', '_changes', '_deleted')
+
+    def __init__(self, base):
+        self._base = base
+        self._changes = {}
+        self._deleted = set()
+
+    def __getitem__(self, key):
+        if key in self._changes:
+            return self._changes[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        value = self._base[key]
+        if isinstance(value, (dict, list, CopyOnWriteDict)):
+            with _copy_lock:
+                if key not in self._changes:
+                    self._changes[key] = _copy_on_write(value)
+                value = self._changes[key]
+        return value
+
+    def __setitem__(self, key, value):
+        self._changes[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._changes.pop(key, None)
+        if key in self._base:
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self._changes or (key not in self._deleted and key in self._base)
+
+    def __iter__(self):
+        # Reading values while iterating adds their copies to _changes, so
+        # the keys are taken up front
+        with _copy_lock:
+            keys = set(self._base) - self._deleted | set(self._changes)
+        return iter(keys)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __deepcopy__(self, memo):
+        return to_plain(self)
+
+collections.MutableMapping.register(CopyOnWriteDict)
+
+def _copy_on_write(value):
+    if isinstance(value, (dict, CopyOnWriteDict)):
+        return CopyOnWriteDict(value)
+    elif isinstance(value, list):
+        return [_copy_on_write(item) for item in value]
+    return value
+
+def to_plain(value):
+    """Returns a deep copy of `value` made only of plain dicts and lists,
+    e.g. for writing out to YAML"""
+    if isinstance(value, (dict, CopyOnWriteDict, BaseMutable)):
+        return {key: to_plain(item) for key, item in value.iteritems()}
+    elif isinstance(value, list):
+        return [to_plain(item) for item in value]
+    elif isinstance(value, (set, tuple)):
+        return type(value)(to_plain(item) for item in value)
+    return value
+
+class BaseMutable(_MappingMethods):
+    __slots__ = ('_document',)
+
     def __init__(self, document):
         self._document = document
 
@@ -31,15 +167,11 @@ class BaseMutable(collections.MutableMapping):
     def __len__(self):
         return len(self._document)
 
-    def keys(self):
-        return self._document.keys()
-
-    def values(self):
-        return self._document.values()
-
     def plain_dict(self):
-        return self._document
+        """A plain, deep copy of the document, which the caller is free to modify"""
+        return to_plain(self._document)
 
+collections.MutableMapping.register(BaseMutable)
 
 def _get_respective_schema(specs_type):
     if specs_type == 'apps':
@@ -63,6 +195,12 @@ def notifies_validation_exception(f):
 
 # This is build on top of Schemer's functionality
 class DustySchema(BaseMutable):
+    """A single spec. `document` is validated and has its defaults applied
+    in place, after which it is never modified again: the spec reads
+    through to it via a CopyOnWriteDict, so it can be shared by the spec
+    cache and by any number of overlays."""
+    __slots__ = ('name', 'spec_type', 'type_singular')
+
     def __init__(self, schema, document, name=None, spec_type=None):
         self.name = name
         self.spec_type = spec_type
@@ -71,34 +209,124 @@ class DustySchema(BaseMutable):
         else:
             self.type_singular = spec_type
         self.validate(schema, document)
-        self._document = deepcopy(document)
-        super(DustySchema, self).__init__(deepcopy(document))
         if schema is not None:
-            schema.apply_defaults(self._document)
+            schema.apply_defaults(document)
+        super(DustySchema, self).__init__(CopyOnWriteDict(document))
+
+    def overlay(self):
+        """A copy of this spec which shares its document, only storing
+        what is changed on the copy"""
+        return DustySchema(None, self._document, self.name, self.spec_type)
 
     @notifies_validation_exception
     def validate(self, schema, document):
         if schema is not None:
             schema.validate(document)
 
+class _SpecFileCache(object):
+    """Parsed and validated spec documents, kept for the lifetime of the
+    daemon. Each entry is keyed on the spec file's path and remembers the
+    stat signature of the file it was parsed from, so a file is only
+    re-read and re-validated once it has actually changed on disk."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, spec_path, signature):
+        with self._lock:
+            entry = self._entries.get(spec_path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, spec_path, signature, document):
+        with self._lock:
+            self._entries[spec_path] = (signature, document)
+
+    def prune(self, specs_path, seen_spec_paths):
+        """Forget spec files under `specs_path` which no longer exist"""
+        prefix = os.path.join(specs_path, '')
+        with self._lock:
+            for spec_path in self._entries.keys():
+                if spec_path.startswith(prefix) and spec_path not in seen_spec_paths:
+                    del self._entries[spec_path]
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+            self.hits = 0
+            self.misses = 0
+
+spec_file_cache = _SpecFileCache()
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+def _load_spec(schema, spec_path, spec_name, spec_type):
+    signature = _file_signature(spec_path)
+    document = spec_file_cache.get(spec_path, signature)
+    if document is not None:
+        # Already validated and defaulted when it was cached
+        return DustySchema(None, document, spec_name, spec_type)
+    with open(spec_path, 'r') as f:
+        document = yaml.safe_load(f.read())
+    spec = DustySchema(schema, document, spec_name, spec_type)
+    spec_file_cache.put(spec_path, signature, document)
+    return spec
+
 def get_specs_from_path(specs_path):
     specs = {}
+    seen_spec_paths = set()
     for key in ['bundles', 'apps', 'libs', 'services']:
         specs[key] = {}
         schema = _get_respective_schema(key)
         key_path = os.path.join(specs_path, key)
         for spec_path in glob.glob('{}/*.yml'.format(key_path)):
             spec_name = os.path.splitext(os.path.split(spec_path)[-1])[0]
-            with open(spec_path, 'r') as f:
-                spec = yaml.safe_load(f.read())
-                spec = DustySchema(schema, spec, spec_name, key)
-                specs[key][spec_name] = spec
+            specs[key][spec_name] = _load_spec(schema, spec_path, spec_name, key)
+            seen_spec_paths.add(spec_path)
+    spec_file_cache.prune(specs_path, seen_spec_paths)
     return specs
 
+def _overlay_specs(specs):
+    if isinstance(specs, dict):
+        return {name: spec.overlay() if isinstance(spec, DustySchema) else _copy_on_write(spec)
+                for name, spec in specs.iteritems()}
+    return _copy_on_write(specs)
+
+def get_spec_cache_stats():
+    return spec_file_cache.stats()
+
+def reset_spec_cache():
+    spec_file_cache.reset()
+
 class DustySpecs(BaseMutable):
+    # dependency_graph is filled in by dusty.compiler.dependency_graph the
+    # first time it's needed
+    __slots__ = ('dependency_graph',)
+
     def __init__(self, specs_path):
         document = get_specs_from_path(specs_path)
         super(DustySpecs, self).__init__(document)
+        self.dependency_graph = None
+
+    def overlay(self):
+        """A copy of these specs which can be filtered and expanded (e.g. by
+        the spec assembler) without affecting them or copying every spec.
+        The overlay shares these specs' dependency graph."""
+        view = DustySpecs.__new__(DustySpecs)
+        BaseMutable.__init__(view, {key: _overlay_specs(value) for key, value in self._document.iteritems()})
+        view.dependency_graph = self.dependency_graph
+        return view
 
     def get_app_or_lib(self, app_or_lib_name):
         if app_or_lib_name in self._document['apps']:
@@ -1,7 +1,9 @@
 from schemer import Schema, Array
+from schemer.validators import one_of
 
 from .test_schema import test_schema
 from .asset_schema import asset_schema
+from .. import constants
 
 depends_schema = Schema({
     'libs': {'type': Array(basestring), 'default': list}
@@ -10,6 +12,7 @@ depends_schema = Schema({
 lib_schema = Schema({
     'repo': {'type': basestring, 'required': True},
     'mount': {'type': basestring, 'default': '', 'required': True},
+    'nfs_profile': {'type': basestring, 'validates': one_of(*sorted(constants.NFS_MOUNT_PROFILES))},
     'install': {'type': Array(basestring), 'default': list},
     'depends': {'type': depends_schema, 'default': dict},
     'assets': {'type': Array(asset_schema), 'default': list},
@@ -8,7 +8,7 @@ import urlparse
 
 import git
 
-from .config import get_config_value
+from .config import get_config_value, get_repo_sync_methods
 from . import constants
 from .log import log_to_client
 from .path import parent_dir
@@ -43,21 +43,11 @@ class Repo(object):
     def resolve(cls, all_known_repos, name):
         """We require the list of all remote repo paths to be passed in
         to this because otherwise we would need to import the spec assembler
-        in this module, which would give us circular imports."""
-        match = None
-        for repo in all_known_repos:
-            if repo.remote_path == name: # user passed in a full name
-                return repo
-            if name == repo.short_name:
-                if match is None:
-                    match = repo
-                else:
-                    raise RuntimeError('Short repo name {} is ambiguous. It matches both {} and {}'.format(name,
-                                                                                                           match.remote_path,
-                                                                                                           repo.remote_path))
-        if match is None:
-            raise RuntimeError('Short repo name {} does not match any known repos'.format(name))
-        return match
+        in this module, which would give us circular imports. Pass a RepoIndex
+        to avoid re-indexing the repos on every call."""
+        if not isinstance(all_known_repos, RepoIndex):
+            all_known_repos = RepoIndex(all_known_repos)
+        return all_known_repos.resolve(name)
 
     @property
     def is_local_repo(self):
@@ -91,8 +81,16 @@ class Repo(object):
     def local_path(self):
         return self.override_path if self.is_overridden else self.managed_path
 
+    @property
+    def sync_method(self):
+        """How the repo's code reaches the VM: mounted over NFS (the
+        default), or copied onto the VM's disk and kept in sync with rsync"""
+        return get_repo_sync_methods().get(self.remote_path, constants.SYNC_METHOD_NFS)
+
     @property
     def vm_path(self):
+        if self.sync_method == constants.SYNC_METHOD_RSYNC:
+            return os.path.join(constants.VM_SYNCED_REPOS_DIR, self.rel_path)
         return os.path.join(constants.VM_REPOS_DIR, self.rel_path)
 
     @property
@@ -183,3 +181,55 @@ class Repo(object):
         does a bunch of non-threadsafe filesystem operations."""
         self.ensure_local_repo()
         task_queue.enqueue_task(self.update_local_repo, force=force)
+
+class RepoIndex(object):
+    """Repos keyed by remote path and by short name, along with the apps and
+    libs whose containers mount each repo. Resolving a repo name and finding
+    the containers affected by a change to a repo are both lookups."""
+    def __init__(self, repos=()):
+        self._by_remote_path = {}
+        self._by_short_name = {}
+        self._mounted_by = {}
+        for repo in repos:
+            self.add(repo)
+
+    def add(self, repo, apps=(), libs=()):
+        """Index `repo` as mounted by the containers of `apps` and `libs`.
+        A repo may be added any number of times."""
+        if repo.remote_path not in self._by_remote_path:
+            self._by_remote_path[repo.remote_path] = repo
+            self._by_short_name.setdefault(repo.short_name, []).append(repo)
+            self._mounted_by[repo.remote_path] = {'apps': set(), 'libs': set()}
+        self._mounted_by[repo.remote_path]['apps'].update(apps)
+        self._mounted_by[repo.remote_path]['libs'].update(libs)
+
+    def __iter__(self):
+        return iter(self._by_remote_path.values())
+
+    def __len__(self):
+        return len(self._by_remote_path)
+
+    def __contains__(self, repo):
+        return repo.remote_path in self._by_remote_path
+
+    @property
+    def repos(self):
+        return set(self._by_remote_path.values())
+
+    def resolve(self, name):
+        """Returns the repo whose remote path or short name is `name`"""
+        if name in self._by_remote_path: # user passed in a full name
+            return self._by_remote_path[name]
+        matches = self._by_short_name.get(name, [])
+        if not matches:
+            raise RuntimeError('Short repo name {} does not match any known repos'.format(name))
+        if len(matches) > 1:
+            raise RuntimeError('Short repo name {} is ambiguous. It matches both {} and {}'.format(name,
+                                                                                                   matches[0].remote_path,
+                                                                                                   matches[1].remote_path))
+        return matches[0]
+
+    def mounted_by(self, repo):
+        """Returns a dict of the apps and libs whose containers mount `repo`"""
+        mounted_by = self._mounted_by.get(repo.remote_path, {'apps': (), 'libs': ()})
+        return {spec_type: set(names) for spec_type, names in mounted_by.iteritems()}
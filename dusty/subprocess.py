@@ -11,6 +11,7 @@ from copy import copy
 
 from .config import get_config_value
 from .log import log_to_client
+from .timing import profiled_subprocess
 from . import constants
 
 def _demote_to_user(user_name):
@@ -33,12 +34,17 @@ def run_subprocess(fn, shell_args, demote=True, env=None, **kwargs):
         passed_env = None
     if demote:
         kwargs['preexec_fn'] = _demote_to_user(get_config_value(constants.CONFIG_MAC_USERNAME_KEY))
-    output = fn(shell_args, env=passed_env, **kwargs)
-    return output
+    if fn is subprocess.Popen:
+        return fn(shell_args, env=passed_env, **kwargs)
+    with profiled_subprocess(shell_args):
+        return fn(shell_args, env=passed_env, **kwargs)
 
-def call_demoted(shell_args, env=None, redirect_stderr=False):
+def call(shell_args, demote=True, env=None, redirect_stderr=False):
     kwargs = {} if not redirect_stderr else {'stderr': subprocess.STDOUT}
-    return run_subprocess(subprocess.call, shell_args, demote=True, env=env, **kwargs)
+    return run_subprocess(subprocess.call, shell_args, demote=demote, env=env, **kwargs)
+
+def call_demoted(shell_args, env=None, redirect_stderr=False):
+    return call(shell_args, demote=True, env=env, redirect_stderr=redirect_stderr)
 
 def check_call(shell_args, demote=True, env=None, redirect_stderr=False):
     kwargs = {} if not redirect_stderr else {'stderr': subprocess.STDOUT}
@@ -58,6 +64,10 @@ def check_and_log_output_and_error_demoted(shell_args, env=None, strip_newlines=
     return check_and_log_output_and_error(shell_args, demote=True, env=env, strip_newlines=strip_newlines, quiet_on_success=quiet_on_success)
 
 def check_and_log_output_and_error(shell_args, demote=True, env=None, strip_newlines=False, quiet_on_success=False):
+    with profiled_subprocess(shell_args):
+        return _check_and_log_output_and_error(shell_args, demote, env, strip_newlines, quiet_on_success)
+
+def _check_and_log_output_and_error(shell_args, demote, env, strip_newlines, quiet_on_success):
     total_output = ""
     process = run_subprocess(subprocess.Popen, shell_args, demote=demote, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
     for output in iter(process.stdout.readline, ''):
@@ -5,9 +5,10 @@ import logging
 
 from ... import constants
 from ...log import log_to_client
-from ...memoize import memoized
+from ...memoize import memoized, SCOPE_VM
 from ...subprocess import check_output_demoted
 from ...compiler.spec_assembler import get_specs
+from . import container_state
 
 def exec_in_container(container, command, *args):
     client = get_docker_client()
@@ -23,10 +24,15 @@ def get_dusty_images():
     dusty_images = set([name  if ':' in name else "{}:latest".format(name) for name in dusty_image_names])
     return dusty_images
 
+def ensure_image_pulled(image_name):
+    # pull imports get_docker_client from this module
+    from .pull import pull_images
+    pull_images([image_name])
+
 def get_dusty_container_name(service_name):
     return 'dusty_{}_1'.format(service_name)
 
-@memoized
+@memoized(scope=SCOPE_VM)
 def get_docker_env():
     env = {}
     output = check_output_demoted(['docker-machine', 'env', constants.VM_MACHINE_NAME], redirect_stderr=True)
@@ -38,7 +44,7 @@ def get_docker_env():
         env[k] = v
     return env
 
-@memoized
+@memoized(scope=SCOPE_VM)
 def get_docker_client():
     """Ripped off and slightly modified based on docker-py's
     kwargs_from_env utility function."""
@@ -58,27 +64,68 @@ def get_docker_client():
             assert_hostname=False)
     return docker.Client(**params)
 
+class ContainerSnapshot(object):
+    """Every container on the Docker host as of one listing, indexed by
+    the names of Dusty's containers"""
+    def __init__(self, containers):
+        self.containers = containers
+        self._by_name = {}
+        for container in containers:
+            for name in container.get('Names', []):
+                # Containers also have a name for each container linking to them, of the form /linker/linked
+                if name.count('/') == 1:
+                    self._by_name[name[1:]] = container
+
+    def get(self, app_or_service_name, include_exited=False):
+        container = self._by_name.get(get_dusty_container_name(app_or_service_name))
+        if container is not None and (include_exited or container_is_running(container)):
+            return container
+        return None
+
+    def dusty_containers(self, include_exited=False):
+        return [container for container in self.containers
+                if any(name.startswith('/dusty') for name in container.get('Names', []))
+                and (include_exited or container_is_running(container))]
+
+def container_is_running(container):
+    """Works from the status in a container listing, which is all
+    `docker ps` shows, e.g. 'Up 2 hours' or 'Exited (0) 3 days ago'"""
+    return container.get('Status', '').startswith(('Up', 'Restarting'))
+
+@memoized
+def get_container_snapshot():
+    """The Docker host's containers, as of the start of the request or
+    the last time Dusty changed them. In the daemon these usually come
+    from the live table kept from Docker's events, without listing."""
+    client = get_docker_client()
+    containers = container_state.live_containers(client)
+    if containers is None:
+        containers = client.containers(all=True)
+        container_state.record_listing(client, containers)
+    return ContainerSnapshot(containers)
+
+def containers_changed():
+    """Must be called after creating, starting, stopping or removing
+    containers, so that later lookups see the change"""
+    get_container_snapshot.invalidate()
+    container_state.mark_stale()
+
 def get_dusty_containers(services, include_exited=False):
     """Get a list of containers associated with the list
     of services. If no services are provided, attempts to
     return all containers associated with Dusty."""
-    client = get_docker_client()
+    snapshot = get_container_snapshot()
     if services:
-        containers = [get_container_for_app_or_service(service, include_exited=include_exited) for service in services]
+        containers = [snapshot.get(service, include_exited=include_exited) for service in services]
         return [container for container in containers if container]
     else:
-        return [container
-                for container in client.containers(all=include_exited)
-                if any(name.startswith('/dusty') for name in container.get('Names', []))]
+        return snapshot.dusty_containers(include_exited=include_exited)
 
 def get_container_for_app_or_service(app_or_service_name, raise_if_not_found=False, include_exited=False):
-    client = get_docker_client()
-    for container in client.containers(all=include_exited):
-        if '/{}'.format(get_dusty_container_name(app_or_service_name)) in container['Names']:
-            return container
-    if raise_if_not_found:
+    container = get_container_snapshot().get(app_or_service_name, include_exited=include_exited)
+    if container is None and raise_if_not_found:
         raise RuntimeError('No running container found for {}'.format(app_or_service_name))
-    return None
+    return container
 
 def get_canonical_container_name(container):
     """Return the canonical container name, which should be
@@ -1,7 +1,7 @@
 import logging
 
 from ...log import log_to_client
-from . import get_dusty_containers, get_dusty_images, get_docker_client
+from . import get_dusty_containers, get_dusty_images, get_docker_client, containers_changed
 
 def get_exited_dusty_containers():
     all_containers = get_dusty_containers(None, include_exited=True)
@@ -23,6 +23,7 @@ def remove_exited_dusty_containers():
             removed_containers.append(container)
         except Exception as e:
             log_to_client(e.message or str(e))
+    containers_changed()
     return removed_containers
 
 def _remove_dangling_images():
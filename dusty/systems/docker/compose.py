@@ -1,22 +1,34 @@
 import os
 import logging
+import time
 
 import yaml
 
 from . import (get_canonical_container_name, get_docker_env, get_docker_client,
-               get_dusty_containers, get_app_or_service_name_from_container,
-               get_container_for_app_or_service)
+               get_container_for_app_or_service, containers_changed)
+from . import engine
+from .engine import link_levels
 from ... import constants
+from ...config import get_config_value
 from ...log import log_to_client
+from ...parallel import parallel_task_queue
 from ...subprocess import check_output_demoted, check_and_log_output_and_error_demoted
 from ...compiler.spec_assembler import get_assembled_specs
 from ...compiler.compose import links_for_app_or_service
 from ...path import parent_dir
 
+# How many containers in a link level are restarted at once
+RESTART_POOL_SIZE = 8
+
 def write_composefile(compose_config, compose_file_location):
     compose_dir_location = parent_dir(compose_file_location)
     if not os.path.exists(compose_dir_location):
-        os.makedirs(compose_dir_location)
+        try:
+            os.makedirs(compose_dir_location)
+        except OSError:
+            # Test suites running at once may have just created it
+            if not os.path.isdir(compose_dir_location):
+                raise
     with open(compose_file_location, 'w') as f:
         f.write(yaml.safe_dump(compose_config, default_flow_style=False))
 
@@ -35,27 +47,26 @@ def compose_up(compose_file_location, project_name, recreate_containers=True, qu
         command.append('--no-recreate')
     # strip_newlines should be True here so that we handle blank lines being caused by `docker pull <image>`
     check_and_log_output_and_error_demoted(command, env=get_docker_env(), strip_newlines=True, quiet_on_success=quiet)
+    containers_changed()
 
 def _compose_stop(compose_file_location, project_name, services):
     command = _compose_base_command(['stop', '-t', '1'], compose_file_location, project_name)
     if services:
         command += services
     check_and_log_output_and_error_demoted(command, env=get_docker_env())
+    containers_changed()
 
 def _compose_rm(compose_file_location, project_name, services):
     command = _compose_base_command(['rm', '-v', '-f'], compose_file_location, project_name)
     if services:
         command += services
     check_and_log_output_and_error_demoted(command, env=get_docker_env())
+    containers_changed()
 
-def _check_stopped_linked_containers(container, assembled_specs):
-    stopped_containers = []
-    app_or_service_name = get_app_or_service_name_from_container(container)
-    linked_containers = links_for_app_or_service(app_or_service_name, assembled_specs)
-    for linked_name in linked_containers:
-        if get_dusty_containers([linked_name]) == []:
-            stopped_containers.append(linked_name)
-    return stopped_containers
+def _restart_container(client, container):
+    start = time.time()
+    client.restart(container['Id'], timeout=1)
+    log_to_client('Restarted {} ({:.1f}s)'.format(get_canonical_container_name(container), time.time() - start))
 
 def _compose_restart(services):
     """Well, this is annoying. Compose 1.2 shipped with the
@@ -65,28 +76,52 @@ def _compose_restart(services):
     ourselves. Lame.
 
     Relevant fix which will make it into the next release:
-    https://github.com/docker/compose/pull/1318"""
-
-    def _restart_container(client, container):
-        log_to_client('Restarting {}'.format(get_canonical_container_name(container)))
-        client.restart(container['Id'], timeout=1)
+    https://github.com/docker/compose/pull/1318
 
+    Containers are restarted a link level at a time, so that everything
+    a container links to is up before it is restarted. Containers within
+    a level are restarted in parallel."""
     assembled_specs = get_assembled_specs()
     if services == []:
         services = [spec.name for spec in assembled_specs.get_apps_and_services()]
     logging.info('Restarting service containers from list: {}'.format(services))
-    client = get_docker_client()
+    containers = {}
     for service in services:
         container = get_container_for_app_or_service(service, include_exited=True)
         if container is None:
             log_to_client('No container found for {}'.format(service))
-            continue
-        stopped_linked_containers = _check_stopped_linked_containers(container, assembled_specs)
-        if stopped_linked_containers:
-            log_to_client('No running containers {0}, which are linked to by {1}.  Cannot restart {1}'.format(
-                              stopped_linked_containers, service))
         else:
-            _restart_container(client, container)
+            containers[service] = container
+    links = {service: links_for_app_or_service(service, assembled_specs) for service in containers}
+    # Linked containers which are down are fine if we're about to restart them. Dropping
+    # a service can leave services linking to it with a link down, so repeat until none do.
+    dropped_service = True
+    while dropped_service:
+        dropped_service = False
+        for service in sorted(containers):
+            stopped_linked_containers = [linked_name for linked_name in links[service]
+                                         if linked_name not in containers and get_container_for_app_or_service(linked_name) is None]
+            if stopped_linked_containers:
+                log_to_client('No running containers {0}, which are linked to by {1}.  Cannot restart {1}'.format(
+                                  stopped_linked_containers, service))
+                del containers[service]
+                dropped_service = True
+    client = get_docker_client()
+    try:
+        for level in link_levels(containers, links):
+            log_to_client('Restarting {}'.format(', '.join(level)))
+            with parallel_task_queue(pool_size=RESTART_POOL_SIZE) as queue:
+                for service in level:
+                    queue.enqueue_task(_restart_container, client, containers[service])
+    finally:
+        containers_changed()
+
+def _use_api_engine():
+    container_engine = get_config_value(constants.CONFIG_CONTAINER_ENGINE_KEY) or constants.CONTAINER_ENGINE_COMPOSE
+    if container_engine not in constants.CONTAINER_ENGINES:
+        raise RuntimeError('Unknown container_engine {} in your config, should be one of {}'.format(
+            container_engine, ', '.join(constants.CONTAINER_ENGINES)))
+    return container_engine == constants.CONTAINER_ENGINE_API
 
 def update_running_containers_from_spec(compose_config, recreate_containers=True):
     """Takes in a Compose spec from the Dusty Compose compiler,
@@ -94,6 +129,13 @@ def update_running_containers_from_spec(compose_config, recreate_containers=True
     up, then does everything needed to make sure the Docker VM is
     up and running containers with the updated config."""
     write_composefile(compose_config, constants.COMPOSEFILE_PATH)
+    if _use_api_engine():
+        unsupported_keys = engine.unsupported_keys(compose_config)
+        if not unsupported_keys:
+            engine.up(compose_config, recreate_containers=recreate_containers)
+            return
+        log_to_client('Using Docker Compose to start containers, since the api container engine '
+                      'does not support {}'.format(', '.join(unsupported_keys)))
     compose_up(constants.COMPOSEFILE_PATH, 'dusty', recreate_containers=recreate_containers)
 
 def stop_running_services(services=None):
@@ -105,7 +147,10 @@ def stop_running_services(services=None):
     apps and services."""
     if services is None:
         services = []
-    _compose_stop(constants.COMPOSEFILE_PATH, 'dusty', services)
+    if _use_api_engine():
+        engine.stop(services)
+    else:
+        _compose_stop(constants.COMPOSEFILE_PATH, 'dusty', services)
 
 def restart_running_services(services=None):
     """Restart containers owned by Dusty, or a specific
@@ -119,4 +164,7 @@ def restart_running_services(services=None):
     _compose_restart(services)
 
 def rm_containers(app_or_service_names):
-    _compose_rm(constants.COMPOSEFILE_PATH, 'dusty', app_or_service_names)
+    if _use_api_engine():
+        engine.rm(app_or_service_names)
+    else:
+        _compose_rm(constants.COMPOSEFILE_PATH, 'dusty', app_or_service_names)
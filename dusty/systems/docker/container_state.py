@@ -0,0 +1,138 @@
+"""A live table of Dusty's containers, kept up to date by the daemon from
+the Docker events stream, so that looking a container up doesn't need a
+round-trip to the Docker API.
+
+The table is started by the first container lookup once the daemon has
+enabled it. It opens the events stream, seeds itself from a full listing
+and then re-reads each container Docker reports an event for. If the
+stream disconnects the table rebuilds itself from a new listing; after
+RECONNECT_ATTEMPTS failures in a row it gives up, and lookups go to the
+API until the next one starts it again. A table only answers for the
+Docker client it was started with, and a new client is made whenever the
+VM is started, so restarting the VM rebuilds the table too."""
+
+import logging
+import threading
+import time
+
+RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY = 1
+
+_enabled = False
+_table = None
+_table_lock = threading.Lock()
+
+def _is_dusty_container(container):
+    return any(name.startswith('/dusty') for name in container.get('Names', []))
+
+class ContainerTable(object):
+    def __init__(self, client):
+        self.client = client
+        self._containers = {}
+        self._ready = False
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return not self._stopped
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name='dusty-container-events')
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        """The events thread can't be interrupted while it waits for an
+        event, so it exits when the next one arrives"""
+        with self._lock:
+            self._stopped = True
+            self._ready = False
+
+    def containers(self):
+        """Dusty's containers, in the form of a container listing, or None
+        if the table isn't known to be up to date"""
+        with self._lock:
+            if not self._ready:
+                return None
+            return self._containers.values()
+
+    def seed(self, listing):
+        with self._lock:
+            self._containers = {container['Id']: container for container in listing if _is_dusty_container(container)}
+            self._ready = not self._stopped
+
+    def mark_stale(self):
+        with self._lock:
+            self._ready = False
+
+    def handle_event(self, event):
+        # Only container events have the image they were started `from`
+        container_id = event.get('id')
+        if not container_id or 'from' not in event:
+            return
+        if event.get('status') == 'destroy':
+            listing = []
+        else:
+            listing = self.client.containers(all=True, filters={'id': container_id})
+        with self._lock:
+            self._containers.pop(container_id, None)
+            for container in listing:
+                if _is_dusty_container(container):
+                    self._containers[container['Id']] = container
+
+    def _run(self):
+        failures = 0
+        while not self._stopped:
+            try:
+                # Subscribe before listing, so nothing happens in between unseen
+                events = self.client.events(decode=True)
+                self.seed(self.client.containers(all=True))
+                failures = 0
+                for event in events:
+                    if self._stopped:
+                        return
+                    self.handle_event(event)
+                logging.info('Docker events stream ended')
+            except Exception:
+                logging.exception('Error following the Docker events stream')
+            self.mark_stale()
+            failures += 1
+            if failures >= RECONNECT_ATTEMPTS:
+                logging.info('Giving up on the Docker events stream until the next container lookup')
+                self.stop()
+                return
+            time.sleep(RECONNECT_DELAY)
+
+def enable():
+    """Called by the daemon. Outside of it, lookups always list containers."""
+    global _enabled
+    _enabled = True
+
+def live_containers(client):
+    """Dusty's containers from the table following `client`'s events,
+    starting one if need be. Returns None if the table can't answer yet."""
+    global _table
+    if not _enabled:
+        return None
+    with _table_lock:
+        if _table is None or not _table.running or _table.client is not client:
+            if _table is not None:
+                _table.stop()
+            _table = ContainerTable(client)
+            _table.start()
+            return None
+        return _table.containers()
+
+def record_listing(client, listing):
+    """Brings the table up to date with a listing we had to make anyway"""
+    with _table_lock:
+        if _table is not None and _table.client is client:
+            _table.seed(listing)
+
+def mark_stale():
+    """Called after Dusty changes containers itself. Docker may not have
+    told the table about the change yet, so the next lookup lists them."""
+    with _table_lock:
+        if _table is not None:
+            _table.mark_stale()
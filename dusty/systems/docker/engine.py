@@ -0,0 +1,211 @@
+"""Runs Dusty's containers by driving the Docker API directly, as an
+alternative to running Docker Compose. Turned on with
+`dusty config set container_engine api`.
+
+The engine takes the same compose config Dusty writes for Compose, and
+creates and starts containers a link level at a time, in parallel within
+each level. Every container is labelled with a hash of its config and
+image, and containers whose hash hasn't changed are left alone. Containers
+also get the labels Compose gives its own, so that Compose still manages
+them if the engine is switched back.
+
+Only the compose keys Dusty's specs commonly use are translated. Compose
+configs using any others are run with Compose instead."""
+
+import hashlib
+import json
+import time
+
+import docker
+
+from . import (get_docker_client, get_dusty_container_name, get_container_for_app_or_service,
+               get_dusty_containers, container_is_running, containers_changed,
+               get_canonical_container_name)
+from . import pull
+from ...log import log_to_client
+from ...parallel import parallel_task_queue
+
+PROJECT_NAME = 'dusty'
+CONFIG_HASH_LABEL = 'com.dusty.config-hash'
+COMPOSE_PROJECT_LABEL = 'com.docker.compose.project'
+COMPOSE_SERVICE_LABEL = 'com.docker.compose.service'
+
+# How many containers in a link level are worked on at once
+POOL_SIZE = 8
+
+# Passed straight through to create_container
+_CONTAINER_KEYS = ['command', 'entrypoint', 'environment', 'hostname', 'domainname', 'user',
+                   'working_dir', 'tty', 'stdin_open', 'cpu_shares']
+# Passed straight through to create_host_config. Memory limits moved to the
+# host config in API version 1.19, and docker-py refuses them on the container.
+_HOST_CONFIG_KEYS = ['privileged', 'dns', 'cap_add', 'cap_drop', 'mem_limit', 'memswap_limit']
+SUPPORTED_KEYS = set(_CONTAINER_KEYS + _HOST_CONFIG_KEYS +
+                     ['image', 'links', 'volumes', 'ports', 'expose', 'net', 'restart', 'extra_hosts', 'labels'])
+
+def unsupported_keys(compose_config):
+    return sorted(set(key for service_config in compose_config.values() for key in service_config) - SUPPORTED_KEYS)
+
+def link_levels(services, links):
+    """Groups `services` into levels which only link to services in
+    earlier levels, or to services not in `services` at all, so that each
+    level can be started in parallel once the ones before it are up.
+    Services linking each other in a cycle end up in a level together."""
+    remaining = set(services)
+    levels = []
+    while remaining:
+        level = sorted(service for service in remaining
+                       if not set(links.get(service, [])) & (remaining - set([service])))
+        if not level:
+            level = sorted(remaining)
+        levels.append(level)
+        remaining -= set(level)
+    return levels
+
+def _service_links(compose_config):
+    return {service: [link.split(':')[0] for link in config.get('links', [])]
+            for service, config in compose_config.iteritems()}
+
+def config_hash(service_config, image_id):
+    return hashlib.sha1(json.dumps([service_config, image_id], sort_keys=True)).hexdigest()
+
+def _links(service_config):
+    """Links under the same aliases Compose gives them"""
+    links = []
+    for link in service_config.get('links', []):
+        service, _, alias = link.partition(':')
+        container_name = get_dusty_container_name(service)
+        links += [(container_name, alias or service), (container_name, container_name),
+                  (container_name, container_name[len(PROJECT_NAME) + 1:])]
+    return links
+
+def _volumes(service_config):
+    volumes, binds = [], {}
+    for volume in service_config.get('volumes', []):
+        parts = volume.split(':')
+        if len(parts) == 1:
+            volumes.append(parts[0])
+        else:
+            volumes.append(parts[1])
+            binds[parts[0]] = {'bind': parts[1], 'ro': len(parts) > 2 and parts[2] == 'ro'}
+    return volumes, binds
+
+def _port_key(container_port):
+    port, _, protocol = container_port.partition('/')
+    return (int(port), protocol) if protocol else int(port)
+
+def _ports(service_config):
+    """Returns the ports to expose and how they're bound to the VM's, from
+    ports such as '80', '8000:80', '127.0.0.1:8000:80' or '53/udp'. A
+    container port may be bound to several of the VM's."""
+    ports, port_bindings = [], {}
+    for port in service_config.get('expose', []):
+        ports.append(_port_key(str(port)))
+    for port in service_config.get('ports', []):
+        parts = str(port).split(':')
+        ports.append(_port_key(parts[-1]))
+        if len(parts) == 2:
+            port_bindings.setdefault(parts[-1], []).append(parts[0])
+        elif len(parts) == 3:
+            port_bindings.setdefault(parts[-1], []).append((parts[0], parts[1]))
+    return ports, port_bindings
+
+def _restart_policy(restart):
+    name, _, retries = restart.partition(':')
+    return {'Name': name, 'MaximumRetryCount': int(retries or 0)}
+
+def _key_value_dict(value, separator):
+    if isinstance(value, dict):
+        return value
+    return dict(item.split(separator, 1) for item in value)
+
+def create_container_kwargs(service, service_config, hash_value):
+    volumes, binds = _volumes(service_config)
+    ports, port_bindings = _ports(service_config)
+    host_config_kwargs = {key: service_config[key] for key in _HOST_CONFIG_KEYS if key in service_config}
+    if 'net' in service_config:
+        host_config_kwargs['network_mode'] = service_config['net']
+    if 'restart' in service_config:
+        host_config_kwargs['restart_policy'] = _restart_policy(service_config['restart'])
+    if 'extra_hosts' in service_config:
+        host_config_kwargs['extra_hosts'] = _key_value_dict(service_config['extra_hosts'], ':')
+    labels = _key_value_dict(service_config.get('labels', {}), '=')
+    labels.update({CONFIG_HASH_LABEL: hash_value,
+                   COMPOSE_PROJECT_LABEL: PROJECT_NAME,
+                   COMPOSE_SERVICE_LABEL: service,
+                   'com.docker.compose.oneoff': 'False',
+                   'com.docker.compose.container-number': '1'})
+    kwargs = {key: service_config[key] for key in _CONTAINER_KEYS if key in service_config}
+    kwargs.update(image=service_config['image'],
+                  name=get_dusty_container_name(service),
+                  volumes=volumes,
+                  ports=ports,
+                  labels=labels,
+                  host_config=docker.utils.create_host_config(binds=binds, port_bindings=port_bindings,
+                                                              links=_links(service_config), **host_config_kwargs))
+    return kwargs
+
+def _up_service(client, service, service_config, recreate_containers):
+    start = time.time()
+    hash_value = config_hash(service_config, client.inspect_image(service_config['image'])['Id'])
+    container = get_container_for_app_or_service(service, include_exited=True)
+    if container is not None:
+        unchanged = (container.get('Labels') or {}).get(CONFIG_HASH_LABEL) == hash_value
+        if unchanged or not recreate_containers:
+            if container_is_running(container):
+                log_to_client('{} is up to date'.format(service))
+            else:
+                client.start(container['Id'])
+                log_to_client('Started {} ({:.1f}s)'.format(service, time.time() - start))
+            return
+        client.remove_container(container['Id'], v=True, force=True)
+    created = client.create_container(**create_container_kwargs(service, service_config, hash_value))
+    client.start(created['Id'])
+    log_to_client('{} {} ({:.1f}s)'.format('Recreated' if container else 'Created', service, time.time() - start))
+
+def up(compose_config, recreate_containers=True):
+    """Brings up every service in `compose_config`, a link level at a time"""
+    client = get_docker_client()
+    pull.pull_images([service_config['image'] for service_config in compose_config.values()])
+    try:
+        for level in link_levels(compose_config, _service_links(compose_config)):
+            with parallel_task_queue(pool_size=POOL_SIZE) as queue:
+                for service in level:
+                    queue.enqueue_task(_up_service, client, service, compose_config[service], recreate_containers)
+    finally:
+        containers_changed()
+
+def _project_containers(services, include_exited):
+    if services:
+        return get_dusty_containers(services, include_exited=include_exited)
+    return [container for container in get_dusty_containers(None, include_exited=include_exited)
+            if (container.get('Labels') or {}).get(COMPOSE_PROJECT_LABEL) == PROJECT_NAME]
+
+def _stop_container(client, container):
+    client.stop(container['Id'], timeout=1)
+    log_to_client('Stopped {}'.format(get_canonical_container_name(container)))
+
+def _remove_container(client, container):
+    client.remove_container(container['Id'], v=True)
+    log_to_client('Removed {}'.format(get_canonical_container_name(container)))
+
+def stop(services=None):
+    """Stops the containers of `services`, or of all Dusty's services"""
+    client = get_docker_client()
+    try:
+        with parallel_task_queue(pool_size=POOL_SIZE) as queue:
+            for container in _project_containers(services, include_exited=False):
+                queue.enqueue_task(_stop_container, client, container)
+    finally:
+        containers_changed()
+
+def rm(services=None):
+    """Removes the stopped containers of `services`, or of all Dusty's
+    services, along with their volumes"""
+    client = get_docker_client()
+    try:
+        with parallel_task_queue(pool_size=POOL_SIZE) as queue:
+            for container in _project_containers(services, include_exited=True):
+                if not container_is_running(container):
+                    queue.enqueue_task(_remove_container, client, container)
+    finally:
+        containers_changed()
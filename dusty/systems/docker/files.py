@@ -1,5 +1,11 @@
-from . import exec_in_container, get_container_for_app_or_service
+import os
+import pipes
+import uuid
+
+from . import exec_in_container, get_container_for_app_or_service, get_docker_client
 from ...path import parent_dir
+from ...subprocess import check_and_log_output_and_error_demoted
+from ..virtualbox import vm_ssh_command
 
 def _create_dir_in_container(container, path):
     return exec_in_container(container, 'mkdir -p', path)
@@ -7,30 +13,87 @@ def _create_dir_in_container(container, path):
 def _remove_path_in_container(container, path):
     return exec_in_container(container, 'rm -rf', path)
 
-def _move_in_container(container, source_path, dest_path):
-    return exec_in_container(container, 'mv', source_path, dest_path)
-
 def _recursive_copy_in_container(container, source_path, dest_path):
     return exec_in_container(container, 'cp -r', source_path, dest_path)
 
-def copy_path_inside_container(app_or_service_name, source_path, dest_path):
-    container = get_container_for_app_or_service(app_or_service_name, raise_if_not_found=True)
+def _staging_dir(dest_path):
+    """Archives are extracted next to their destination and then moved
+    into place, so that the move is a rename on the same file system"""
+    return os.path.join(parent_dir(dest_path), '.dusty-cp-{}'.format(uuid.uuid1()))
 
-    _create_dir_in_container(container, parent_dir(dest_path))
-    _recursive_copy_in_container(container, source_path, dest_path)
+def _replace_from_staging_script(staging_dir, name, dest_path):
+    """A shell script which moves `name`, extracted into `staging_dir`,
+    to `dest_path`. A directory replaces whatever is at `dest_path`; a
+    file copied onto an existing directory ends up inside it, like `mv`.
+    The staging dir is removed whether or not this works."""
+    staged_path = pipes.quote(os.path.join(staging_dir, name))
+    dest_path = pipes.quote(dest_path)
+    return ('if [ -e {0} ]; then '
+            'if [ -d {0} ]; then rm -rf {1}; fi && mv {0} {1}; '
+            'else false; fi; '
+            'status=$?; rm -rf {2}; exit $status').format(staged_path, dest_path, pipes.quote(staging_dir))
 
-def move_dir_inside_container(app_or_service_name, source_path, dest_path):
+def _exec_script_in_container(container, script):
+    client = get_docker_client()
+    exec_instance = client.exec_create(container['Id'], ['sh', '-c', script])
+    output = client.exec_start(exec_instance['Id'])
+    if client.exec_inspect(exec_instance['Id'])['ExitCode']:
+        raise RuntimeError('Command failed inside container: {}'.format(output.strip()))
+    return output
+
+def put_archive(container, path, data):
+    """Extracts the tar archive `data`, which may be compressed, into the
+    directory `path` inside `container` using the Docker API's archive
+    endpoint. `data` is a file-like object or a generator of chunks, which
+    is streamed to Docker as it is read. docker-py doesn't wrap this
+    endpoint yet, so we make the request ourselves."""
+    client = get_docker_client()
+    url = client._url('/containers/{}/archive'.format(container['Id']))
+    response = client.put(url, params={'path': path}, data=data, **client._set_request_timeout({}))
+    client._raise_for_status(response)
+
+def put_archive_at_path(app_or_service_name, data, name, dest_path):
+    """Streams the tar archive `data`, holding a single file or directory
+    called `name`, into the container so that it ends up at `dest_path`"""
     container = get_container_for_app_or_service(app_or_service_name, raise_if_not_found=True)
+    staging_dir = _staging_dir(dest_path)
+    _create_dir_in_container(container, staging_dir)
+    try:
+        put_archive(container, staging_dir, data)
+    except Exception:
+        _remove_path_in_container(container, staging_dir)
+        raise
+    _exec_script_in_container(container, _replace_from_staging_script(staging_dir, name, dest_path))
 
-    _create_dir_in_container(container, parent_dir(dest_path))
-    _remove_path_in_container(container, dest_path)
-    _move_in_container(container, '{}/'.format(source_path), dest_path)
+def copy_path_between_containers(source_name, source_path, dest_name, dest_path):
+    """Streams a tar of `source_path` out of one container and into
+    another from within the VM, so the files never leave it. `docker cp`
+    with `-` uses the archive endpoints of the VM's Docker daemon.
 
-def move_file_inside_container(app_or_service_name, source_path, dest_path):
+    The destination is only replaced if both ends of the pipe succeed.
+    The source's exit status is passed out of the pipe on fd 3, since the
+    VM's shell may not support pipefail. If either end fails, the staging
+    dir is removed and the command fails."""
+    source = get_container_for_app_or_service(source_name, raise_if_not_found=True)
+    dest = get_container_for_app_or_service(dest_name, raise_if_not_found=True)
+    # The archive holds the source under its base name, which a trailing slash would hide
+    source_path = source_path.rstrip(os.sep) or os.sep
+    staging_dir = _staging_dir(dest_path)
+    command = ('docker exec {dest} mkdir -p {staging} && '
+               'source_status=$({{ {{ docker cp {source}:{source_path} -; echo $? >&3; }} | '
+               'docker cp - {dest}:{staging} >&2; }} 3>&1) && [ "$source_status" -eq 0 ] && '
+               'docker exec {dest} sh -c {finish} || '
+               '{{ docker exec {dest} rm -rf {staging}; false; }}').format(
+                   dest=dest['Id'], source=source['Id'], source_path=pipes.quote(source_path),
+                   staging=pipes.quote(staging_dir),
+                   finish=pipes.quote(_replace_from_staging_script(staging_dir, os.path.basename(source_path), dest_path)))
+    check_and_log_output_and_error_demoted(vm_ssh_command(command), quiet_on_success=True)
+
+def copy_path_inside_container(app_or_service_name, source_path, dest_path):
     container = get_container_for_app_or_service(app_or_service_name, raise_if_not_found=True)
 
     _create_dir_in_container(container, parent_dir(dest_path))
-    _move_in_container(container, source_path, dest_path)
+    _recursive_copy_in_container(container, source_path, dest_path)
 
 def container_path_exists(app_or_service_name, path):
     container = get_container_for_app_or_service(app_or_service_name, raise_if_not_found=True)
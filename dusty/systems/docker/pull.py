@@ -0,0 +1,121 @@
+"""Pulls the images Dusty's containers need before any of them are
+started, several at a time, instead of leaving Compose to pull each one
+as it gets to it.
+
+Docker reports a pull's progress as a stream of per-layer messages. These
+are summed up into one status line per image, logged every
+PROGRESS_INTERVAL seconds while the pull goes on and once when it ends."""
+
+import json
+import time
+
+from . import get_docker_client
+from ...log import log_to_client
+from ...parallel import parallel_task_queue
+
+POOL_SIZE = 4
+PROGRESS_INTERVAL = 10
+
+DEFAULT_REGISTRY_PREFIXES = ('docker.io/', 'index.docker.io/', 'registry-1.docker.io/')
+OFFICIAL_REPOSITORY_PREFIX = 'library/'
+
+def split_image_name(image_name):
+    """Returns the repository and the tag or digest of `image_name`. Digest
+    references (repo@sha256:...) keep their digest whole, so that they are
+    not split at the colon inside it."""
+    if '@' in image_name:
+        return tuple(image_name.split('@', 1))
+    if ':' in image_name.split('/')[-1]:
+        return tuple(image_name.rsplit(':', 1))
+    return image_name, 'latest'
+
+def full_image_name(image_name):
+    """Image names as they appear in an image's RepoTags, or its RepoDigests
+    for digest references"""
+    repository, reference = split_image_name(image_name)
+    return '{}{}{}'.format(repository, '@' if '@' in image_name else ':', reference)
+
+def _normalized_image_name(image_name):
+    """Docker Hub images may be spelled with or without the registry and
+    library/ prefixes, but are listed without them"""
+    image_name = full_image_name(image_name)
+    for prefix in DEFAULT_REGISTRY_PREFIXES:
+        if image_name.startswith(prefix):
+            image_name = image_name[len(prefix):]
+            break
+    if image_name.startswith(OFFICIAL_REPOSITORY_PREFIX):
+        image_name = image_name[len(OFFICIAL_REPOSITORY_PREFIX):]
+    return image_name
+
+def missing_images(client, image_names):
+    present = set(_normalized_image_name(name) for image in client.images()
+                  for name in (image.get('RepoTags') or []) + (image.get('RepoDigests') or []))
+    missing = {}
+    for image_name in image_names:
+        normalized = _normalized_image_name(image_name)
+        if normalized not in present:
+            missing.setdefault(normalized, full_image_name(image_name))
+    return sorted(missing.values())
+
+def _messages(stream):
+    for chunk in stream:
+        for line in chunk.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+class PullProgress(object):
+    def __init__(self, image_name):
+        self.image_name = image_name
+        self.started_at = time.time()
+        self.layers = {}
+        self.completed = set()
+        self.already_present = set()
+
+    def update(self, message):
+        if 'error' in message:
+            raise RuntimeError('Could not pull {}: {}'.format(self.image_name, message['error']))
+        layer, status = message.get('id'), message.get('status', '')
+        if not layer or layer == split_image_name(self.image_name)[1]:
+            return
+        detail = message.get('progressDetail') or {}
+        if status == 'Downloading' and detail.get('total'):
+            self.layers[layer] = (detail.get('current', 0), detail['total'])
+        elif status == 'Already exists':
+            self.already_present.add(layer)
+        elif status in ('Download complete', 'Pull complete'):
+            size = self.layers.get(layer, (0, 0))[1]
+            self.layers[layer] = (size, size)
+            if status == 'Pull complete':
+                self.completed.add(layer)
+        else:
+            self.layers.setdefault(layer, (0, 0))
+
+    def describe(self):
+        downloaded = sum(current for current, _ in self.layers.values()) / (1024.0 * 1024)
+        total = sum(size for _, size in self.layers.values()) / (1024.0 * 1024)
+        layer_count = len(set(self.layers) | self.already_present)
+        done = len(self.completed | self.already_present)
+        return '{}: {}/{} layers, {:.1f} of {:.1f} MB, {:.0f}s'.format(
+            self.image_name, done, layer_count, downloaded, total, time.time() - self.started_at)
+
+def pull_image(client, image_name):
+    repository, tag = split_image_name(image_name)
+    progress = PullProgress(image_name)
+    last_report = time.time()
+    for message in _messages(client.pull(repository, tag, stream=True, insecure_registry=True)):
+        progress.update(message)
+        if time.time() - last_report >= PROGRESS_INTERVAL:
+            log_to_client('Pulling {}'.format(progress.describe()))
+            last_report = time.time()
+    log_to_client('Pulled {}'.format(progress.describe()))
+
+def pull_images(image_names):
+    """Pulls whichever of `image_names` aren't already in the VM"""
+    client = get_docker_client()
+    to_pull = missing_images(client, image_names)
+    if not to_pull:
+        return
+    log_to_client('Pulling images: {}'.format(', '.join(to_pull)))
+    with parallel_task_queue(pool_size=POOL_SIZE) as queue:
+        for image_name in to_pull:
+            queue.enqueue_task(pull_image, client, image_name)
@@ -6,7 +6,7 @@ from ...compiler.spec_assembler import get_expanded_libs_specs
 from ...log import log_to_client
 from ...command_file import dusty_command_file_name, lib_install_commands_for_app_or_lib
 from .common import spec_for_service
-from . import get_docker_client
+from . import get_docker_client, ensure_image_pulled
 from ... import constants
 
 class ImageCreationError(Exception):
@@ -20,7 +20,7 @@ def _ensure_base_image(app_or_lib_name):
     log_to_client('Getting the base image for the new image')
     docker_client = get_docker_client()
     if 'image' in testing_spec:
-        _ensure_image_pulled(testing_spec['image'])
+        ensure_image_pulled(testing_spec['image'])
         return testing_spec['image']
     elif 'build' in testing_spec:
         image_tag = 'dusty_testing_base/image'
@@ -32,19 +32,6 @@ def _ensure_base_image(app_or_lib_name):
         docker_client.build(path=testing_spec['build'], tag=image_tag)
         return image_tag
 
-def _ensure_image_pulled(image_name):
-    docker_client = get_docker_client()
-    full_image_name = image_name
-    if ':' not in image_name:
-        full_image_name = '{}:latest'.format(image_name)
-    for image in docker_client.images():
-        if full_image_name in image['RepoTags']:
-            break
-    else:
-        split = image_name.split(':')
-        repo, tag = split[0], 'latest' if len(split) == 1 else split[1]
-        docker_client.pull(repo, tag, insecure_registry=True)
-
 def _get_split_volumes(volumes):
     print volumes
     split_volumes = []
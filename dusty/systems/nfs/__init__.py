@@ -1,10 +1,15 @@
 from . import client
 from . import server
+from .server import nfs_repos
 
 def configure_nfs():
     server.configure_nfs_server()
     client.mount_active_repos()
 
+def active_repos_to_mount():
+    return client.active_repos_to_mount()
+
 def update_nfs_with_repos(repos):
+    repos = nfs_repos(repos)
     server.add_exports_for_repos(repos)
     client.remount_repos(repos)
@@ -0,0 +1,102 @@
+"""A standard file workload run inside a container against a repo's
+mount, to compare NFS mount profiles (and rsync) with real numbers.
+
+The files read by the workload are written on the host right before it
+runs, so the VM has none of them cached and reads have to go over the
+mount. Each step of the workload is a separate `docker exec`, timed from
+here; the time an exec of `true` takes is subtracted from every step."""
+
+import os
+import shutil
+import time
+
+import docker
+
+from ..docker import get_docker_client, ensure_image_pulled
+from ..sync import sync_repos
+
+BENCH_IMAGE = 'busybox:latest'
+BENCH_DIR_NAME = '.dusty-bench'
+CONTAINER_MOUNT = '/bench'
+
+SMALL_FILE_COUNT = 200
+SMALL_FILE_SIZE = 4096
+LARGE_FILE_MB = 32
+STAT_ROUNDS = 5
+FSYNC_WRITES = 50
+
+class Workload(object):
+    def __init__(self, name, unit, amount, script):
+        self.name = name
+        self.unit = unit
+        self.amount = amount
+        self.script = script
+
+def _bench_dir(mount_dir):
+    return os.path.join(mount_dir, BENCH_DIR_NAME)
+
+WORKLOADS = [
+    Workload('stat storm', 'stats/s', STAT_ROUNDS * SMALL_FILE_COUNT,
+             'for round in $(seq {}); do ls -l {}/small > /dev/null; done'.format(STAT_ROUNDS, _bench_dir(CONTAINER_MOUNT))),
+    Workload('small file reads', 'files/s', SMALL_FILE_COUNT,
+             'cat {}/small/* > /dev/null'.format(_bench_dir(CONTAINER_MOUNT))),
+    Workload('large sequential read', 'MB/s', LARGE_FILE_MB,
+             'cat {}/large > /dev/null'.format(_bench_dir(CONTAINER_MOUNT))),
+    Workload('write + fsync', 'writes/s', FSYNC_WRITES,
+             'for i in $(seq {0}); do dd if=/dev/zero of={1}/written_$i bs=4k count=1 conv=fsync 2> /dev/null; done'.format(
+                 FSYNC_WRITES, _bench_dir(CONTAINER_MOUNT))),
+]
+
+def _write_bench_files(local_path):
+    bench_dir = _bench_dir(local_path)
+    if os.path.exists(bench_dir):
+        shutil.rmtree(bench_dir)
+    os.makedirs(os.path.join(bench_dir, 'small'))
+    for i in range(SMALL_FILE_COUNT):
+        with open(os.path.join(bench_dir, 'small', str(i)), 'wb') as f:
+            f.write(os.urandom(SMALL_FILE_SIZE))
+    chunk = os.urandom(1024 * 1024)
+    with open(os.path.join(bench_dir, 'large'), 'wb') as f:
+        for _ in range(LARGE_FILE_MB):
+            f.write(chunk)
+
+def _timed_exec(client, container_id, script):
+    exec_instance = client.exec_create(container_id, ['sh', '-c', script])
+    start = time.time()
+    output = client.exec_start(exec_instance['Id'])
+    elapsed = time.time() - start
+    if client.exec_inspect(exec_instance['Id'])['ExitCode']:
+        raise RuntimeError('Benchmark step `{}` failed: {}'.format(script, output.strip()))
+    return elapsed
+
+def run_workloads(client, container_id):
+    """Returns the rate each workload ran at, in its own units, as a
+    list of (workload, rate) pairs"""
+    overhead = min(_timed_exec(client, container_id, 'true') for _ in range(3))
+    results = []
+    for workload in WORKLOADS:
+        elapsed = max(_timed_exec(client, container_id, workload.script) - overhead, 0.001)
+        results.append((workload, workload.amount / elapsed))
+    return results
+
+def bench_repo_mount(repo):
+    """Runs the workload against `repo` as mounted in the VM, leaving no
+    files behind"""
+    client = get_docker_client()
+    ensure_image_pulled(BENCH_IMAGE)
+    _write_bench_files(repo.local_path)
+    container = None
+    try:
+        # Copies the new files onto the VM; repos mounted over NFS are left alone
+        sync_repos([repo])
+        container = client.create_container(image=BENCH_IMAGE,
+                                            command='sleep 3600',
+                                            volumes=[CONTAINER_MOUNT],
+                                            host_config=docker.utils.create_host_config(
+                                                binds={repo.vm_path: {'bind': CONTAINER_MOUNT, 'ro': False}}))
+        client.start(container=container['Id'])
+        return run_workloads(client, container['Id'])
+    finally:
+        if container is not None:
+            client.remove_container(container=container['Id'], force=True)
+        shutil.rmtree(_bench_dir(repo.local_path), ignore_errors=True)
@@ -1,83 +1,151 @@
 from __future__ import absolute_import
 
+import collections
 import logging
 from subprocess import CalledProcessError
-import time
 
 from ... import constants
-from ..virtualbox import get_host_ip
+from ..virtualbox import get_host_ip, vm_ssh_command
 from ...log import log_to_client
-from ...subprocess import call_demoted, check_call_demoted, check_output_demoted, check_output_demoted
-from ...compiler.spec_assembler import get_all_repos
+from ...subprocess import check_output_demoted
+from ...config import get_nfs_mount_profiles
+from ...compiler.spec_assembler import get_all_repos, get_spec_nfs_mount_profiles
+from .server import nfs_repos
+
+_START_NFS_CLIENT_COMMAND = 'sudo /usr/local/etc/init.d/nfs-client start > /dev/null'
+
+# Retries mounts refused by nfsd for up to 10 seconds, since the NFS server
+# may still be restarting after we updated its exports
+_MOUNT_WITH_RETRY_FUNCTION = """dusty_mount () {
+    for attempt in 1 2 3 4 5 6 7 8 9 10; do
+        output=$(sudo mount "$@" 2>&1) && return 0
+        case "$output" in
+            *"Connection refused"*) sleep 1 ;;
+            *) echo "$output"; return 1 ;;
+        esac
+    done
+    echo "Failed to mount $6: the NFS server refused the connection"
+    return 1
+}"""
+
+_UNREADABLE_MARKER = 'dusty-unreadable'
+
+# Mount options which tell the profiles apart, as the VM's mount table shows
+# them. The kernel only lists acregmin when it isn't the default.
+_PROFILE_MOUNT_TABLE_OPTIONS = ('proto', 'acregmin', 'nocto')
+
+VMMount = collections.namedtuple('VMMount', ['source', 'options'])
 
 def mount_active_repos():
-    remount_repos(get_all_repos(active_only=True, include_specs_repo=False))
+    remount_repos(nfs_repos(get_all_repos(active_only=True, include_specs_repo=False)))
+
+def active_repos_to_mount():
+    """The active repos which `mount_active_repos` would (re)mount right now.
+    Containers bound to a repo's old mount keep using it once the repo is
+    remounted, so `dusty up` recreates the containers mounting these."""
+    repos = nfs_repos(get_all_repos(active_only=True, include_specs_repo=False))
+    if not repos:
+        return []
+    mounts, unreadable = _get_vm_mounts([repo.vm_path for repo in repos])
+    return _repos_to_mount(repos, mounts, unreadable)
+
+def _repos_to_mount(repos, mounts, unreadable):
+    return [repo for repo in repos if not _is_mounted_correctly(repo, mounts) or repo.vm_path in unreadable]
 
 def remount_repos(repos):
-    _start_nfs_client()
-    for i, repo in enumerate(repos):
-        _unmount_repo(repo)
-        _mount_repo(repo, wait_for_server=(i==0))
+    """Makes sure every one of `repos` is mounted in the VM from its current
+    local path. Repos which are already mounted correctly are left alone.
+    The VM's mount table is read in one SSH round-trip and any mounts that
+    are missing, point at the wrong source, were made with a different
+    profile or can no longer be read are fixed up by a single script in a
+    second one."""
+    repos = list(repos)
+    if not repos:
+        return
+    mounts, unreadable = _get_vm_mounts([repo.vm_path for repo in repos])
+    repos_to_mount = _repos_to_mount(repos, mounts, unreadable)
+    if not repos_to_mount:
+        logging.info('All {} repos are already mounted'.format(len(repos)))
+        return
+    logging.info('Mounting repos: {}'.format(', '.join(repo.short_name for repo in repos_to_mount)))
+    script = ['set -e', _START_NFS_CLIENT_COMMAND, _MOUNT_WITH_RETRY_FUNCTION]
+    for repo in repos_to_mount:
+        if repo.vm_path in mounts:
+            script.append('sudo umount -l {}'.format(repo.vm_path))
+        script.append('sudo mkdir -p {}'.format(repo.vm_path))
+        script.append('dusty_mount {}'.format(_nfs_mount_args_string(repo)))
+    try:
+        _run_script_on_vm(script)
+    except CalledProcessError as e:
+        logging.info(e.output)
+        log_to_client(e.output.strip())
+        raise RuntimeError('Unable to mount repo with NFS')
 
 def unmount_all_repos():
-    mounts = check_output_demoted(['docker-machine', 'ssh', constants.VM_MACHINE_NAME,
-                                   'mount | {{ grep {} || true; }}'.format(constants.VM_REPOS_DIR)])
-    mounted_dirs = []
-    for mount in mounts.splitlines():
-        for word in mount.split(' '):
-            if constants.VM_REPOS_DIR in word:
-                mounted_dirs.append(word)
-    for mounted_dir in mounted_dirs:
-        _unmount_vm_dir(mounted_dir)
-
-def _start_nfs_client():
-    check_call_demoted(['docker-machine', 'ssh', constants.VM_MACHINE_NAME,
-                        'sudo /usr/local/etc/init.d/nfs-client start'])
-
-def _unmount_repo(repo):
-    _unmount_vm_dir(repo.vm_path)
-
-def _unmount_vm_dir(vm_dir):
-    call_demoted(['docker-machine', 'ssh', constants.VM_MACHINE_NAME,
-                  'sudo umount -l {}'.format(vm_dir)])
-
-def _mount_repo(repo, wait_for_server=False):
-    """
-    This function will create the VM directory where a repo will be mounted, if it
-    doesn't exist.  If wait_for_server is set, it will wait up to 10 seconds for
-    the nfs server to start, by retrying mounts that fail with 'Connection Refused'.
-
-    If wait_for_server is not set, it will attempt to run the mount command once
-    """
-    check_call_demoted(['docker-machine', 'ssh', constants.VM_MACHINE_NAME,
-                        'sudo mkdir -p {}'.format(repo.vm_path)])
-    if wait_for_server:
-        for i in range(0,10):
-            try:
-                _run_mount_command(repo)
-                return
-            except CalledProcessError as e:
-                if 'Connection refused' in e.output:
-                    logging.info('Failed to mount repo; waiting for nfsd to restart')
-                    time.sleep(1)
-                else:
-                    logging.info(e.output)
-                    raise e
-        log_to_client('Failed to mount repo {}'.format(repo.short_name))
-        raise RuntimeError('Unable to mount repo with NFS')
-    else:
-        _run_mount_command(repo)
+    mounts, _ = _get_vm_mounts([])
+    if mounts:
+        _run_script_on_vm(['sudo umount -l {} || true'.format(mounted_dir) for mounted_dir in sorted(mounts)])
+
+def _is_mounted_correctly(repo, mounts):
+    mount = mounts.get(repo.vm_path)
+    if mount is None or mount.source != _nfs_mount_source(repo):
+        return False
+    return _profile_options(mount.options) == _profile_options(_mount_table_options(_nfs_mount_options(repo)))
+
+def _profile_options(options):
+    return set(option for option in options if option.split('=')[0] in _PROFILE_MOUNT_TABLE_OPTIONS)
+
+def _mount_table_options(mount_options):
+    """How `mount_options` are shown in the VM's mount table, as far as
+    the options which tell profiles apart are concerned"""
+    options = set()
+    for option in mount_options:
+        if option in ('tcp', 'udp'):
+            options.add('proto={}'.format(option))
+        elif option.startswith('actimeo='):
+            options.add('acregmin={}'.format(option.split('=')[1]))
+        else:
+            options.add(option)
+    return options
+
+def _get_vm_mounts(vm_paths):
+    """Returns a dict of the source and options of every NFS mount under the
+    VM's repos dir, keyed by mount point, along with the set of `vm_paths`
+    which are mount points that can't be read (e.g. their file handle is stale)"""
+    command = 'mount | {{ grep " on {}" || true; }}'.format(constants.VM_REPOS_DIR)
+    if vm_paths:
+        command += '; for dir in {}; do [ -d $dir ] || echo {} $dir; done'.format(' '.join(vm_paths), _UNREADABLE_MARKER)
+    mounts, unreadable = {}, set()
+    for line in check_output_demoted(vm_ssh_command(command)).splitlines():
+        words = line.split()
+        if len(words) == 2 and words[0] == _UNREADABLE_MARKER:
+            unreadable.add(words[1])
+        elif len(words) >= 3 and words[1] == 'on' and words[2].startswith(constants.VM_REPOS_DIR):
+            options = words[5].strip('()').split(',') if len(words) >= 6 else []
+            mounts[words[2]] = VMMount(words[0], set(options))
+    return mounts, unreadable & set(mounts)
+
+def _run_script_on_vm(script_lines):
+    return check_output_demoted(vm_ssh_command('\n'.join(script_lines)), redirect_stderr=True)
+
+def _nfs_mount_source(repo):
+    return '{}:{}'.format(get_host_ip(), repo.local_path)
+
+def nfs_mount_profile(repo):
+    """The repo's profile set with `dusty repos nfs-profile`, falling back to
+    the one its specs ask for, then the default"""
+    return (get_nfs_mount_profiles().get(repo.remote_path)
+            or get_spec_nfs_mount_profiles().get(repo.remote_path)
+            or constants.NFS_DEFAULT_MOUNT_PROFILE)
 
-def _run_mount_command(repo):
-    # Check output is used here so that if it raises an error, the output can be parsed
-    return check_output_demoted(['docker-machine', 'ssh', constants.VM_MACHINE_NAME,
-                                 'sudo mount {}'.format(_nfs_mount_args_string(repo))], redirect_stderr=True)
+def _nfs_mount_options(repo):
+    return constants.NFS_MOUNT_PROFILES[nfs_mount_profile(repo)]
 
 def _nfs_mount_args_string(repo):
-    mount_string = '-t nfs {} '.format(_nfs_options_string())
-    mount_string += '{}:{} '.format(get_host_ip(), repo.local_path)
+    mount_string = '-t nfs {} '.format(_nfs_options_string(repo))
+    mount_string += '{} '.format(_nfs_mount_source(repo))
     mount_string += repo.vm_path
     return mount_string
 
-def _nfs_options_string():
-    return '-o async,udp,noatime'
+def _nfs_options_string(repo):
+    return '-o {}'.format(','.join(_nfs_mount_options(repo)))
@@ -19,7 +19,7 @@ def configure_nfs_server():
     exports that are needed for currently active repos, and restart
     the nfs server
     """
-    repos_for_export = get_all_repos(active_only=True, include_specs_repo=False)
+    repos_for_export = nfs_repos(get_all_repos(active_only=True, include_specs_repo=False))
 
     current_exports = _get_current_exports()
     needed_exports = _get_exports_for_repos(repos_for_export)
@@ -34,6 +34,10 @@ def configure_nfs_server():
     _write_exports_config(needed_exports)
     _restart_server()
 
+def nfs_repos(repos):
+    """Repos which are rsynced to the VM rather than mounted are left out of NFS"""
+    return [repo for repo in repos if repo.sync_method == constants.SYNC_METHOD_NFS]
+
 def add_exports_for_repos(repos):
     """
     This function will add needed entries to /etc/exports.  It will not remove any
@@ -1,31 +1,56 @@
 import os
 import logging
+import pipes
 from subprocess import CalledProcessError
 
 from ... import constants
-from ...config import get_config_value
 from ...subprocess import check_call_demoted, check_and_log_output_and_error
 from ...source import Repo
 from ...path import parent_dir
 from ...log import log_to_client
 from ...compiler.spec_assembler import get_same_container_repos_from_spec
-from ...systems.virtualbox import get_docker_vm_ip
-
-def _ensure_vm_dir_exists(remote_dir):
-    check_call_demoted(['docker-machine', 'ssh', constants.VM_MACHINE_NAME,
-                        'sudo mkdir -p {0}; sudo chown -R docker {0}'.format(remote_dir)])
-
-def _rsync_command(local_path, remote_path, is_dir=True, from_local=True, exclude_git=True):
-    key_format_string = '~{}/.docker/machine/machines/{}/id_rsa'
-    key_path = os.path.expanduser(key_format_string.format(get_config_value(constants.CONFIG_MAC_USERNAME_KEY),
-                                                           constants.VM_MACHINE_NAME))
-    ssh_opts = 'ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -i {}'.format(key_path)
-    command = ['rsync', '-e', ssh_opts, '-az', '--del', '--force', '--rsync-path', 'sudo rsync']
+from ...memoize import memoized, SCOPE_VM
+from ...systems.virtualbox import get_docker_vm_ip, vm_ssh_command, vm_ssh_options
+
+@memoized(scope=SCOPE_VM)
+def _rsync_ssh_command(demote):
+    return ' '.join(['ssh'] + vm_ssh_options(demote))
+
+def _remote_rsync_path(create_dir=None):
+    """The command rsync runs on the VM's end of the transfer. Given
+    `create_dir`, it first creates that directory (owned by docker, like
+    the rest of what we put in the VM) in the same SSH session, rather
+    than needing a round-trip of its own. Only the directory itself is
+    re-owned; anything already inside it is left alone."""
+    if create_dir is None:
+        return 'sudo rsync'
+    quoted_dir = pipes.quote(create_dir)
+    return 'sudo mkdir -p {0} && sudo chown docker {0} && sudo rsync'.format(quoted_dir)
+
+def _gitignore_filters(local_root):
+    """Leaves whatever a repo's .gitignore files ignore out of a sync, on
+    both ends: ignored files aren't sent, and ignored files on the VM, such
+    as dependencies installed or build output written by containers, aren't
+    deleted. The repo's top-level .gitignore is merged explicitly so that it
+    also applies when only some of the repo's directories are synced."""
+    filters = ['--filter', ':- .gitignore']
+    root_gitignore = os.path.join(local_root, '.gitignore')
+    if os.path.isfile(root_gitignore):
+        filters += ['--filter', 'merge,- {}'.format(root_gitignore)]
+    return filters
+
+def _rsync_base_command(demote, exclude_git=True, create_dir=None):
+    command = ['rsync', '-e', _rsync_ssh_command(demote), '-az', '--del', '--force', '--rsync-path', _remote_rsync_path(create_dir)]
     if exclude_git:
         command += ['--exclude', '*/.git']
+    return command
+
+def _rsync_command(local_path, remote_path, demote, is_dir=True, from_local=True, exclude_git=True):
     if from_local:
+        command = _rsync_base_command(demote, exclude_git=exclude_git, create_dir=remote_path if is_dir else parent_dir(remote_path))
         path_args = ['{}{}'.format(local_path, '/' if is_dir else ''), 'docker@{}:{}'.format(get_docker_vm_ip(), remote_path)]
     else:
+        command = _rsync_base_command(demote, exclude_git=exclude_git)
         path_args = ['docker@{}:{}{}'.format(get_docker_vm_ip(), remote_path, '/' if is_dir else ''), local_path]
     command += path_args
     return command
@@ -35,19 +60,34 @@ def vm_path_is_directory(remote_path):
     This function returns False on any process error, so False may indicate
     other failures such as the path not actually existing."""
     try:
-        check_call_demoted(['docker-machine', 'ssh', constants.VM_MACHINE_NAME, 'test -d {}'.format(remote_path)])
+        check_call_demoted(vm_ssh_command('test -d {}'.format(remote_path)))
     except CalledProcessError:
         return False
     return True
 
-def sync_local_path_to_vm(local_path, remote_path, demote=False):
-    is_dir = os.path.isdir(local_path)
-    _ensure_vm_dir_exists(remote_path if is_dir else parent_dir(remote_path))
-    command = _rsync_command(local_path, remote_path, is_dir=is_dir)
+def sync_local_path_to_vm(local_path, remote_path, demote=False, keep_ignored=False):
+    """With `keep_ignored`, files ignored by git are neither synced nor
+    deleted from the VM; see _gitignore_filters"""
+    command = _rsync_command(local_path, remote_path, demote, is_dir=os.path.isdir(local_path))
+    if keep_ignored:
+        command[-2:-2] = _gitignore_filters(local_path)
     logging.debug('Executing rsync command: {}'.format(' '.join(command)))
     check_and_log_output_and_error(command, demote=demote, quiet_on_success=True)
 
 def sync_local_path_from_vm(local_path, remote_path, demote=False, is_dir=True):
-    command = _rsync_command(local_path, remote_path, is_dir=is_dir, from_local=False)
+    command = _rsync_command(local_path, remote_path, demote, is_dir=is_dir, from_local=False)
+    logging.debug('Executing rsync command: {}'.format(' '.join(command)))
+    check_and_log_output_and_error(command, demote=demote, quiet_on_success=True)
+
+def sync_local_dirs_to_vm(local_root, remote_root, rel_dirs, demote=False, keep_ignored=False):
+    """Syncs only `rel_dirs`, given relative to `local_root`, to the same
+    relative paths under `remote_root`, in a single rsync run. Files removed
+    from those directories locally are removed from the VM too, except for
+    files ignored by git with `keep_ignored`."""
+    command = _rsync_base_command(demote, create_dir=remote_root) + ['--relative']
+    if keep_ignored:
+        command += _gitignore_filters(local_root)
+    command += ['{}/./{}/'.format(local_root.rstrip('/'), rel_dir) for rel_dir in rel_dirs]
+    command.append('docker@{}:{}'.format(get_docker_vm_ip(), remote_root))
     logging.debug('Executing rsync command: {}'.format(' '.join(command)))
     check_and_log_output_and_error(command, demote=demote, quiet_on_success=True)
@@ -0,0 +1,182 @@
+"""Keeps repos which use the rsync sync method copied onto the VM.
+
+Repos are mounted into the VM over NFS by default, which makes every
+file access from a container a round trip to the host. Repos switched to
+rsync with `dusty repos sync-method` are instead copied onto the VM's
+disk. The daemon then watches them and pushes changes across in batches,
+syncing only the directories which changed.
+
+The copy on the VM follows the local repo: files deleted locally are
+deleted from the VM. Files ignored by the repo's .gitignore files are the
+exception. They are never synced, and never deleted from the VM, so that
+whatever containers write there, like installed dependencies or build
+output, survives syncs."""
+
+import logging
+import os
+import threading
+import time
+
+from ... import constants
+from ...compiler.spec_assembler import get_all_repos
+from ...log import log_to_client
+from ...parallel import parallel_task_queue
+from ..rsync import sync_local_path_to_vm, sync_local_dirs_to_vm
+from .watcher import make_watcher
+
+# Past this many changed directories in one batch, a single sync of the
+# whole repo is cheaper than listing them all
+MAX_DIRS_PER_BATCH = 50
+
+_syncers = {}
+_syncers_lock = threading.Lock()
+
+def dirs_to_sync(local_root, changed_paths):
+    """Returns the fewest directories, relative to `local_root`, which
+    between them contain every one of `changed_paths`. A path which no
+    longer exists is covered by its nearest existing parent, so that the
+    sync deletes it from the VM. Returns None if the whole repo needs to
+    be synced."""
+    local_root = local_root.rstrip(os.sep)
+    dirs = set()
+    for path in changed_paths:
+        rel_path = os.path.relpath(path, local_root)
+        if rel_path.startswith(os.pardir) or '.git' in rel_path.split(os.sep):
+            continue
+        directory = path if os.path.isdir(path) else os.path.dirname(path)
+        while not os.path.isdir(directory) and directory.startswith(local_root + os.sep):
+            directory = os.path.dirname(directory)
+        rel_dir = os.path.relpath(directory, local_root)
+        if rel_dir == os.curdir:
+            return None
+        dirs.add(rel_dir)
+    if len(dirs) > MAX_DIRS_PER_BATCH:
+        return None
+    return sorted(rel_dir for rel_dir in dirs
+                  if not any(rel_dir.startswith(other + os.sep) for other in dirs))
+
+class RepoSyncer(object):
+    def __init__(self, repo):
+        self.repo = repo
+        self.local_path = repo.local_path
+        self.vm_path = repo.vm_path
+        self._changed = set()
+        self._needs_full_sync = False
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._watcher = make_watcher(self.local_path, self._on_change)
+
+    def watch(self):
+        """Start collecting changes. Nothing is pushed until `start`."""
+        self._watcher.start()
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name='dusty-sync-{}'.format(self.repo.short_name))
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self._watcher.stop()
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def sync_all(self):
+        sync_local_path_to_vm(self.local_path, self.vm_path, keep_ignored=True)
+
+    def sync_changes(self, changed_paths):
+        rel_dirs = dirs_to_sync(self.local_path, changed_paths)
+        if rel_dirs is None:
+            logging.info('Syncing all of repo {} to the VM'.format(self.repo.remote_path))
+            self.sync_all()
+        elif rel_dirs:
+            logging.info('Syncing {} of repo {} to the VM'.format(', '.join(rel_dirs), self.repo.remote_path))
+            sync_local_dirs_to_vm(self.local_path, self.vm_path, rel_dirs, keep_ignored=True)
+
+    def _on_change(self, path):
+        with self._condition:
+            self._changed.add(path)
+            self._condition.notify()
+
+    def _next_batch(self):
+        """Waits for something to change, then a little longer so that
+        changes made together (a checkout, a build) are synced together.
+        Returns None once the syncer is stopped."""
+        with self._condition:
+            while not self._changed and not self._stopped:
+                # Waiting without a timeout can't be interrupted in Python 2
+                self._condition.wait(1)
+            if self._stopped:
+                return None
+        time.sleep(constants.SYNC_BATCH_DELAY)
+        with self._condition:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def _run(self):
+        while True:
+            changed = self._next_batch()
+            if changed is None:
+                return
+            try:
+                if self._needs_full_sync:
+                    self.sync_all()
+                    self._needs_full_sync = False
+                else:
+                    self.sync_changes(changed)
+            except Exception:
+                # The VM may be down. Whatever we failed to push is picked up by
+                # a full sync with the next batch, or the next `dusty up`.
+                logging.exception('Failed to sync changes to repo {}'.format(self.repo.remote_path))
+                self._needs_full_sync = True
+
+def _rsync_repos(repos):
+    return [repo for repo in repos if repo.sync_method == constants.SYNC_METHOD_RSYNC]
+
+def sync_repos(repos):
+    """Brings every one of `repos` which uses the rsync sync method up to
+    date on the VM, and makes sure each is being watched for changes.
+    Repos using NFS are ignored."""
+    repos = _rsync_repos(repos)
+    if not repos:
+        return
+    log_to_client('Syncing repos to the VM with rsync: {}'.format(', '.join(sorted(repo.short_name for repo in repos))))
+    new_syncers, existing_syncers = [], []
+    with _syncers_lock:
+        for repo in repos:
+            syncer = _syncers.get(repo.remote_path)
+            if syncer is not None and syncer.local_path != repo.local_path:
+                syncer.stop()
+                syncer = None
+            if syncer is None:
+                syncer = _syncers[repo.remote_path] = RepoSyncer(repo)
+                syncer.watch()
+                new_syncers.append(syncer)
+            else:
+                existing_syncers.append(syncer)
+    try:
+        with parallel_task_queue() as queue:
+            for syncer in new_syncers + existing_syncers:
+                queue.enqueue_task(syncer.sync_all)
+    finally:
+        for syncer in new_syncers:
+            syncer.start()
+
+def stop_syncing_repos(repos=None):
+    """Stops watching `repos`, or every repo if none are given"""
+    with _syncers_lock:
+        remote_paths = [repo.remote_path for repo in repos] if repos is not None else _syncers.keys()
+        for remote_path in remote_paths:
+            syncer = _syncers.pop(remote_path, None)
+            if syncer is not None:
+                syncer.stop()
+
+def sync_active_repos():
+    """Used by `dusty up`: syncs the active repos using rsync, and stops
+    watching any repos which are no longer active or have gone back to NFS"""
+    repos = _rsync_repos(get_all_repos(active_only=True, include_specs_repo=False))
+    with _syncers_lock:
+        inactive = [syncer.repo for remote_path, syncer in _syncers.iteritems()
+                    if remote_path not in set(repo.remote_path for repo in repos)]
+    stop_syncing_repos(inactive)
+    sync_repos(repos)
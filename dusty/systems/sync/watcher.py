@@ -0,0 +1,98 @@
+"""Watches a directory tree, calling back with the path of everything
+which changes inside it.
+
+Native file system events (FSEvents on OS X) are used through watchdog,
+which Dusty depends on. Only if it can't be imported do we fall back to
+polling the tree every SYNC_POLL_INTERVAL seconds and comparing the mtime
+and size of everything in it, which is slow for large trees."""
+
+import logging
+import os
+import threading
+
+from ... import constants
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+def _ignored(name):
+    return name == '.git'
+
+class _CallbackHandler(object):
+    """watchdog only ever calls `dispatch` on its event handlers"""
+    def __init__(self, callback):
+        self.callback = callback
+
+    def dispatch(self, event):
+        self.callback(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.callback(dest_path)
+
+class WatchdogWatcher(object):
+    def __init__(self, root, callback):
+        self._observer = Observer()
+        self._observer.schedule(_CallbackHandler(callback), root, recursive=True)
+
+    def start(self):
+        self._observer.daemon = True
+        self._observer.start()
+
+    def stop(self):
+        self._observer.stop()
+        self._observer.join()
+
+def snapshot(root):
+    """Returns the (mtime, size) of every file and directory under `root`,
+    keyed by path"""
+    entries = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [dirname for dirname in dirnames if not _ignored(dirname)]
+        for name in dirnames + filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.lstat(path)
+            except OSError:
+                continue
+            entries[path] = (stat.st_mtime, stat.st_size)
+    return entries
+
+def changed_paths(old_snapshot, new_snapshot):
+    return set(path for path in set(old_snapshot) | set(new_snapshot)
+               if old_snapshot.get(path) != new_snapshot.get(path))
+
+class PollingWatcher(object):
+    def __init__(self, root, callback, interval=None):
+        self.root = root
+        self.callback = callback
+        self.interval = interval or constants.SYNC_POLL_INTERVAL
+        self._snapshot = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._snapshot = snapshot(self.root)
+        thread = threading.Thread(target=self._run, name='dusty-poll-{}'.format(self.root))
+        thread.daemon = True
+        thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        new_snapshot = snapshot(self.root)
+        for path in changed_paths(self._snapshot, new_snapshot):
+            self.callback(path)
+        self._snapshot = new_snapshot
+
+    def stop(self):
+        self._stopped.set()
+
+def make_watcher(root, callback):
+    if Observer is not None:
+        return WatchdogWatcher(root, callback)
+    logging.warning('watchdog could not be imported; polling {} for changes every {}s instead'.format(
+        root, constants.SYNC_POLL_INTERVAL))
+    return PollingWatcher(root, callback)
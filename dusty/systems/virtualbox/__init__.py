@@ -1,6 +1,8 @@
 from __future__ import absolute_import
 
+import glob
 import os
+import pwd
 import re
 import logging
 import textwrap
@@ -8,44 +10,115 @@ import time
 from subprocess import CalledProcessError
 
 from ... import constants
-from ...memoize import memoized
+from ...memoize import memoized, invalidate_scope, set_scope_key, SCOPE_VM
 from ...config import get_config_value
-from ...subprocess import check_and_log_output_and_error_demoted, check_output_demoted, check_call_demoted, call_demoted
+from ...subprocess import check_and_log_output_and_error_demoted, check_output_demoted, check_call_demoted, call
 from ...log import log_to_client
 
-def _command_for_vm(command_list):
-    ssh_command = ['docker-machine', 'ssh', constants.VM_MACHINE_NAME]
-    ssh_command.extend([command_list])
-    return ssh_command
+def vm_ssh_key_path():
+    key_format_string = '~{}/.docker/machine/machines/{}/id_rsa'
+    return os.path.expanduser(key_format_string.format(get_config_value(constants.CONFIG_MAC_USERNAME_KEY),
+                                                       constants.VM_MACHINE_NAME))
+
+def _ssh_uid(demote):
+    """The uid ssh runs as: the Mac user's if it is demoted, ours otherwise"""
+    if demote:
+        return pwd.getpwnam(get_config_value(constants.CONFIG_MAC_USERNAME_KEY)).pw_uid
+    return os.getuid()
+
+def _vm_ssh_control_dir(uid):
+    return os.path.join(constants.VM_SSH_CONTROL_DIR, str(uid))
+
+def _ensure_vm_ssh_control_dir(uid):
+    """Each user gets their own control socket directory, which only they
+    can use, inside Dusty's run dir. A master connection can only be used
+    and closed by the user who started it, so ssh run as root (e.g. by
+    rsync) and ssh run as the Mac user never share one."""
+    control_dir = _vm_ssh_control_dir(uid)
+    for directory, mode in [(constants.VM_SSH_CONTROL_DIR, 0755), (control_dir, 0700)]:
+        try:
+            os.mkdir(directory, mode)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+    if os.stat(control_dir).st_uid != uid:
+        os.chown(control_dir, uid, -1)
+    os.chmod(control_dir, 0700)
+    return control_dir
+
+def vm_ssh_options(demote=True):
+    """Options for ssh connections to the VM, made as the Mac user if
+    `demote` is set and as ourselves otherwise. Connections share a master
+    connection through a control socket, so only the first command run
+    against a newly started VM pays for an SSH handshake. The master
+    stays up between commands and drops itself if the VM goes away."""
+    return ['-i', vm_ssh_key_path(),
+            '-o', 'StrictHostKeyChecking=no',
+            '-o', 'UserKnownHostsFile=/dev/null',
+            # Hides the warning about adding the VM to /dev/null, but not connection errors
+            '-o', 'LogLevel=error',
+            '-o', 'ControlMaster=auto',
+            '-o', 'ControlPath={}'.format(os.path.join(_ensure_vm_ssh_control_dir(_ssh_uid(demote)), '%r@%h:%p')),
+            '-o', 'ControlPersist={}'.format(constants.VM_SSH_CONTROL_PERSIST),
+            '-o', 'ServerAliveInterval=5',
+            '-o', 'ServerAliveCountMax=2']
+
+@memoized(scope=SCOPE_VM)
+def _vm_ssh_base_command(demote):
+    return ['ssh'] + vm_ssh_options(demote) + ['docker@{}'.format(get_docker_vm_ip())]
+
+def vm_ssh_command(command, demote=True):
+    """The command line to run the shell command `command` in the VM, as
+    the Mac user if `demote` is set. This replaces `docker-machine ssh`,
+    which looks up the machine and makes a new SSH connection every time
+    it runs."""
+    return _vm_ssh_base_command(demote) + [command]
+
+def close_vm_ssh_connections():
+    """Shut down any master connections to the VM, e.g. because it is
+    being restarted, each as the user who started it. The next command
+    run against the VM reconnects."""
+    for control_path in glob.glob(os.path.join(constants.VM_SSH_CONTROL_DIR, '*', '*')):
+        uid = int(os.path.basename(os.path.dirname(control_path)))
+        if uid == _ssh_uid(demote=False):
+            demote = False
+        elif uid == _ssh_uid(demote=True):
+            demote = True
+        else:
+            # Left by a Mac user Dusty is no longer configured with
+            continue
+        call(['ssh', '-o', 'ControlPath={}'.format(control_path), '-O', 'exit', 'docker@{}'.format(constants.VM_MACHINE_NAME)],
+             demote=demote, redirect_stderr=True)
 
 def _run_command_on_vm(command_list, quiet_on_success=True):
-    return check_and_log_output_and_error_demoted(_command_for_vm(command_list), quiet_on_success=quiet_on_success)
+    return check_and_log_output_and_error_demoted(vm_ssh_command(command_list), quiet_on_success=quiet_on_success)
 
 def _check_output_on_vm(command_list):
-    return check_output_demoted(_command_for_vm(command_list))
+    return check_output_demoted(vm_ssh_command(command_list))
 
-def _ensure_rsync_is_installed():
+def _ensure_rsync_is_installed_command():
     # We're running tce-load twice as a hack to get around the fact that, for
     # completely unknown reasons, tce-load will return with an exit code of 1 after
     # initial install even if it works just fine. Subsequent install attempts will
     # be no-ops with a return code of 0.
-    _run_command_on_vm('which rsync || tce-load -wi rsync || tce-load -wi rsync')
+    return 'which rsync || tce-load -wi rsync || tce-load -wi rsync'
 
-def _ensure_persist_dir_is_linked():
+def _ensure_persist_dir_is_linked_commands():
     mkdir_if_cmd = 'if [ ! -d /mnt/sda1{0} ]; then sudo mkdir /mnt/sda1{0}; fi'.format(constants.VM_PERSIST_DIR)
     mount_if_cmd = 'if [ ! -d {0} ]; then sudo ln -s /mnt/sda1{0} {0}; fi'.format(constants.VM_PERSIST_DIR)
-    _run_command_on_vm(mkdir_if_cmd)
-    _run_command_on_vm(mount_if_cmd)
+    return [mkdir_if_cmd, mount_if_cmd]
 
-def _ensure_vm_dir_exists(vm_dir):
-    mkdir_if_cmd = 'if [ ! -d {0} ]; then sudo mkdir {0}; fi'.format(vm_dir)
-    _run_command_on_vm(mkdir_if_cmd)
+def _ensure_vm_dir_exists_command(vm_dir):
+    return 'if [ ! -d {0} ]; then sudo mkdir {0}; fi'.format(vm_dir)
 
-def _ensure_cp_dir_exists():
-    _ensure_vm_dir_exists(constants.VM_CP_DIR)
-
-def _ensure_assets_dir_exists():
-    _ensure_vm_dir_exists(constants.VM_ASSETS_DIR)
+def _prepare_vm():
+    """Everything Dusty needs set up inside a running VM, done by a single
+    script so that it only costs one SSH round-trip"""
+    script = ['set -e', _ensure_rsync_is_installed_command()]
+    script += _ensure_persist_dir_is_linked_commands()
+    script += [_ensure_vm_dir_exists_command(constants.VM_CP_DIR),
+               _ensure_vm_dir_exists_command(constants.VM_ASSETS_DIR)]
+    _run_command_on_vm('\n'.join(script))
 
 def _dusty_vm_exists():
     existing_vms = check_output_demoted(['docker-machine', 'ls', '-q'])
@@ -83,6 +156,8 @@ def _init_docker_vm():
                            '--virtualbox-memory', str(get_config_value(constants.CONFIG_VM_MEM_SIZE))]
         check_call_demoted(['docker-machine', 'create'] + machine_options + [constants.VM_MACHINE_NAME],
                            redirect_stderr=True)
+        close_vm_ssh_connections()
+        invalidate_scope(SCOPE_VM)
 
 def _start_docker_vm():
     """Start the Dusty VM if it is not already running."""
@@ -91,14 +166,35 @@ def _start_docker_vm():
         _apply_nat_dns_host_resolver()
         _apply_nat_net_less_greedy_subnet()
         check_and_log_output_and_error_demoted(['docker-machine', 'start', constants.VM_MACHINE_NAME], quiet_on_success=True)
+        close_vm_ssh_connections()
+        invalidate_scope(SCOPE_VM)
 
 def _stop_docker_vm():
     """Stop the Dusty VM if it is not already stopped."""
     check_call_demoted(['docker-machine', 'stop', constants.VM_MACHINE_NAME], redirect_stderr=True)
+    close_vm_ssh_connections()
+    invalidate_scope(SCOPE_VM)
 
 def _get_vm_config():
     return check_output_demoted(['VBoxManage', 'showvminfo', '--machinereadable', constants.VM_MACHINE_NAME]).splitlines()
 
+def _vm_state():
+    """Changes whenever the VM is started or stopped, whether by Dusty or
+    by anything else (docker-machine, VirtualBox, a crash), and is read
+    without going into the VM"""
+    try:
+        vm_config = _get_vm_config()
+    except (CalledProcessError, OSError):
+        return None
+    return [line for line in vm_config if line.startswith(('VMState=', 'VMStateChangeTime='))]
+
+def enable_vm_state_check():
+    """Called by the daemon, which keeps values cached in SCOPE_VM between
+    requests. Each request which reads them first checks whether the VM has
+    been started or stopped since, and if so throws them away and drops any
+    SSH master connections to the old VM."""
+    set_scope_key(SCOPE_VM, _vm_state, on_change=lambda: close_vm_ssh_connections())
+
 def docker_vm_is_running():
     return check_output_demoted(['docker-machine', 'status', constants.VM_MACHINE_NAME]).strip().lower() == 'running'
 
@@ -108,12 +204,9 @@ def ensure_docker_vm_is_started():
 
 def initialize_docker_vm():
     ensure_docker_vm_is_started()
-    _ensure_rsync_is_installed()
-    _ensure_persist_dir_is_linked()
-    _ensure_cp_dir_exists()
-    _ensure_assets_dir_exists()
+    _prepare_vm()
 
-@memoized
+@memoized(scope=SCOPE_VM)
 def get_docker_vm_ip():
     return check_output_demoted(['docker-machine', 'ip', constants.VM_MACHINE_NAME]).rstrip()
 
@@ -132,8 +225,7 @@ def _format_df_dict(df_dict):
     return formatted_usage
 
 def get_docker_vm_disk_info(as_dict=False):
-    df_output = check_output_demoted(['docker-machine', 'ssh', constants.VM_MACHINE_NAME,
-                                      'df -h /mnt/sda1 | grep /dev/sda1'])
+    df_output = _check_output_on_vm('df -h /mnt/sda1 | grep /dev/sda1')
     df_line = df_output.split('\n')[0]
     df_dict = _parse_df_output(df_line)
     return df_dict if as_dict else _format_df_dict(df_dict)
@@ -147,7 +239,7 @@ def get_vm_hostonly_adapter():
 def _get_hostonly_config():
     return check_output_demoted(['VBoxManage', 'list', 'hostonlyifs']).splitlines()
 
-@memoized
+@memoized(scope=SCOPE_VM)
 def get_host_ip():
     adapter = get_vm_hostonly_adapter()
     host_only_config = _get_hostonly_config()
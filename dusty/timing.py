@@ -0,0 +1,131 @@
+"""Wall-clock profiling of a daemon request, e.g. `dusty up --profile`.
+
+A request which is being profiled has a Profile on its RequestContext.
+Named phases (the steps of a TaskGraph) record how long they took, and
+every subprocess run while profiling records its own time against the
+phase it was run from. Finished profiles are appended to a short history
+file so that `dusty dump` can show recent runs side by side."""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from . import constants
+from .context import current_context
+from .path import parent_dir
+
+PROFILE_HISTORY_LENGTH = 20
+MAX_COMMAND_LENGTH = 80
+
+_local = threading.local()
+
+class Profile(object):
+    def __init__(self, command):
+        self.command = command
+        self.started_at = time.time()
+        self.finished_at = None
+        self.succeeded = None
+        self.phases = {}
+        self.subprocesses = []
+        self._lock = threading.Lock()
+
+    def record_phase(self, name, start, end):
+        with self._lock:
+            self.phases[name] = end - start
+
+    def record_subprocess(self, phase, shell_args, start, end):
+        command = ' '.join(shell_args) if isinstance(shell_args, list) else shell_args
+        with self._lock:
+            self.subprocesses.append({'phase': phase, 'command': command, 'seconds': end - start})
+
+    def finish(self, succeeded):
+        self.finished_at = time.time()
+        self.succeeded = succeeded
+
+    def to_dict(self):
+        return {'command': self.command,
+                'started_at': self.started_at,
+                'seconds': (self.finished_at or time.time()) - self.started_at,
+                'succeeded': self.succeeded,
+                'phases': dict(self.phases),
+                'subprocesses': list(self.subprocesses)}
+
+def current_profile():
+    context = current_context()
+    return getattr(context, 'profile', None)
+
+def current_phase():
+    return getattr(_local, 'phase', None)
+
+@contextmanager
+def in_phase(phase):
+    """Attribute subprocesses run on this thread to `phase`, without
+    timing the block itself. Used by worker threads which do part of
+    a phase's work."""
+    previous = current_phase()
+    _local.phase = phase
+    try:
+        yield
+    finally:
+        _local.phase = previous
+
+@contextmanager
+def profiled_phase(name):
+    profile = current_profile()
+    start = time.time()
+    with in_phase(name):
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.record_phase(name, start, time.time())
+
+@contextmanager
+def profiled_subprocess(shell_args):
+    profile = current_profile()
+    start = time.time()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.record_subprocess(current_phase(), shell_args, start, time.time())
+
+def read_profile_history():
+    if not os.path.exists(constants.PROFILE_HISTORY_PATH):
+        return []
+    try:
+        with open(constants.PROFILE_HISTORY_PATH, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        return []
+
+def save_profile(profile):
+    history = (read_profile_history() + [profile.to_dict()])[-PROFILE_HISTORY_LENGTH:]
+    history_dir = parent_dir(constants.PROFILE_HISTORY_PATH)
+    if not os.path.exists(history_dir):
+        os.makedirs(history_dir)
+    with open(constants.PROFILE_HISTORY_PATH, 'w') as f:
+        json.dump(history, f)
+
+def _shorten(command):
+    if len(command) <= MAX_COMMAND_LENGTH:
+        return command
+    return command[:MAX_COMMAND_LENGTH - 3] + '...'
+
+def format_profile(profile_dict):
+    """A breakdown of one profile: each phase, followed by the
+    subprocesses run during it, slowest first"""
+    phases = sorted(profile_dict['phases'], key=profile_dict['phases'].get, reverse=True)
+    lines = ['{} took {:.1f}s'.format(profile_dict['command'], profile_dict['seconds'])]
+    for phase in phases + [None]:
+        subprocesses = sorted([subprocess for subprocess in profile_dict['subprocesses'] if subprocess['phase'] == phase],
+                              key=lambda subprocess: subprocess['seconds'], reverse=True)
+        if phase is not None:
+            lines.append('  {}: {:.2f}s'.format(phase, profile_dict['phases'].get(phase, 0)))
+        elif subprocesses:
+            lines.append('  (outside of any phase)')
+        for subprocess in subprocesses:
+            lines.append('      {:.2f}s  {}'.format(subprocess['seconds'], _shorten(subprocess['command'])))
+    return '\n'.join(lines)
@@ -0,0 +1,133 @@
+"""Works out which containers `dusty up` actually needs to touch.
+
+Every successful `dusty up` records a fingerprint of each compose service
+it applied: the service's compose config and the ID of its image, plus,
+for apps, the command file it runs and where each repo it mounts comes
+from, and the nginx config for Dusty's nginx container. The next `up`
+compares the newly compiled state against those fingerprints, so that only
+services which are new, changed, link to something being recreated or
+mount a repo which is about to be remounted get stopped and recreated.
+Everything else is left running."""
+
+import hashlib
+import json
+import logging
+import os
+
+from . import constants
+from .path import parent_dir
+
+class UpPlan(object):
+    def __init__(self, fingerprints, previous_fingerprints, links, forced_recreates=None):
+        self.fingerprints = fingerprints
+        self.is_full = previous_fingerprints is None
+        self.previous_fingerprints = previous_fingerprints = previous_fingerprints or {}
+        self.to_create = set(fingerprints) - set(previous_fingerprints)
+        self.to_remove = set(previous_fingerprints) - set(fingerprints)
+        self.to_recreate = {}
+        for service, fingerprint in fingerprints.iteritems():
+            if service in previous_fingerprints and previous_fingerprints[service] != fingerprint:
+                self.to_recreate[service] = 'config changed'
+        for service, reason in (forced_recreates or {}).iteritems():
+            if service in previous_fingerprints and service in fingerprints:
+                self.to_recreate.setdefault(service, reason)
+        self._add_linking_services(links)
+        self.unchanged = set(fingerprints) - self.to_create - set(self.to_recreate)
+
+    def _add_linking_services(self, links):
+        """Containers hold on to the containers they link to, so anything
+        linking to a container which is about to be replaced has to be
+        recreated along with it"""
+        replaced = list(self.to_create | set(self.to_recreate))
+        while replaced:
+            replaced_service = replaced.pop()
+            for service, service_links in links.iteritems():
+                if replaced_service in service_links and service not in self.to_create and service not in self.to_recreate:
+                    self.to_recreate[service] = 'links to {}'.format(replaced_service)
+                    replaced.append(service)
+
+    @property
+    def services_to_stop(self):
+        """Services which must be stopped (and removed, when recreating
+        containers) using the previously applied compose file. None means
+        every service, because we don't know what was applied last time."""
+        if self.is_full:
+            return None
+        return sorted(set(self.to_recreate) | self.to_remove)
+
+    @property
+    def has_changes(self):
+        return self.is_full or bool(self.to_create or self.to_recreate or self.to_remove)
+
+    def describe(self):
+        if self.is_full:
+            return 'No record of a previous `dusty up`; all containers will be recreated'
+        if not self.has_changes:
+            return 'No container configuration has changed since the last `dusty up`'
+        lines = ['Planned container changes:']
+        if self.to_create:
+            lines.append('  Create: {}'.format(', '.join(sorted(self.to_create))))
+        if self.to_recreate:
+            lines.append('  Recreate: {}'.format(', '.join('{} ({})'.format(service, reason)
+                                                           for service, reason in sorted(self.to_recreate.iteritems()))))
+        if self.to_remove:
+            lines.append('  Remove: {}'.format(', '.join(sorted(self.to_remove))))
+        if self.unchanged:
+            lines.append('  Unchanged: {}'.format(', '.join(sorted(self.unchanged))))
+        return '\n'.join(lines)
+
+def _fingerprint(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=sorted)).hexdigest()
+
+def _service_links(compose_config):
+    return {service: set(link.split(':')[0] for link in config.get('links', []))
+            for service, config in compose_config.iteritems()}
+
+def service_fingerprints(compose_config, up_command_files, nginx_config, image_ids=None, repo_states=None):
+    """Returns a fingerprint of the effective config of every service in
+    `compose_config`. `up_command_files` maps app names to the contents of
+    the command files they run on startup, `image_ids` maps services to the
+    ID of the image they run and `repo_states` maps apps to the source,
+    sync method and mount profile of each repo they mount."""
+    image_ids, repo_states = image_ids or {}, repo_states or {}
+    fingerprints = {}
+    for service, config in compose_config.iteritems():
+        if service == constants.DUSTY_NGINX_NAME:
+            fingerprints[service] = _fingerprint(config, nginx_config, image_ids.get(service))
+        else:
+            fingerprints[service] = _fingerprint(config, up_command_files.get(service), image_ids.get(service),
+                                                 repo_states.get(service))
+    return fingerprints
+
+def _read_applied_fingerprints():
+    if not os.path.exists(constants.UP_STATE_PATH):
+        return None
+    try:
+        with open(constants.UP_STATE_PATH, 'r') as f:
+            return json.load(f)['services']
+    except (ValueError, KeyError):
+        logging.warning('Ignoring unreadable up state file at {}'.format(constants.UP_STATE_PATH))
+        return None
+
+def get_up_plan(compose_config, up_command_files, nginx_config, image_ids=None, repo_states=None, forced_recreates=None):
+    """`forced_recreates` maps services which have to be recreated whether
+    or not their config changed to the reason why"""
+    fingerprints = service_fingerprints(compose_config, up_command_files, nginx_config, image_ids, repo_states)
+    return UpPlan(fingerprints, _read_applied_fingerprints(), _service_links(compose_config), forced_recreates)
+
+def record_applied_plan(plan, recreated=True):
+    """Called once the plan's services are up, so the next plan is made
+    against what is actually running. If the containers to be recreated
+    were only restarted, they are still running their old config and will
+    be recreated by the next plan."""
+    fingerprints = dict(plan.fingerprints)
+    if not recreated:
+        if plan.is_full:
+            return
+        for service in plan.to_recreate:
+            fingerprints[service] = plan.previous_fingerprints[service]
+    state_dir = parent_dir(constants.UP_STATE_PATH)
+    if not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+    with open(constants.UP_STATE_PATH, 'w') as f:
+        json.dump({'services': fingerprints}, f)
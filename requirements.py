@@ -5,7 +5,8 @@ install_requires = [
     'GitPython==1.0.1',
     'docopt==0.6.2',
     'Schemer==0.2.9',
-    'psutil==2.2.1'
+    'psutil==2.2.1',
+    'watchdog==0.8.3'
 ]
 
 test_requires = [
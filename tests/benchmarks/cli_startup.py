@@ -0,0 +1,52 @@
+"""Measures how long the Dusty client takes to import what it needs to
+dispatch each subcommand. Every measurement runs in a fresh interpreter so
+nothing is already sitting in sys.modules.
+
+Run it from the root of the repo with `python -m tests.benchmarks.cli_startup`.
+
+Usage:
+  cli_startup [--runs=<runs>] [<commands>...]
+
+Options:
+  --runs=<runs>  Number of runs to average for each subcommand [default: 5]
+"""
+
+import json
+import subprocess
+import sys
+
+from docopt import docopt
+from prettytable import PrettyTable
+
+from dusty.cli import MODULE_MAP
+
+HEAVY_MODULES = ['docker', 'git', 'prettytable', 'psutil']
+
+_MEASURE_SCRIPT = """
+import json, sys, time
+start = time.time()
+from dusty.cli import load_command_module
+load_command_module(sys.argv[1])
+elapsed = time.time() - start
+heavy = sorted(name for name in {heavy} if name in sys.modules)
+print json.dumps({{'seconds': elapsed, 'modules': len(sys.modules), 'heavy': heavy}})
+""".format(heavy=HEAVY_MODULES)
+
+def measure(command):
+    output = subprocess.check_output([sys.executable, '-c', _MEASURE_SCRIPT, command])
+    return json.loads(output)
+
+def main():
+    args = docopt(__doc__)
+    commands = args['<commands>'] or sorted(MODULE_MAP.keys())
+    runs = int(args['--runs'])
+    table = PrettyTable(['Subcommand', 'Import time (ms)', 'Modules loaded', 'Heavy modules'])
+    for command in commands:
+        results = [measure(command) for _ in range(runs)]
+        average_ms = 1000 * sum(result['seconds'] for result in results) / runs
+        table.add_row([command, '{:.1f}'.format(average_ms), results[-1]['modules'],
+                       ', '.join(results[-1]['heavy']) or '-'])
+    print table
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Measures spec loading on a large synthetic specs repo: parsing every spec
+from disk, re-loading from the spec cache, assembling overlays on top of
+the loaded specs, and the memory held by specs kept alive at once (e.g. by
+concurrent requests).
+
+Run it from the root of the repo with `python -m tests.benchmarks.spec_loading`.
+
+Usage:
+  spec_loading [--apps=<apps>] [--libs=<libs>] [--services=<services>] [--copies=<copies>]
+
+Options:
+  --apps=<apps>          Number of apps to generate [default: 300]
+  --libs=<libs>          Number of libs to generate [default: 100]
+  --services=<services>  Number of services to generate [default: 50]
+  --copies=<copies>      Number of loaded copies of the specs to hold for the memory measurement [default: 20]
+"""
+
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import yaml
+from docopt import docopt
+
+from dusty.compiler.spec_assembler import _get_expanded_libs_specs
+from dusty.schemas.base_schema_class import DustySpecs, reset_spec_cache
+
+def _write(specs_path, spec_type, name, document):
+    spec_type_path = os.path.join(specs_path, spec_type)
+    if not os.path.exists(spec_type_path):
+        os.makedirs(spec_type_path)
+    with open(os.path.join(spec_type_path, '{}.yml'.format(name)), 'w') as f:
+        f.write(yaml.safe_dump(document, default_flow_style=False))
+
+def write_synthetic_specs(specs_path, num_apps, num_libs, num_services):
+    """Writes a specs repo whose apps and libs depend on each other in
+    chains, so that expanding dependencies does real work"""
+    for i in range(num_services):
+        _write(specs_path, 'services', 'service-{}'.format(i),
+               {'image': 'service/{}'.format(i), 'environment': {'SERVICE_INDEX': str(i)}})
+    for i in range(num_libs):
+        _write(specs_path, 'libs', 'lib-{}'.format(i),
+               {'repo': 'github.com/synthetic/lib-{}'.format(i),
+                'mount': '/lib/{}'.format(i),
+                'depends': {'libs': ['lib-{}'.format(i - 1)] if i % 3 else []},
+                'install': ['pip install -e .'],
+                'assets': [{'name': 'lib_asset_{}'.format(i), 'path': '/assets/lib/{}'.format(i), 'required': False}]})
+    for i in range(num_apps):
+        _write(specs_path, 'apps', 'app-{}'.format(i),
+               {'repo': 'github.com/synthetic/app-{}'.format(i),
+                'image': 'synthetic/app-{}'.format(i),
+                'mount': '/app/{}'.format(i),
+                'depends': {'apps': ['app-{}'.format(i - 1)] if i % 5 else [],
+                            'libs': ['lib-{}'.format(i % num_libs), 'lib-{}'.format((i + 7) % num_libs)],
+                            'services': ['service-{}'.format(i % num_services)]},
+                'commands': {'once': ['make setup'], 'always': ['python app.py']},
+                'host_forwarding': [{'host_name': 'app-{}.local'.format(i), 'host_port': 80,
+                                     'container_port': 8000 + i}],
+                'compose': {'environment': {'APP_INDEX': str(i), 'DEBUG': 'true'}},
+                'scripts': [{'name': 'shell', 'description': 'Open a shell', 'command': ['bash']}],
+                'test': {'image': 'synthetic/app-{}-test'.format(i),
+                         'once': ['pip install -r test-requirements.txt'],
+                         'suites': [{'name': 'unit', 'command': ['nosetests'], 'description': 'Unit tests'}]}})
+    for i in range(0, num_apps, 10):
+        _write(specs_path, 'bundles', 'bundle-{}'.format(i),
+               {'description': 'Bundle {}'.format(i), 'apps': ['app-{}'.format(j) for j in range(i, min(i + 10, num_apps))]})
+
+def _max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _timed(fn):
+    start = time.time()
+    result = fn()
+    return result, 1000 * (time.time() - start)
+
+def _touch_everything(specs):
+    for spec_type in ['apps', 'libs', 'services', 'bundles']:
+        for spec in specs[spec_type].values():
+            for key in spec:
+                spec[key]
+
+def main():
+    args = docopt(__doc__)
+    specs_path = tempfile.mkdtemp()
+    try:
+        write_synthetic_specs(specs_path, int(args['--apps']), int(args['--libs']), int(args['--services']))
+        reset_spec_cache()
+        specs, cold_ms = _timed(lambda: DustySpecs(specs_path))
+        _, warm_ms = _timed(lambda: DustySpecs(specs_path))
+        _, overlay_ms = _timed(lambda: _get_expanded_libs_specs(specs.overlay()))
+        rss_before = _max_rss_kb()
+        held = [DustySpecs(specs_path) for _ in range(int(args['--copies']))]
+        loaded_growth = _max_rss_kb() - rss_before
+        for copy in held:
+            _touch_everything(copy)
+        read_growth = _max_rss_kb() - rss_before
+        print 'Cold load from disk:               {:8.1f} ms'.format(cold_ms)
+        print 'Warm load from spec cache:         {:8.1f} ms'.format(warm_ms)
+        print 'Overlay with expanded libs:        {:8.1f} ms'.format(overlay_ms)
+        print 'Max RSS growth, {:3d} copies loaded: {:8d} KB'.format(len(held), loaded_growth)
+        print 'Max RSS growth, after reading all:  {:8d} KB'.format(read_growth)
+    finally:
+        shutil.rmtree(specs_path)
+
+if __name__ == '__main__':
+    main()
@@ -20,7 +20,7 @@ from dusty.config import write_default_config, save_config_value, get_config, sa
 from dusty.compiler.spec_assembler import get_specs_repo
 from dusty.commands.repos import override_repo
 from dusty.cli import main as client_entrypoint
-from dusty.schemas.base_schema_class import get_specs_from_path, DustySpecs
+from dusty.schemas.base_schema_class import get_specs_from_path, DustySpecs, reset_spec_cache
 from dusty.systems.docker import exec_in_container, get_docker_client, get_container_for_app_or_service, get_docker_env
 from dusty.systems.nfs import client as nfs_client
 from dusty.systems.nfs import server as nfs_server
@@ -28,7 +28,7 @@ from dusty.path import parent_dir
 from dusty.subprocess import call_demoted
 from .fixtures import basic_specs_fixture, set_up_fake_local_repo
 from dusty.log import client_logger, DustyClientTestingSocketHandler
-from dusty.memoize import reset_memoize_cache
+from dusty.memoize import reset_all_memoize_caches
 
 class TestCaptureHandler(logging.Handler):
     def __init__(self, lst):
@@ -53,14 +53,16 @@ class DustyTestCase(TestCase):
         self.client_output = []
         self.capture_handler = TestCaptureHandler(self.client_output)
         logging.getLogger(constants.SOCKET_LOGGER_NAME).addHandler(self.capture_handler)
-        reset_memoize_cache()
+        reset_all_memoize_caches()
+        reset_spec_cache()
 
     def tearDown(self):
         os.remove(self.temp_config_path)
         shutil.rmtree(self.temp_specs_path)
         shutil.rmtree(self.temp_repos_path)
         logging.getLogger(constants.SOCKET_LOGGER_NAME).removeHandler(self.capture_handler)
-        reset_memoize_cache()
+        reset_all_memoize_caches()
+        reset_spec_cache()
 
     @nottest
     @patch('dusty.schemas.base_schema_class.get_specs_from_path')
@@ -111,7 +113,7 @@ class DustyIntegrationTestCase(TestCase):
         self._set_up_fake_local_repo('/tmp/fake-repo')
         self._clear_stdout()
         self.exec_docker_processes = []
-        reset_memoize_cache()
+        reset_all_memoize_caches()
 
     def tearDown(self):
         for exec_docker_process in self.exec_docker_processes:
@@ -127,7 +129,7 @@ class DustyIntegrationTestCase(TestCase):
         self.handler.log_to_client_output = ''
         client_logger.removeHandler(self.handler)
         nfs_client.unmount_all_repos()
-        reset_memoize_cache()
+        reset_all_memoize_caches()
         nfs_server._write_exports_config(set())
 
     def _clear_stdout(self):
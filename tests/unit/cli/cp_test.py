@@ -39,7 +39,11 @@ class TestCpCLI(DustyTestCase):
 
     def test_main_local_to_container(self):
         result = main(['/tmp/a', 'website:/tmp/b'])
-        self.assertEqual(result, Payload(copy_from_local, '/tmp/a', 'website', '/tmp/b'))
+        self.assertEqual(result, Payload(copy_from_local, '/tmp/a', 'website', '/tmp/b', compress=False))
+
+    def test_main_local_to_container_compressed(self):
+        result = main(['--compress', '/tmp/a', 'website:/tmp/b'])
+        self.assertEqual(result, Payload(copy_from_local, '/tmp/a', 'website', '/tmp/b', compress=True))
 
     def test_main_container_to_local(self):
         result = main(['website:/tmp/a', '/tmp/b'])
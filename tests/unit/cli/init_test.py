@@ -0,0 +1,48 @@
+import sys
+from contextlib import contextmanager
+
+from ...testcases import DustyTestCase
+from dusty.cli import MODULE_MAP, load_command_module
+
+# These subcommands run entirely in the client, so they need the real commands
+LOCAL_COMMANDS = ['assets', 'setup']
+HEAVY_MODULES = ['docker', 'git', 'prettytable', 'psutil']
+
+def _is_module_of(name, packages):
+    return any(name == package or name.startswith(package + '.') for package in packages)
+
+@contextmanager
+def _fresh_modules(packages):
+    """Drops `packages` from sys.modules so they are imported from scratch,
+    then puts the original modules back"""
+    saved_modules = dict(sys.modules)
+    for name in list(sys.modules):
+        if _is_module_of(name, packages):
+            del sys.modules[name]
+    try:
+        yield
+    finally:
+        sys.modules.clear()
+        sys.modules.update(saved_modules)
+
+class TestCLIInit(DustyTestCase):
+    def test_load_command_module(self):
+        for command in MODULE_MAP:
+            self.assertTrue(hasattr(load_command_module(command), 'main'))
+
+    def test_daemon_subcommands_do_not_import_heavy_modules(self):
+        for command in MODULE_MAP:
+            if command in LOCAL_COMMANDS:
+                continue
+            with _fresh_modules(['dusty'] + HEAVY_MODULES):
+                __import__('dusty.cli')
+                sys.modules['dusty.cli'].load_command_module(command)
+                heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+            self.assertEqual(heavy, [], command)
+
+    def test_local_subcommands_can_import_heavy_modules(self):
+        with _fresh_modules(['dusty'] + HEAVY_MODULES):
+            __import__('dusty.cli')
+            sys.modules['dusty.cli'].load_command_module('setup')
+            heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+        self.assertNotEqual(heavy, [])
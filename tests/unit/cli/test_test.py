@@ -0,0 +1,23 @@
+from docopt import DocoptExit
+
+from ...testcases import DustyTestCase
+from dusty.cli.test import main
+
+class TestTestCLI(DustyTestCase):
+    def test_all_workers_default(self):
+        payloads = main(['web', 'all'])
+        self.assertEqual(payloads[1].kwargs['workers'], 4)
+
+    def test_all_workers(self):
+        payloads = main(['--workers=2', 'web', 'all'])
+        self.assertEqual(payloads[1].kwargs['workers'], 2)
+
+    def test_all_workers_rejects_zero_and_negative(self):
+        for workers in ['0', '-1']:
+            with self.assertRaises(DocoptExit):
+                main(['--workers={}'.format(workers), 'web', 'all'])
+
+    def test_all_workers_rejects_non_numeric(self):
+        for workers in ['two', '1.5']:
+            with self.assertRaises(DocoptExit):
+                main(['--workers={}'.format(workers), 'web', 'all'])
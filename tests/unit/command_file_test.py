@@ -1,3 +1,7 @@
+import os
+import shutil
+import tempfile
+
 from mock import patch, Mock, call
 
 from ..testcases import DustyTestCase
@@ -53,7 +57,7 @@ class TestCommandFile(DustyTestCase):
         self.assertEquals('dusty_command_file_app_script_1.sh', command_file.dusty_command_file_name('app', test_name='1', script_name='1'))
 
     @patch('dusty.command_file._write_commands_to_file')
-    @patch('dusty.command_file.sync_local_path_to_vm')
+    @patch('dusty.command_file._sync_command_files')
     def test_make_up_command_files(self, fake_sync, fake_write_commands_to_file):
         assembled_spec = {
             'apps': {'app1': get_app_dusty_schema({'repo': '/gc/app1',
@@ -110,10 +114,10 @@ class TestCommandFile(DustyTestCase):
 
         fake_write_commands_to_file.assert_has_calls([call1, call2, call3])
 
-        fake_sync.assert_has_calls([call('{}'.format(constants.COMMAND_FILES_DIR), '{}'.format(constants.VM_COMMAND_FILES_DIR))])
+        fake_sync.assert_called_once_with(['app1'])
 
     @patch('dusty.command_file._write_commands_to_file')
-    @patch('dusty.command_file.sync_local_path_to_vm')
+    @patch('dusty.command_file._sync_command_files')
     def test_make_up_command_files_no_mount(self, fake_sync, fake_write_commands_to_file):
         assembled_spec = {
             'apps': {'app1': get_app_dusty_schema({
@@ -142,11 +146,11 @@ class TestCommandFile(DustyTestCase):
 
         fake_write_commands_to_file.assert_has_calls([call1])
 
-        fake_sync.assert_has_calls([call('{}'.format(constants.COMMAND_FILES_DIR), '{}'.format(constants.VM_COMMAND_FILES_DIR))])
+        fake_sync.assert_called_once_with(['app1'])
 
     @patch('dusty.command_file._write_commands_to_file')
     @patch('dusty.schemas.base_schema_class.get_specs_from_path')
-    @patch('dusty.command_file.sync_local_path_to_vm')
+    @patch('dusty.command_file._sync_command_files')
     def test_make_test_command_files_1(self, fake_sync, fake_get_specs, fake_write_commands_to_file):
         fake_get_specs.return_value = {
             'apps': {'app1': get_app_dusty_schema({'repo': '/gc/app1',
@@ -183,11 +187,11 @@ class TestCommandFile(DustyTestCase):
 
         fake_write_commands_to_file.assert_has_calls([call1, call2, call3])
 
-        fake_sync.assert_has_calls([call('{}'.format(constants.COMMAND_FILES_DIR), '{}'.format(constants.VM_COMMAND_FILES_DIR))])
+        fake_sync.assert_called_once_with(['app1'])
 
     @patch('dusty.command_file._write_commands_to_file')
     @patch('dusty.schemas.base_schema_class.get_specs_from_path')
-    @patch('dusty.command_file.sync_local_path_to_vm')
+    @patch('dusty.command_file._sync_command_files')
     def test_make_test_command_files_2(self, fake_sync, fake_get_specs, fake_write_commands_to_file):
         fake_get_specs.return_value = {
             'apps': {'app1': get_app_dusty_schema({'repo': '/gc/app1',
@@ -224,7 +228,7 @@ class TestCommandFile(DustyTestCase):
 
         fake_write_commands_to_file.assert_has_calls([call1, call2, call3])
 
-        fake_sync.assert_has_calls([call('{}'.format(constants.COMMAND_FILES_DIR), '{}'.format(constants.VM_COMMAND_FILES_DIR))])
+        fake_sync.assert_called_once_with(['lib1'])
 
     def test_once_commands(self):
         spec = {
@@ -307,3 +311,55 @@ class TestCommandFile(DustyTestCase):
         expected = []
         actual = command_file._get_always_commands(spec)
         self.assertEqual(expected, actual)
+
+@patch('dusty.command_file.vm_ssh_command', side_effect=lambda command: ['ssh', command])
+@patch('dusty.command_file.sync_local_dirs_to_vm')
+@patch('dusty.command_file.check_output_demoted', return_value='')
+class TestCommandFileManifest(DustyTestCase):
+    def setUp(self):
+        super(TestCommandFileManifest, self).setUp()
+        self.old_command_files_dir = constants.COMMAND_FILES_DIR
+        constants.COMMAND_FILES_DIR = tempfile.mkdtemp()
+        self.path = '{}/app1/dusty_command_file_app1.sh'.format(constants.COMMAND_FILES_DIR)
+
+    def tearDown(self):
+        super(TestCommandFileManifest, self).tearDown()
+        shutil.rmtree(constants.COMMAND_FILES_DIR)
+        constants.COMMAND_FILES_DIR = self.old_command_files_dir
+
+    def test_unchanged_file_is_not_rewritten(self, fake_check_output, fake_sync_dirs, fake_ssh):
+        command_file._write_commands_to_file(['echo 1'], 'app1', self.path)
+        os.utime(self.path, (1000, 1000))
+        command_file._write_commands_to_file(['echo 1'], 'app1', self.path)
+        self.assertEqual(os.path.getmtime(self.path), 1000)
+        command_file._write_commands_to_file(['echo 2'], 'app1', self.path)
+        self.assertNotEqual(os.path.getmtime(self.path), 1000)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'echo 2 \n')
+
+    def test_deleted_file_is_rewritten(self, fake_check_output, fake_sync_dirs, fake_ssh):
+        command_file._write_commands_to_file(['echo 1'], 'app1', self.path)
+        os.remove(self.path)
+        command_file._write_commands_to_file(['echo 1'], 'app1', self.path)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_only_changed_apps_are_synced(self, fake_check_output, fake_sync_dirs, fake_ssh):
+        command_file._write_commands_to_file(['echo 1'], 'app1', self.path)
+        command_file._write_commands_to_file(['echo 1'], 'app2', '{}/app2/dusty_command_file_app2.sh'.format(constants.COMMAND_FILES_DIR))
+        command_file._sync_command_files(['app1', 'app2'])
+        fake_sync_dirs.assert_called_once_with(constants.COMMAND_FILES_DIR, constants.VM_COMMAND_FILES_DIR, ['app1', 'app2'])
+
+        command_file._sync_command_files(['app1', 'app2'])
+        self.assertEqual(fake_sync_dirs.call_count, 1)
+
+        command_file._write_commands_to_file(['echo 2'], 'app1', self.path)
+        command_file._sync_command_files(['app1', 'app2'])
+        fake_sync_dirs.assert_called_with(constants.COMMAND_FILES_DIR, constants.VM_COMMAND_FILES_DIR, ['app1'])
+        self.assertEqual(fake_check_output.call_count, 1)
+
+    def test_vm_manifests_are_read_back(self, fake_check_output, fake_sync_dirs, fake_ssh):
+        command_file._write_commands_to_file(['echo 1'], 'app1', self.path)
+        with open(os.path.join(constants.COMMAND_FILES_DIR, 'app1', command_file.MANIFEST_NAME)) as f:
+            fake_check_output.return_value = f.read() + 'cat: /command_files/*/.manifest.json: No such file\n'
+        command_file._sync_command_files(['app1'])
+        self.assertFalse(fake_sync_dirs.called)
@@ -1,36 +1,69 @@
 import os
+import shutil
+import tarfile
 import tempfile
+from cStringIO import StringIO
+
+from mock import patch
 
 from ...testcases import DustyTestCase
-from dusty.commands.cp import _cleanup_path
+from dusty.commands.cp import copy_from_local, copy_between_containers
 
 class TestCpCommands(DustyTestCase):
-    def test_cleanup_path_file(self):
-        self.temp_file = tempfile.mkstemp()[1]
-        with _cleanup_path(self.temp_file):
-            pass
-        self.assertFalse(os.path.exists(self.temp_file))
-
-    def test_cleanup_path_file_on_error(self):
-        self.temp_file = tempfile.mkstemp()[1]
-        try:
-            with _cleanup_path(self.temp_file):
-                raise RuntimeError()
-        except:
-            pass
-        self.assertFalse(os.path.exists(self.temp_file))
-
-    def test_cleanup_path_dir(self):
+    def setUp(self):
+        super(TestCpCommands, self).setUp()
         self.temp_dir = tempfile.mkdtemp()
-        with _cleanup_path(self.temp_dir):
-            pass
-        self.assertFalse(os.path.exists(self.temp_dir))
+        self.local_dir = os.path.join(self.temp_dir, 'files')
+        os.mkdir(self.local_dir)
+        with open(os.path.join(self.local_dir, 'a.txt'), 'w') as f:
+            f.write('contents')
 
-    def test_cleanup_path_dir_on_error(self):
-        self.temp_dir = tempfile.mkdtemp()
-        try:
-            with _cleanup_path(self.temp_dir):
-                raise RuntimeError()
-        except:
-            pass
-        self.assertFalse(os.path.exists(self.temp_dir))
+    def tearDown(self):
+        super(TestCpCommands, self).tearDown()
+        shutil.rmtree(self.temp_dir)
+
+    def _uploaded_members(self, compress):
+        uploaded = {}
+        def fake_put(remote_name, data, name, dest_path):
+            uploaded.update(name=name, dest_path=dest_path, archive=''.join(data))
+        with patch('dusty.commands.cp.put_archive_at_path', side_effect=fake_put):
+            copy_from_local(self.local_dir, 'website', '/app/files', demote=False, compress=compress)
+        self.assertEqual(uploaded['name'], 'files')
+        self.assertEqual(uploaded['dest_path'], '/app/files')
+        archive = tarfile.open(fileobj=StringIO(uploaded['archive']), mode='r:gz' if compress else 'r:')
+        return sorted(archive.getnames())
+
+    def test_copy_from_local_streams_archive(self):
+        self.assertEqual(self._uploaded_members(False), ['files', 'files/a.txt'])
+
+    def test_copy_from_local_compressed(self):
+        self.assertEqual(self._uploaded_members(True), ['files', 'files/a.txt'])
+
+    @patch('dusty.commands.cp.put_archive_at_path')
+    def test_copy_from_local_missing_path(self, fake_put):
+        with self.assertRaises(RuntimeError):
+            copy_from_local(os.path.join(self.temp_dir, 'missing'), 'website', '/app/files', demote=False)
+        self.assertFalse(fake_put.called)
+
+    @patch('dusty.commands.cp._local_tar_process')
+    def test_copy_from_local_tar_failure_aborts_upload(self, fake_tar_process):
+        fake_tar_process.return_value.stdout = StringIO('partial')
+        fake_tar_process.return_value.wait.return_value = 2
+        def fake_put(remote_name, data, name, dest_path):
+            list(data)
+        with patch('dusty.commands.cp.put_archive_at_path', side_effect=fake_put):
+            with self.assertRaises(RuntimeError):
+                copy_from_local(self.local_dir, 'website', '/app/files', demote=False)
+
+    @patch('dusty.commands.cp.copy_path_between_containers')
+    @patch('dusty.commands.cp.container_path_exists', return_value=True)
+    def test_copy_between_containers(self, fake_exists, fake_copy):
+        copy_between_containers('website', '/tmp/a', 'api', '/tmp/b')
+        fake_copy.assert_called_once_with('website', '/tmp/a', 'api', '/tmp/b')
+
+    @patch('dusty.commands.cp.copy_path_between_containers')
+    @patch('dusty.commands.cp.container_path_exists', return_value=False)
+    def test_copy_between_containers_missing_source(self, fake_exists, fake_copy):
+        with self.assertRaises(RuntimeError):
+            copy_between_containers('website', '/tmp/a', 'api', '/tmp/b')
+        self.assertFalse(fake_copy.called)
@@ -6,7 +6,8 @@ from mock import patch, call, ANY
 from dusty.config import get_config_value
 from dusty.commands.bundles import activate_bundle
 from dusty.commands.repos import (list_repos, override_repo, manage_repo, manage_all_repos,
-                                  override_repos_from_directory, update_managed_repos)
+                                  override_repos_from_directory, update_managed_repos,
+                                  set_repo_sync_method, set_repo_nfs_profile)
 from dusty.compiler.spec_assembler import get_specs_repo
 from ...testcases import DustyTestCase
 from dusty import constants
@@ -105,3 +106,27 @@ class TestReposCommands(DustyTestCase):
         activate_bundle(['bundle-b'])
         update_managed_repos()
         fake_update_local_repo_async.assert_has_calls([call(ANY, force=False), call(ANY, force=False)])
+
+    @patch('dusty.systems.sync.stop_syncing_repos')
+    def test_set_repo_sync_method(self, fake_stop_syncing):
+        set_repo_sync_method('github.com/app/a', constants.SYNC_METHOD_RSYNC)
+        self.assertEqual(get_config_value(constants.CONFIG_REPO_SYNC_METHODS_KEY),
+                         {'github.com/app/a': constants.SYNC_METHOD_RSYNC})
+        set_repo_sync_method('github.com/app/a', constants.SYNC_METHOD_NFS)
+        self.assertEqual(get_config_value(constants.CONFIG_REPO_SYNC_METHODS_KEY), {})
+        self.assertEqual(fake_stop_syncing.call_count, 1)
+
+    def test_set_repo_sync_method_unknown(self):
+        with self.assertRaises(RuntimeError):
+            set_repo_sync_method('github.com/app/a', 'ftp')
+
+    def test_set_repo_nfs_profile(self):
+        set_repo_nfs_profile('github.com/app/a', 'read-mostly')
+        self.assertEqual(get_config_value(constants.CONFIG_NFS_MOUNT_PROFILES_KEY),
+                         {'github.com/app/a': 'read-mostly'})
+        list_repos()
+        self.assertIn('nfs (read-mostly)', self.last_client_output)
+
+    def test_set_repo_nfs_profile_unknown(self):
+        with self.assertRaises(RuntimeError):
+            set_repo_nfs_profile('github.com/app/a', 'fastest')
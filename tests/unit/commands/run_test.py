@@ -1,6 +1,6 @@
 from mock import patch, call
 
-from dusty.commands.run import restart_apps_or_services, restart_apps_by_repo
+from dusty.commands.run import restart_apps_or_services, restart_apps_by_repo, start_local_env, _up_task_graph
 from dusty.source import Repo
 from ...testcases import DustyTestCase
 from ..utils import apply_required_keys
@@ -106,3 +106,38 @@ class TestRunCommands(DustyTestCase):
         restart_apps_by_repo(['github.com/lib/b', 'github.com/app/b'])
         fake_restart.assert_has_calls([call(set(['app-a', 'app-b']))])
 
+
+    @patch('dusty.commands.run.update_managed_repos')
+    @patch('dusty.commands.run.virtualbox')
+    @patch('dusty.commands.run._assemble_active_specs')
+    @patch('dusty.commands.run._check_vm_disk')
+    @patch('dusty.commands.run._compile_port_spec')
+    @patch('dusty.commands.run._compile_nginx_config')
+    @patch('dusty.commands.run._write_command_files')
+    @patch('dusty.commands.run._compile_compose_config')
+    @patch('dusty.commands.run._plan_containers')
+    @patch('dusty.commands.run._stop_planned_services')
+    @patch('dusty.commands.run._update_hosts_file')
+    @patch('dusty.commands.run._configure_nfs')
+    @patch('dusty.commands.run._update_nginx')
+    @patch('dusty.commands.run._start_containers')
+    @patch('dusty.commands.run._pull_images')
+    @patch('dusty.commands.run.nfs.active_repos_to_mount')
+    def test_start_local_env_runs_every_step(self, fake_repos_to_mount, fake_pull_images, fake_start, *other_fakes):
+        fake_virtualbox = other_fakes[-2]
+        fake_virtualbox.required_absent_assets.return_value = []
+        start_local_env(pull_repos=False)
+        fake_start.assert_called_once_with(other_fakes[5].return_value, other_fakes[4].return_value,
+                                           other_fakes[3].return_value)
+        other_fakes[4].assert_called_once_with(other_fakes[5].return_value, other_fakes[6].return_value,
+                                               other_fakes[7].return_value, fake_repos_to_mount.return_value)
+        fake_pull_images.assert_called_once_with(other_fakes[5].return_value)
+        for fake in other_fakes[:-2]:
+            self.assertTrue(fake.called)
+        self.assertFalse(other_fakes[-1].called)
+        self.assertIn('Critical path', '\n'.join(self.client_output))
+
+    def test_repos_are_remounted_and_synced_after_replaced_containers_stop(self):
+        task_graph = _up_task_graph(recreate_containers=True, pull_repos=False)
+        for task in ['configure_nfs', 'sync_repos']:
+            self.assertIn('stop_replaced_containers', task_graph._tasks[task][1])
@@ -1,103 +1,115 @@
+import datetime
+
 from mock import patch, Mock, call
 
 from ...testcases import DustyTestCase
-from dusty.commands.status import _has_active_container, get_dusty_status
+from dusty.commands.status import _uptime, _status_row, get_dusty_status
+from dusty.systems.docker import ContainerSnapshot
 from dusty.schemas.base_schema_class import DustySchema
 from ..utils import get_app_dusty_schema, get_bundle_dusty_schema, get_lib_dusty_schema
 
+NOW = datetime.datetime(2015, 10, 1, 12, 0, 0)
+
+def _running(started_at):
+    return {'State': {'Running': True, 'StartedAt': started_at}}
+
 class TestStatusCommands(DustyTestCase):
-    @patch('dusty.commands.status.get_dusty_containers')
-    def test_has_active_container_lib_active(self, fake_get_dusty_containers):
-        fake_get_dusty_containers.return_value = ['some_container']
-        self.assertEquals(False, _has_active_container('lib', 'lib-a'))
+    def test_uptime(self):
+        self.assertEqual(_uptime(_running('2015-10-01T10:00:00.123456789Z'), NOW), '2 hours')
+
+    def test_uptime_minutes(self):
+        self.assertEqual(_uptime(_running('2015-10-01T11:55:00Z'), NOW), '5 minutes')
+
+    def test_uptime_days(self):
+        self.assertEqual(_uptime(_running('2015-09-28T12:00:00.5Z'), NOW), '3 days')
 
-    @patch('dusty.commands.status.get_dusty_containers')
-    def test_has_active_container_lib_inactive(self, fake_get_dusty_containers):
-        fake_get_dusty_containers.return_value = []
-        self.assertEquals(False, _has_active_container('lib', 'lib-a'))
+    def test_uptime_is_not_frozen(self):
+        inspection = _running('2015-10-01T11:59:30Z')
+        self.assertEqual(_uptime(inspection, NOW), '30 seconds')
+        self.assertEqual(_uptime(inspection, NOW + datetime.timedelta(hours=5)), '5 hours')
 
-    @patch('dusty.commands.status.get_dusty_containers')
-    def test_has_active_container_app_active(self, fake_get_dusty_containers):
-        fake_get_dusty_containers.return_value = ['some_container']
-        self.assertEquals(True, _has_active_container('app', 'app-a'))
+    def test_uptime_not_running(self):
+        self.assertEqual(_uptime({'State': {'Running': False, 'StartedAt': '2015-10-01T10:00:00Z'}}, NOW), '')
+        self.assertEqual(_uptime({}, NOW), '')
 
-    @patch('dusty.commands.status.get_dusty_containers')
-    def test_has_active_container_app_inactive(self, fake_get_dusty_containers):
-        fake_get_dusty_containers.return_value = []
-        self.assertEquals(False, _has_active_container('app', 'app-a'))
+    def test_status_row_no_container(self):
+        self.assertEqual(_status_row('lib-a', 'lib', None, {}), ['lib-a', 'lib', '', '', '', ''])
 
-    @patch('dusty.commands.status.get_dusty_containers')
-    def test_has_active_container_service_active(self, fake_get_dusty_containers):
-        fake_get_dusty_containers.return_value = ['some_container']
-        self.assertEquals(True, _has_active_container('service', 'service-a'))
+    def test_status_row_with_inspection(self):
+        inspections = {'abc': {'RestartCount': 2, 'State': {'Running': True, 'StartedAt': '2015-09-28T12:00:00Z',
+                                                             'Health': {'Status': 'healthy'}}}}
+        self.assertEqual(_status_row('app-a', 'app', {'Id': 'abc', 'Status': 'Up 1 second (healthy)'}, inspections, NOW),
+                         ['app-a', 'app', 'X', '3 days', 2, 'healthy'])
 
-    @patch('dusty.commands.status.get_dusty_containers')
-    def test_has_active_container_service_inactive(self, fake_get_dusty_containers):
-        fake_get_dusty_containers.return_value = []
-        self.assertEquals(False, _has_active_container('service', 'service-a'))
+    def test_status_row_without_health(self):
+        inspections = {'abc': {'RestartCount': 0, 'State': {'Running': True, 'StartedAt': '2015-09-28T12:00:00Z'}}}
+        self.assertEqual(_status_row('app-a', 'app', {'Id': 'abc', 'Status': 'Up 1 second'}, inspections, NOW),
+                         ['app-a', 'app', 'X', '3 days', 0, ''])
 
     @patch('dusty.commands.status.docker_vm_is_running')
-    @patch('dusty.systems.docker.get_docker_client')
+    @patch('dusty.commands.status.get_docker_client')
     @patch('dusty.commands.status.PrettyTable')
-    @patch('dusty.commands.status.get_dusty_containers')
+    @patch('dusty.commands.status.get_container_snapshot')
     @patch('dusty.schemas.base_schema_class.get_specs_from_path')
     @patch('dusty.compiler.spec_assembler._get_referenced_apps')
     @patch('dusty.compiler.spec_assembler._get_referenced_libs')
     @patch('dusty.compiler.spec_assembler._get_referenced_services')
     def test_get_dusty_status_active_1(self, fake_get_services, fake_get_libs, fake_get_apps, fake_get_specs,
-                                     fake_get_dusty_containers, fake_pretty_table, fake_get_docker_client, fake_vm_is_running):
+                                     fake_get_container_snapshot, fake_pretty_table, fake_get_docker_client, fake_vm_is_running):
         fake_get_services.return_value = set(['ser1', 'ser2', 'ser3'])
         fake_get_libs.return_value = set(['lib1'])
         fake_get_apps.return_value = set(['app1', 'app2'])
         fake_table = Mock()
         fake_pretty_table.return_value = fake_table
-        fake_get_dusty_containers.return_value = ['some_container']
+        fake_get_container_snapshot.return_value = ContainerSnapshot(
+            [{'Id': name, 'Names': ['/dusty_{}_1'.format(name)], 'Status': 'Up 2 hours'}
+             for name in ['app1', 'app2', 'ser1', 'ser2', 'ser3', 'dustyInternalNginx']])
+        started_at = (datetime.datetime.utcnow() - datetime.timedelta(hours=2)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        fake_get_docker_client.return_value.inspect_container.return_value = {'RestartCount': 1, 'State': _running(started_at)['State']}
         fake_get_specs.return_value = {'apps': {'app1': get_app_dusty_schema({}, 'app1'), 'app2':get_app_dusty_schema({}, 'app2')},
                                        'libs': {'lib1': get_lib_dusty_schema({}, 'lib1')},
                                        'services': {'ser1': DustySchema(None, {}, 'ser1', 'services'), 'ser2': DustySchema(None, {}, 'ser2', 'services'), 'ser3': DustySchema(None, {}, 'ser3', 'services')},
                                        'bundles': get_lib_dusty_schema({})}
-        fake_get_docker_client.return_value = None
         fake_vm_is_running.return_value = True
         get_dusty_status()
         call_args_list = fake_table.add_row.call_args_list
-        self.assertTrue(call(['app1', 'app', 'X']) in call_args_list)
-        self.assertTrue(call(['app2', 'app', 'X']) in call_args_list)
-        self.assertTrue(call(['lib1', 'lib', '']) in call_args_list)
-        self.assertTrue(call(['ser1', 'service', 'X']) in call_args_list)
-        self.assertTrue(call(['ser2', 'service', 'X']) in call_args_list)
-        self.assertTrue(call(['ser3', 'service', 'X']) in call_args_list)
-        self.assertTrue(call(['dustyInternalNginx', '', 'X']) in call_args_list)
+        self.assertTrue(call(['app1', 'app', 'X', '2 hours', 1, '']) in call_args_list)
+        self.assertTrue(call(['app2', 'app', 'X', '2 hours', 1, '']) in call_args_list)
+        self.assertTrue(call(['lib1', 'lib', '', '', '', '']) in call_args_list)
+        self.assertTrue(call(['ser1', 'service', 'X', '2 hours', 1, '']) in call_args_list)
+        self.assertTrue(call(['ser2', 'service', 'X', '2 hours', 1, '']) in call_args_list)
+        self.assertTrue(call(['ser3', 'service', 'X', '2 hours', 1, '']) in call_args_list)
+        self.assertTrue(call(['dustyInternalNginx', '', 'X', '2 hours', 1, '']) in call_args_list)
         self.assertEquals(len(call_args_list), 7)
 
     @patch('dusty.commands.status.docker_vm_is_running')
-    @patch('dusty.systems.docker.get_docker_client')
+    @patch('dusty.commands.status.get_docker_client')
     @patch('dusty.commands.status.PrettyTable')
-    @patch('dusty.commands.status.get_dusty_containers')
+    @patch('dusty.commands.status.get_container_snapshot')
     @patch('dusty.schemas.base_schema_class.get_specs_from_path')
     @patch('dusty.compiler.spec_assembler._get_referenced_apps')
     @patch('dusty.compiler.spec_assembler._get_referenced_libs')
     @patch('dusty.compiler.spec_assembler._get_referenced_services')
     def test_get_dusty_status_active_2(self, fake_get_services, fake_get_libs, fake_get_apps, fake_get_specs,
-                                     fake_get_dusty_containers, fake_pretty_table, fake_get_docker_client, fake_vm_is_running):
+                                     fake_get_container_snapshot, fake_pretty_table, fake_get_docker_client, fake_vm_is_running):
         fake_get_services.return_value = set(['ser1', 'ser2', 'ser3'])
         fake_get_libs.return_value = set(['lib1'])
         fake_get_apps.return_value = set(['app1', 'app2'])
         fake_table = Mock()
         fake_pretty_table.return_value = fake_table
-        fake_get_dusty_containers.return_value = []
+        fake_get_container_snapshot.return_value = ContainerSnapshot([])
         fake_get_specs.return_value = {'apps': {'app1': get_app_dusty_schema({}, 'app1'), 'app2':get_app_dusty_schema({}, 'app2')},
                                        'libs': {'lib1': get_lib_dusty_schema({}, 'lib1')},
                                        'services': {'ser1': DustySchema(None, {}, 'ser1', 'services'), 'ser2': DustySchema(None, {}, 'ser2', 'services'), 'ser3': DustySchema(None, {}, 'ser3', 'services')},
                                        'bundles': get_lib_dusty_schema({})}
-        fake_get_docker_client.return_value = None
         fake_vm_is_running.return_value = True
         get_dusty_status()
         call_args_list = fake_table.add_row.call_args_list
-        self.assertTrue(call(['app1', 'app', '']) in call_args_list)
-        self.assertTrue(call(['app2', 'app', '']) in call_args_list)
-        self.assertTrue(call(['lib1', 'lib', '']) in call_args_list)
-        self.assertTrue(call(['ser1', 'service', '']) in call_args_list)
-        self.assertTrue(call(['ser2', 'service', '']) in call_args_list)
-        self.assertTrue(call(['ser3', 'service', '']) in call_args_list)
-        self.assertTrue(call(['dustyInternalNginx', '', '']) in call_args_list)
+        self.assertTrue(call(['app1', 'app', '', '', '', '']) in call_args_list)
+        self.assertTrue(call(['app2', 'app', '', '', '', '']) in call_args_list)
+        self.assertTrue(call(['lib1', 'lib', '', '', '', '']) in call_args_list)
+        self.assertTrue(call(['ser1', 'service', '', '', '', '']) in call_args_list)
+        self.assertTrue(call(['ser2', 'service', '', '', '', '']) in call_args_list)
+        self.assertTrue(call(['ser3', 'service', '', '', '', '']) in call_args_list)
+        self.assertTrue(call(['dustyInternalNginx', '', '', '', '', '']) in call_args_list)
         self.assertEquals(len(call_args_list), 7)
@@ -42,12 +42,12 @@ class TestTestsCommands(DustyTestCase):
     def test_run_all_suites_lib_not_found(self, fake_lib_get_volumes, fake_app_get_volumes, fake_update_nfs, fake_ensure_current_image, fake_expanded_libs, fake_get_docker_client, fake_initialize_vm):
         fake_expanded_libs.return_value = self.specs
         with self.assertRaises(KeyError):
-            test.run_all_suites('lib-c')
+            test.run_all_suites('lib-c', workers=4)
 
     def test_run_all_suites_app_not_found(self, fake_lib_get_volumes, fake_app_get_volumes, fake_update_nfs, fake_ensure_current_image, fake_expanded_libs, fake_get_docker_client, fake_initialize_vm):
         fake_expanded_libs.return_value = self.specs
         with self.assertRaises(KeyError):
-            test.run_all_suites('app-c')
+            test.run_all_suites('app-c', workers=4)
 
     def test_run_one_suite_suite_not_found(self, fake_lib_get_volumes, fake_app_get_volumes, fake_update_nfs, fake_ensure_current_image, fake_expanded_libs, fake_get_docker_client, fake_initialize_vm):
         fake_expanded_libs.return_value = self.specs
@@ -93,13 +93,33 @@ class TestTestsCommands(DustyTestCase):
                                                  fake_app_get_volumes, fake_update_nfs, fake_ensure_current_image,
                                                  fake_expanded_libs, fake_get_docker_client, fake_initialize_vm):
         fake_expanded_libs.return_value = self.specs
-        fake_run_tests.side_effect = [0, 1]
+        fake_run_tests.side_effect = lambda app_or_lib_name, suite_name, test_arguments, log_prefix: 1 if suite_name == 'nose2' else 0
 
-        test.run_all_suites('multi-suite-lib')
+        test.run_all_suites('multi-suite-lib', workers=4)
 
-        fake_run_tests.assert_has_calls([call('multi-suite-lib', 'nose1', None),
-                                       call('multi-suite-lib', 'nose2', None)])
+        fake_run_tests.assert_has_calls([call('multi-suite-lib', 'nose1', None, log_prefix='[nose1] '),
+                                         call('multi-suite-lib', 'nose2', None, log_prefix='[nose2] ')], any_order=True)
         fake_exit.assert_has_calls([call(1)])
+        self.assertIn('| nose2 |             |  FAIL  |', '\n'.join(self.client_output))
+
+    @patch('dusty.commands.test._run_tests_with_image')
+    @patch('dusty.commands.test.sys.exit')
+    def test_run_all_suites_error_fails_suite(self, fake_exit, fake_run_tests, fake_lib_get_volumes,
+                                              fake_app_get_volumes, fake_update_nfs, fake_ensure_current_image,
+                                              fake_expanded_libs, fake_get_docker_client, fake_initialize_vm):
+        fake_expanded_libs.return_value = self.specs
+        def run_tests(app_or_lib_name, suite_name, test_arguments, log_prefix):
+            if suite_name == 'nose1':
+                raise RuntimeError('compose failed')
+            return 0
+        fake_run_tests.side_effect = run_tests
+
+        test.run_all_suites('multi-suite-lib', workers=1)
+
+        self.assertEqual(fake_run_tests.call_count, 2)
+        fake_exit.assert_has_calls([call(1)])
+        self.assertIn('[nose1] compose failed', self.client_output)
+        self.assertIn('| nose1 |             | ERROR  |', '\n'.join(self.client_output))
 
 
     @patch('dusty.commands.test._run_tests_with_image')
@@ -110,11 +130,15 @@ class TestTestsCommands(DustyTestCase):
         fake_expanded_libs.return_value = self.specs
         fake_run_tests.return_value = 0
 
-        test.run_all_suites('app-a')
+        test.run_all_suites('app-a', workers=4)
 
-        fake_run_tests.assert_has_calls([call('app-a', 'nose', None)])
+        fake_run_tests.assert_has_calls([call('app-a', 'nose', None, log_prefix='[nose] ')])
         fake_exit.assert_has_calls([call(0)])
 
+    def test_test_composefile_path_per_suite(self, *args):
+        self.assertNotEqual(test._test_composefile_path(test._compose_project_name('app-a', 'nose1'), 'app-a'),
+                            test._test_composefile_path(test._compose_project_name('app-a', 'nose2'), 'app-a'))
+
     def test_construct_test_command_invalid_name_app(self,fake_lib_get_volumes,
                                                  fake_app_get_volumes, fake_update_nfs, fake_ensure_current_image,
                                                  fake_expanded_libs, fake_get_docker_client, fake_initialize_vm):
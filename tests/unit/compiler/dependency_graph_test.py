@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+from dusty.compiler.dependency_graph import DependencyGraph, DependencyCycle, get_dependency_graph
+from ...testcases import DustyTestCase
+from ..utils import apply_required_keys
+
+def _specs(apps=None, libs=None):
+    return {'apps': {name: {'depends': depends} for name, depends in (apps or {}).iteritems()},
+            'libs': {name: {'depends': depends} for name, depends in (libs or {}).iteritems()}}
+
+class TestDependencyGraph(TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph(_specs(
+            apps={'app1': {'apps': ['app2'], 'libs': ['lib1'], 'services': ['service1']},
+                  'app2': {'apps': ['app3'], 'libs': ['lib3']},
+                  'app3': {}},
+            libs={'lib1': {'libs': ['lib2', 'lib3']},
+                  'lib2': {'libs': ['lib3']},
+                  'lib3': {},
+                  'lib4': {}}))
+
+    def test_same_type_closure(self):
+        self.assertEqual(self.graph.dependencies('apps', 'app1', 'apps'), set(['app2', 'app3']))
+        self.assertEqual(self.graph.dependencies('libs', 'lib1', 'libs'), set(['lib2', 'lib3']))
+
+    def test_apps_to_libs_closure(self):
+        self.assertEqual(self.graph.dependencies('libs', 'app1', 'apps'), set(['lib1', 'lib2', 'lib3']))
+
+    def test_services_are_direct(self):
+        self.assertEqual(self.graph.dependencies('services', 'app1', 'apps'), set(['service1']))
+
+    def test_missing_spec_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.graph.dependencies('libs', 'app4', 'apps')
+
+    def test_topological_order(self):
+        order = self.graph.topological_order('libs')
+        self.assertItemsEqual(order, ['lib1', 'lib2', 'lib3', 'lib4'])
+        self.assertLess(order.index('lib3'), order.index('lib2'))
+        self.assertLess(order.index('lib2'), order.index('lib1'))
+
+    def test_direct_dependents(self):
+        self.assertEqual(self.graph.direct_dependents('libs', 'lib3'), {'apps': set(['app2']), 'libs': set(['lib1', 'lib2'])})
+
+    def test_dependents(self):
+        self.assertEqual(self.graph.dependents('libs', 'lib3'), {'apps': set(['app1', 'app2']), 'libs': set(['lib1', 'lib2'])})
+        self.assertEqual(self.graph.dependents('apps', 'app3'), {'apps': set(['app1', 'app2']), 'libs': set()})
+
+    def test_find_cycle(self):
+        graph = DependencyGraph(_specs(libs={'lib1': {'libs': ['lib2']}, 'lib2': {'libs': ['lib3']}, 'lib3': {'libs': ['lib1']}}))
+        self.assertEqual(graph.find_cycle('libs'), ['lib1', 'lib2', 'lib3', 'lib1'])
+        self.assertIsNone(self.graph.find_cycle('libs'))
+
+    def test_find_cycle_ignores_missing_specs(self):
+        graph = DependencyGraph(_specs(apps={'app1': {'apps': ['missing']}}))
+        self.assertIsNone(graph.find_cycle('apps'))
+
+    def test_closure_of_cycle_raises(self):
+        graph = DependencyGraph(_specs(apps={'app1': {'apps': ['app1']}}))
+        with self.assertRaises(DependencyCycle):
+            graph.dependencies('apps', 'app1', 'apps')
+
+    def test_deep_diamonds(self):
+        # Each lib depends on both libs of the next level, which is exponential to walk naively
+        libs = {}
+        for level in range(40):
+            next_level = ['lib-{}-a'.format(level + 1), 'lib-{}-b'.format(level + 1)] if level < 39 else []
+            libs['lib-{}-a'.format(level)] = {'libs': next_level}
+            libs['lib-{}-b'.format(level)] = {'libs': next_level}
+        graph = DependencyGraph(_specs(libs=libs))
+        self.assertEqual(len(graph.dependencies('libs', 'lib-0-a', 'libs')), 78)
+
+class TestGetDependencyGraph(DustyTestCase):
+    def test_graph_is_kept_on_specs_and_shared_with_overlays(self):
+        specs = self.make_test_specs(apply_required_keys({'apps': {'app1': {}}}))
+        graph = get_dependency_graph(specs)
+        self.assertIs(get_dependency_graph(specs), graph)
+        self.assertIs(get_dependency_graph(specs.overlay()), graph)
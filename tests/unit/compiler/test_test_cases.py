@@ -127,6 +127,15 @@ class TestSpecAssemblerGetRepoTestCases(DustyTestCase):
         with self.assertRaises(KeyError):
             spec_assembler.get_repo_of_app_or_library('lib-b')
 
+class TestSpecAssemblerOverlays(DustyTestCase):
+    def test_assembled_specs_do_not_change_specs(self):
+        spec_assembler.get_assembled_specs()
+        self.assertItemsEqual(spec_assembler.get_specs()['apps'].keys(), ['app-a', 'app-b', 'app-c'])
+
+    def test_expanded_libs_specs_do_not_change_specs(self):
+        spec_assembler.get_expanded_libs_specs()['apps']['app-a']['depends']['libs'].add('lib-b')
+        self.assertEqual(spec_assembler.get_specs()['apps']['app-a']['depends']['libs'], ['lib-a'])
+
 class TestGetExpandedLibSpecs(DustyTestCase):
     def test_get_expanded_lib_specs_1(self):
         specs =  {
@@ -327,3 +336,34 @@ class TestGetDependentRepos(DustyTestCase):
 
         self.assertEquals(set(spec_assembler.get_same_container_repos('lib1')),
                           set([Repo('/gc/lib1'), Repo('/gc/lib2')]))
+
+    @patch('dusty.compiler.spec_assembler.get_specs')
+    def test_get_repo_index_mounted_by(self, fake_get_specs):
+        fake_get_specs.return_value = self.make_test_specs(apply_required_keys({
+                                        'apps': {'app1': {'depends': {'libs': ['lib1']}, 'repo': '/gc/app1'},
+                                                 'app2': {'depends': {'libs': ['lib2']}, 'repo': '/gc/app2'},
+                                                 'app3': {'depends': {'libs': []}, 'repo': ''}},
+                                        'libs': {'lib1': {'depends': {'libs': ['lib2']}, 'repo': '/gc/lib1'},
+                                                 'lib2': {'depends': {'libs': []}, 'repo': '/gc/lib2'}}}))
+        index = spec_assembler.get_repo_index(include_specs_repo=False)
+        self.assertEqual(index.repos, set([Repo('/gc/app1'), Repo('/gc/app2'), Repo('/gc/lib1'), Repo('/gc/lib2')]))
+        self.assertEqual(index.mounted_by(Repo('/gc/lib2')), {'apps': set(['app1', 'app2']), 'libs': set(['lib1', 'lib2'])})
+        self.assertEqual(index.mounted_by(Repo('/gc/lib1')), {'apps': set(['app1']), 'libs': set(['lib1'])})
+        self.assertEqual(index.mounted_by(Repo('/gc/app2')), {'apps': set(['app2']), 'libs': set()})
+
+    @patch('dusty.compiler.spec_assembler.get_specs')
+    def test_get_spec_nfs_mount_profiles(self, fake_get_specs):
+        fake_get_specs.return_value = self.make_test_specs(apply_required_keys({
+                                        'apps': {'app1': {'repo': '/gc/app1', 'nfs_profile': 'cached'},
+                                                 'app2': {'repo': '/gc/app2'}},
+                                        'libs': {'lib1': {'repo': '/gc/lib1', 'nfs_profile': 'read-mostly'},
+                                                 'lib2': {'repo': '/gc/app1', 'nfs_profile': 'tcp'}}}))
+        self.assertEqual(spec_assembler.get_spec_nfs_mount_profiles(),
+                         {'/gc/app1': 'cached', '/gc/lib1': 'read-mostly'})
+
+    @patch('dusty.compiler.spec_assembler.get_specs')
+    def test_get_spec_nfs_mount_profiles_lib_first_by_name(self, fake_get_specs):
+        fake_get_specs.return_value = self.make_test_specs(apply_required_keys({
+                                        'apps': {'web': {'repo': '/gc/shared', 'nfs_profile': 'cached'}},
+                                        'libs': {'common': {'repo': '/gc/shared', 'nfs_profile': 'tcp'}}}))
+        self.assertEqual(spec_assembler.get_spec_nfs_mount_profiles(), {'/gc/shared': 'tcp'})
@@ -1,5 +1,8 @@
 import os
 import tempfile
+import threading
+
+from mock import patch
 
 from ..testcases import DustyTestCase
 from dusty import constants, config
@@ -26,3 +29,42 @@ class TestConfig(DustyTestCase):
         self.assertItemsEqual(config.get_config_value(constants.CONFIG_BUNDLES_KEY), ['bundle-b'])
         config.save_config_value('new_key', 'bacon')
         self.assertEqual(config.get_config_value('new_key'), 'bacon')
+
+    @patch('dusty.config._load', wraps=config._load)
+    def test_get_config_reads_from_memory(self, fake_load):
+        config.save_config(self.test_config)
+        config.get_config()
+        config.get_config_value(constants.CONFIG_BUNDLES_KEY)
+        self.assertEqual(fake_load.call_count, 0)
+
+    def test_get_config_reloads_changed_file(self):
+        config.save_config(self.test_config)
+        config.get_config()
+        with open(constants.CONFIG_PATH, 'w') as f:
+            f.write(config._dump({constants.CONFIG_BUNDLES_KEY: ['edited-by-hand']}))
+        self.assertEqual(config.get_config_value(constants.CONFIG_BUNDLES_KEY), ['edited-by-hand'])
+
+    def test_mutating_returned_config_does_not_change_store(self):
+        config.save_config(self.test_config)
+        config.get_config()[constants.CONFIG_BUNDLES_KEY].append('bundle-b')
+        self.assertItemsEqual(config.get_config_value(constants.CONFIG_BUNDLES_KEY), ['bundle-a'])
+
+    def test_save_config_leaves_no_temp_files(self):
+        config_dir = os.path.dirname(constants.CONFIG_PATH)
+        files_before = set(os.listdir(config_dir))
+        config.save_config(self.test_config)
+        self.assertEqual(files_before, set(os.listdir(config_dir)))
+
+    def test_concurrent_read_modify_writes_are_not_lost(self):
+        config.save_config_value(constants.CONFIG_CHANGESET_KEY, {})
+        def update(key):
+            with config.config_lock:
+                stored = config.get_config_value(constants.CONFIG_CHANGESET_KEY)
+                stored[key] = True
+                config.save_config_value(constants.CONFIG_CHANGESET_KEY, stored)
+        threads = [threading.Thread(target=update, args=(str(i),)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(config.get_config_value(constants.CONFIG_CHANGESET_KEY)), 10)
@@ -0,0 +1,154 @@
+import logging
+import threading
+
+from mock import Mock, patch
+
+from ..testcases import DustyTestCase
+from dusty import constants
+from dusty.context import RequestContext, bound_context, current_context
+from dusty.daemon import _handle_connection, _run_command, mutating_command_lock
+from dusty.log import log_to_client, make_socket_logger, close_socket_logger
+from dusty.memoize import memoized
+from dusty.payload import Payload, daemon_command, read_only_daemon_command, function_key
+from dusty.protocol import (encode_frame, recv_frame, FRAME_ACK, FRAME_REQUEST, FRAME_OUTPUT,
+                            FRAME_ERROR, FRAME_EXIT)
+
+@daemon_command
+def _mutating_fn(*args, **kwargs):
+    log_to_client('mutating ran')
+
+@read_only_daemon_command
+def _read_only_fn(*args, **kwargs):
+    log_to_client('read only ran')
+
+class FakeConnection(object):
+    def __init__(self, request):
+        self.incoming = encode_frame(FRAME_REQUEST, request) if request is not None else ''
+        self.sent = []
+        self.closed = False
+
+    def sendall(self, data):
+        self.sent.append(data)
+
+    def recv(self, size):
+        data, self.incoming = self.incoming[:size], self.incoming[size:]
+        return data
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def frames(self):
+        reader = FakeConnection(None)
+        reader.incoming = ''.join(self.sent)
+        frames = []
+        while True:
+            frame = recv_frame(reader)
+            if frame == (None, None):
+                return frames
+            frames.append(frame)
+
+    @property
+    def output(self):
+        return ''.join(body for frame_type, body in self.frames if frame_type == FRAME_OUTPUT)
+
+class TestDaemon(DustyTestCase):
+    def tearDown(self):
+        super(TestDaemon, self).tearDown()
+        if mutating_command_lock.locked():
+            mutating_command_lock.release()
+
+    @patch('dusty.daemon._run_pre_command_functions')
+    def test_handle_connection_runs_command(self, fake_pre_command):
+        connection = FakeConnection(Payload(_mutating_fn).serialize())
+        _handle_connection(connection, True)
+        self.assertEqual(connection.frames[0], (FRAME_ACK, ''))
+        self.assertIn('mutating ran\n', connection.output)
+        self.assertEqual(connection.frames[-1], (FRAME_EXIT, '0'))
+        self.assertTrue(connection.closed)
+
+    @patch('dusty.daemon._run_pre_command_functions')
+    def test_handle_connection_large_request(self, fake_pre_command):
+        connection = FakeConnection(Payload(_mutating_fn, ['x' * 100] * 1000).serialize())
+        _handle_connection(connection, True)
+        self.assertIn('mutating ran\n', connection.output)
+        self.assertEqual(connection.frames[-1], (FRAME_EXIT, '0'))
+
+    @patch('dusty.daemon._run_pre_command_functions')
+    def test_handle_connection_removes_socket_handler(self, fake_pre_command):
+        handlers_before = list(logging.getLogger(constants.SOCKET_LOGGER_NAME).handlers)
+        _handle_connection(FakeConnection(Payload(_mutating_fn).serialize()), True)
+        self.assertEqual(handlers_before, logging.getLogger(constants.SOCKET_LOGGER_NAME).handlers)
+
+    @patch('dusty.daemon._run_pre_command_functions')
+    def test_handle_connection_error_terminator(self, fake_pre_command):
+        payload = Payload(_mutating_fn)
+        payload.client_version = 'not-a-version'
+        connection = FakeConnection(payload.serialize())
+        _handle_connection(connection, True)
+        frame_type, body = connection.frames[-2]
+        self.assertEqual(frame_type, FRAME_ERROR)
+        self.assertIn('ERROR: Dusty daemon is running version', body)
+        self.assertEqual(connection.frames[-1], (FRAME_EXIT, '1'))
+
+    @patch('dusty.daemon._run_pre_command_functions')
+    def test_read_only_command_runs_while_mutating_command_holds_lock(self, fake_pre_command):
+        mutating_command_lock.acquire()
+        connection = FakeConnection(Payload(_read_only_fn).serialize())
+        thread = threading.Thread(target=_handle_connection, args=(connection, True))
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertIn('read only ran\n', connection.output)
+
+    @patch('dusty.daemon._run_pre_command_functions')
+    def test_mutating_command_waits_for_lock(self, fake_pre_command):
+        mutating_command_lock.acquire()
+        connection = FakeConnection(Payload(_mutating_fn).serialize())
+        thread = threading.Thread(target=_handle_connection, args=(connection, True))
+        thread.start()
+        thread.join(.2)
+        self.assertTrue(thread.is_alive())
+        self.assertNotIn('mutating ran\n', connection.output)
+        mutating_command_lock.release()
+        thread.join(5)
+        self.assertIn('Waiting for a previous command to finish', connection.output)
+        self.assertIn('mutating ran\n', connection.output)
+
+    def test_run_command_releases_lock_on_error(self):
+        fn = Mock(side_effect=ValueError())
+        with self.assertRaises(ValueError):
+            _run_command(function_key(_mutating_fn), fn, (), {})
+        self.assertFalse(mutating_command_lock.locked())
+
+class TestRequestContext(DustyTestCase):
+    def test_log_to_client_only_reaches_own_connection(self):
+        first, second = FakeConnection(None), FakeConnection(None)
+        with bound_context(RequestContext(first)):
+            make_socket_logger(first)
+            with bound_context(RequestContext(second)):
+                make_socket_logger(second)
+                log_to_client('to second')
+                close_socket_logger()
+            log_to_client('to first')
+            close_socket_logger()
+        self.assertEqual(first.output, 'to first\n')
+        self.assertEqual(second.output, 'to second\n')
+
+    def test_memoize_cache_is_per_request(self):
+        calls = []
+        @memoized
+        def memoized_fn():
+            calls.append(1)
+            return len(calls)
+        with bound_context(RequestContext()):
+            self.assertEqual(memoized_fn(), 1)
+            self.assertEqual(memoized_fn(), 1)
+        with bound_context(RequestContext()):
+            self.assertEqual(memoized_fn(), 2)
+
+    def test_bound_context_restores_previous(self):
+        context = RequestContext()
+        with bound_context(context):
+            self.assertIs(current_context(), context)
+        self.assertIsNone(current_context())
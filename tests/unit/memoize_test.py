@@ -1,6 +1,7 @@
 from mock import patch, Mock
 
-from dusty.memoize import memoized, reset_memoize_cache
+from dusty.memoize import (memoized, reset_memoize_cache, invalidate_scope, memoize_stats, set_scope_key,
+                           SCOPE_DAEMON, SCOPE_VM)
 from ..testcases import DustyTestCase
 
 class TestMemoize(DustyTestCase):
@@ -29,7 +30,117 @@ class TestMemoize(DustyTestCase):
         self.memoized_fn()
         self.assertEqual(self.counter, 2)
 
+    def test_invalidate_function(self):
+        self.memoized_fn(kw1=1)
+        self.memoized_fn(kw1=2)
+        self.memoized_fn.invalidate()
+        self.memoized_fn(kw1=1)
+        self.assertEqual(self.counter, 3)
+
     def test_kwargs_order(self):
         self.memoized_fn(kw1=1, kw2=2)
         self.memoized_fn(kw2=2, kw1=1)
         self.assertEqual(self.counter, 1)
+
+    def test_scoped_value_survives_request_reset(self):
+        calls = []
+        @memoized(scope=SCOPE_VM)
+        def vm_fn():
+            calls.append(1)
+            return len(calls)
+        vm_fn()
+        reset_memoize_cache()
+        self.assertEqual(vm_fn(), 1)
+
+    def test_invalidate_scope(self):
+        calls = []
+        @memoized(scope=SCOPE_VM)
+        def vm_fn():
+            calls.append(1)
+            return len(calls)
+        @memoized(scope=SCOPE_DAEMON)
+        def daemon_fn():
+            calls.append(1)
+            return 'daemon'
+        vm_fn()
+        daemon_fn()
+        invalidate_scope(SCOPE_VM)
+        self.assertEqual(vm_fn(), 3)
+        daemon_fn()
+        self.assertEqual(len(calls), 3)
+
+    def test_scope_key_change_invalidates_scope(self):
+        calls, keys, changes = [], ['boot-1'], []
+        @memoized(scope=SCOPE_VM)
+        def vm_fn():
+            calls.append(1)
+            return len(calls)
+        set_scope_key(SCOPE_VM, lambda: keys[0], on_change=lambda: changes.append(1))
+        try:
+            vm_fn()
+            reset_memoize_cache()
+            self.assertEqual(vm_fn(), 1)
+            keys[0] = 'boot-2'
+            self.assertEqual(vm_fn(), 1)
+            reset_memoize_cache()
+            self.assertEqual(vm_fn(), 2)
+            self.assertEqual(changes, [1])
+        finally:
+            set_scope_key(SCOPE_VM, None)
+
+    def test_scope_key_checked_once_per_request(self):
+        key_calls = []
+        @memoized(scope=SCOPE_VM)
+        def vm_fn(arg):
+            return arg
+        set_scope_key(SCOPE_VM, lambda: key_calls.append(1))
+        try:
+            vm_fn(1)
+            vm_fn(2)
+            self.assertEqual(len(key_calls), 1)
+            reset_memoize_cache()
+            vm_fn(1)
+            self.assertEqual(len(key_calls), 2)
+        finally:
+            set_scope_key(SCOPE_VM, None)
+
+    def test_max_size_evicts_least_recently_used(self):
+        calls = []
+        @memoized(max_size=2)
+        def bounded_fn(arg):
+            calls.append(arg)
+            return arg
+        bounded_fn(1)
+        bounded_fn(2)
+        bounded_fn(1)
+        bounded_fn(3)
+        bounded_fn(1)
+        self.assertEqual(calls, [1, 2, 3])
+        bounded_fn(2)
+        self.assertEqual(calls, [1, 2, 3, 2])
+
+    def test_stats(self):
+        self.memoized_fn()
+        self.memoized_fn()
+        self.memoized_fn(kw1=1)
+        stats = memoize_stats().values()
+        self.assertIn({'scope': 'request', 'hits': 1, 'misses': 2}, stats)
+
+    def test_unknown_scope(self):
+        with self.assertRaises(ValueError):
+            memoized(scope='forever')
+
+    @patch('dusty.systems.virtualbox.check_and_log_output_and_error_demoted')
+    @patch('dusty.systems.virtualbox._apply_nat_net_less_greedy_subnet')
+    @patch('dusty.systems.virtualbox._apply_nat_dns_host_resolver')
+    @patch('dusty.systems.virtualbox.docker_vm_is_running')
+    @patch('dusty.systems.virtualbox.check_output_demoted')
+    def test_starting_vm_invalidates_vm_scope(self, fake_check_output, fake_is_running, *others):
+        from dusty.systems.virtualbox import get_docker_vm_ip, _start_docker_vm
+        fake_check_output.return_value = '192.168.99.100\n'
+        get_docker_vm_ip()
+        fake_check_output.return_value = '192.168.99.101\n'
+        self.assertEqual(get_docker_vm_ip(), '192.168.99.100')
+        fake_is_running.return_value = False
+        _start_docker_vm()
+        self.assertEqual(get_docker_vm_ip(), '192.168.99.101')
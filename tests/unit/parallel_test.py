@@ -1,7 +1,11 @@
+import threading
+import time
+
 from mock import Mock, call
 
 from ..testcases import DustyTestCase
-from dusty.parallel import TaskQueue, parallel_task_queue
+from dusty.context import RequestContext, bound_context, current_context
+from dusty.parallel import TaskQueue, TaskGraph, parallel_task_queue
 
 global_mock = Mock()
 
@@ -11,6 +15,9 @@ def _fake_task(*args, **kwargs):
 def _fake_exception(*args, **kwargs):
     raise ValueError()
 
+def _record_context():
+    global_mock(current_context())
+
 class TestParallel(DustyTestCase):
     def setUp(self):
         super(TestParallel, self).setUp()
@@ -62,3 +69,68 @@ class TestParallel(DustyTestCase):
             with parallel_task_queue() as queue:
                 queue.enqueue_task(_fake_task, 1, a=2)
                 queue.enqueue_task(_fake_exception)
+
+    def test_execute_binds_request_context(self):
+        context = RequestContext()
+        with bound_context(context):
+            self.queue.enqueue_task(_record_context)
+            self.queue.execute()
+        global_mock.assert_called_with(context)
+
+class TestTaskGraph(DustyTestCase):
+    def setUp(self):
+        super(TestTaskGraph, self).setUp()
+        self.graph = TaskGraph(4)
+        self.order = []
+
+    def _task(self, name, value=None, duration=0):
+        def task():
+            time.sleep(duration)
+            self.order.append(name)
+            return value
+        return task
+
+    def test_dependencies_run_first_and_pass_results(self):
+        self.graph.add_task('a', self._task('a', 1))
+        self.graph.add_task('b', lambda: self.graph.result('a') + 1, depends=['a'])
+        self.graph.add_task('c', self._task('c'), depends=['b'])
+        results = self.graph.execute()
+        self.assertEqual(results['b'], 2)
+        self.assertEqual(self.order, ['a', 'c'])
+
+    def test_independent_tasks_overlap(self):
+        other_started = threading.Event()
+        def waits_for_other():
+            if not other_started.wait(5):
+                raise RuntimeError('Independent tasks did not run at the same time')
+        self.graph.add_task('waits_for_other', waits_for_other)
+        self.graph.add_task('other', other_started.set)
+        self.graph.execute()
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            self.graph.add_task('a', self._task('a'), depends=['b'])
+
+    def test_failure_skips_dependents_and_reraises(self):
+        self.graph.add_task('a', _fake_exception)
+        self.graph.add_task('b', self._task('b'), depends=['a'])
+        self.graph.add_task('c', self._task('c', duration=.1))
+        with self.assertRaises(ValueError):
+            self.graph.execute()
+        self.assertEqual(self.order, ['c'])
+
+    def test_binds_request_context(self):
+        context = RequestContext()
+        self.graph.add_task('a', _record_context)
+        global_mock.reset_mock()
+        with bound_context(context):
+            self.graph.execute()
+        global_mock.assert_called_with(context)
+
+    def test_critical_path(self):
+        self.graph.add_task('fast', self._task('fast', duration=.01))
+        self.graph.add_task('slow', self._task('slow', duration=.2))
+        self.graph.add_task('last', self._task('last'), depends=['fast', 'slow'])
+        self.graph.execute()
+        self.assertEqual(self.graph.critical_path(), ['slow', 'last'])
+        self.assertIn('slow (0.2s) -> last (0.0s)', self.graph.describe_critical_path())
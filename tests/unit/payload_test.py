@@ -2,7 +2,7 @@ import json
 
 from ..testcases import DustyTestCase
 from dusty.constants import VERSION
-from dusty.payload import Payload, daemon_command, function_key, get_payload_function
+from dusty.payload import Payload, LazyCommand, daemon_command, function_key, get_payload_function
 
 @daemon_command
 def _fn(*args, **kwargs):
@@ -61,3 +61,14 @@ class TestPayload(DustyTestCase):
     def test_get_payload_function_raises(self):
         with self.assertRaises(RuntimeError):
             get_payload_function(function_key(_fn2))
+
+    def test_lazy_command_serializes_like_function(self):
+        lazy_payload = Payload(LazyCommand(function_key(_fn)), 'arg1', arg2='arg2value')
+        self.assertEqual(json.loads(lazy_payload.serialize()), json.loads(self.test_payload.serialize()))
+
+    def test_lazy_command_equals_function(self):
+        self.assertEqual(Payload(LazyCommand(function_key(_fn)), 'arg1', arg2='arg2value'), self.test_payload)
+        self.assertNotEqual(Payload(LazyCommand(function_key(_fn2)), 'arg1', arg2='arg2value'), self.test_payload)
+
+    def test_lazy_command_call_runs_function(self):
+        self.assertEqual(LazyCommand(function_key(_fn))('arg1'), (('arg1',), {}))
@@ -0,0 +1,59 @@
+import struct
+
+from ..testcases import DustyTestCase
+from dusty.protocol import (encode_frame, recv_frame, send_frame, ProtocolError, MAX_FRAME_SIZE,
+                            FRAME_OUTPUT, FRAME_EXIT, FRAME_REQUEST)
+
+class FakeSocket(object):
+    def __init__(self, data='', chunk_size=None):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.sent = ''
+
+    def recv(self, size):
+        if self.chunk_size:
+            size = min(size, self.chunk_size)
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+    def sendall(self, data):
+        self.sent += data
+
+class TestProtocol(DustyTestCase):
+    def test_round_trip(self):
+        sock = FakeSocket()
+        send_frame(sock, FRAME_OUTPUT, 'some output\n')
+        send_frame(sock, FRAME_EXIT, '0')
+        reader = FakeSocket(sock.sent)
+        self.assertEqual(recv_frame(reader), (FRAME_OUTPUT, 'some output\n'))
+        self.assertEqual(recv_frame(reader), (FRAME_EXIT, '0'))
+        self.assertEqual(recv_frame(reader), (None, None))
+
+    def test_body_containing_old_sentinels(self):
+        body = '\0\0\1\1\0\1'
+        reader = FakeSocket(encode_frame(FRAME_OUTPUT, body))
+        self.assertEqual(recv_frame(reader), (FRAME_OUTPUT, body))
+
+    def test_large_frame_in_small_chunks(self):
+        body = 'x' * 300000
+        reader = FakeSocket(encode_frame(FRAME_REQUEST, body), chunk_size=1000)
+        self.assertEqual(recv_frame(reader), (FRAME_REQUEST, body))
+
+    def test_unicode_body_is_utf8_encoded(self):
+        reader = FakeSocket(encode_frame(FRAME_OUTPUT, u'caf\xe9'))
+        self.assertEqual(recv_frame(reader), (FRAME_OUTPUT, 'caf\xc3\xa9'))
+
+    def test_truncated_frame_raises(self):
+        reader = FakeSocket(encode_frame(FRAME_OUTPUT, 'some output')[:-2])
+        with self.assertRaises(ProtocolError):
+            recv_frame(reader)
+
+    def test_unknown_frame_type_raises(self):
+        reader = FakeSocket(encode_frame('?', 'body'))
+        with self.assertRaises(ProtocolError):
+            recv_frame(reader)
+
+    def test_oversized_frame_raises(self):
+        reader = FakeSocket(struct.pack('!Ic', MAX_FRAME_SIZE + 1, FRAME_OUTPUT))
+        with self.assertRaises(ProtocolError):
+            recv_frame(reader)
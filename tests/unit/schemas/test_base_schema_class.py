@@ -1,8 +1,11 @@
 from unittest import TestCase
+import os
 from schemer import Schema, Array, ValidationException
-from dusty.schemas.base_schema_class import DustySchema, DustySpecs
+from dusty.schemas.base_schema_class import (DustySchema, DustySpecs, CopyOnWriteDict, get_specs_from_path,
+                                             get_spec_cache_stats, to_plain)
 
 from ...testcases import DustyTestCase
+from ...fixtures import _write
 
 
 class TestDustySchemaClass(TestCase):
@@ -86,3 +89,94 @@ class TestDustySpecsClass(DustyTestCase):
         self.assertEquals(specs.get_app_or_service('app-a'), specs['apps']['app-a'])
         self.assertEquals(specs.get_app_or_service('service-a'), specs['services']['service-a'])
 
+
+class TestSpecFileCache(DustyTestCase):
+    def _spec_count(self, specs):
+        return sum(len(specs[key]) for key in specs)
+
+    def test_second_parse_hits_cache(self):
+        specs = get_specs_from_path(self.temp_specs_path)
+        count = self._spec_count(specs)
+        self.assertEqual(get_spec_cache_stats()['misses'], count)
+        get_specs_from_path(self.temp_specs_path)
+        self.assertEqual(get_spec_cache_stats()['hits'], count)
+        self.assertEqual(get_spec_cache_stats()['misses'], count)
+
+    def test_changed_file_is_reparsed(self):
+        specs = get_specs_from_path(self.temp_specs_path)
+        count = self._spec_count(specs)
+        _write('bundle', 'bundle-a', {'description': 'Changed description', 'apps': ['app-a']})
+        specs = get_specs_from_path(self.temp_specs_path)
+        self.assertEqual(specs['bundles']['bundle-a']['description'], 'Changed description')
+        self.assertEqual(get_spec_cache_stats()['misses'], count + 1)
+        self.assertEqual(get_spec_cache_stats()['hits'], count - 1)
+
+    def test_removed_file_is_forgotten(self):
+        get_specs_from_path(self.temp_specs_path)
+        entries = get_spec_cache_stats()['entries']
+        os.remove(os.path.join(self.temp_specs_path, 'bundles', 'bundle-a.yml'))
+        specs = get_specs_from_path(self.temp_specs_path)
+        self.assertNotIn('bundle-a', specs['bundles'])
+        self.assertEqual(get_spec_cache_stats()['entries'], entries - 1)
+
+    def test_cached_specs_are_independent_copies(self):
+        first = get_specs_from_path(self.temp_specs_path)
+        first['apps']['app-a']['depends']['libs'].append('mutated')
+        second = get_specs_from_path(self.temp_specs_path)
+        self.assertNotIn('mutated', second['apps']['app-a']['depends']['libs'])
+
+    def test_loaded_specs_share_cached_documents(self):
+        get_specs_from_path(self.temp_specs_path)
+        specs = get_specs_from_path(self.temp_specs_path)
+        specs['apps']['app-a']['depends']['libs'] = set(['changed'])
+        self.assertEqual(get_specs_from_path(self.temp_specs_path)['apps']['app-a']['depends']['libs'], ['lib-a'])
+
+class TestCopyOnWriteDict(TestCase):
+    def setUp(self):
+        self.base = {'scalar': 1, 'nested': {'list': [1, 2], 'dicts': [{'a': 1}]}}
+        self.view = CopyOnWriteDict(self.base)
+
+    def test_reads_through(self):
+        self.assertEqual(self.view['scalar'], 1)
+        self.assertEqual(self.view['nested']['list'], [1, 2])
+        self.assertEqual(self.view, self.base)
+
+    def test_writes_do_not_reach_base(self):
+        self.view['scalar'] = 2
+        self.view['new'] = 3
+        self.view['nested']['list'].append(3)
+        self.view['nested']['dicts'][0]['a'] = 2
+        del self.view['nested']['dicts']
+        self.assertEqual(self.base, {'scalar': 1, 'nested': {'list': [1, 2], 'dicts': [{'a': 1}]}})
+        self.assertEqual(to_plain(self.view), {'scalar': 2, 'new': 3, 'nested': {'list': [1, 2, 3]}})
+
+    def test_items_and_values_with_nested_values(self):
+        view = CopyOnWriteDict({'a': {'x': 1}, 'b': [1], 'c': 3})
+        self.assertItemsEqual(view.items(), [('a', {'x': 1}), ('b', [1]), ('c', 3)])
+        self.assertItemsEqual(view.values(), [{'x': 1}, [1], 3])
+        self.assertEqual(len(view), 3)
+
+    def test_nested_reads_return_the_same_copy(self):
+        self.assertIs(self.view['nested'], self.view['nested'])
+
+    def test_delete(self):
+        del self.view['scalar']
+        self.assertNotIn('scalar', self.view)
+        self.assertEqual(len(self.view), 1)
+        with self.assertRaises(KeyError):
+            self.view['scalar']
+        self.view['scalar'] = 5
+        self.assertEqual(self.view['scalar'], 5)
+
+    def test_to_plain_returns_plain_types(self):
+        plain = to_plain(self.view)
+        self.assertIs(type(plain), dict)
+        self.assertIs(type(plain['nested']), dict)
+        self.assertIs(type(plain['nested']['dicts'][0]), dict)
+
+    def test_schema_overlay_is_independent(self):
+        spec = DustySchema(None, {'depends': {'libs': ['lib-a']}}, 'app-a', 'apps')
+        overlay = spec.overlay()
+        overlay['depends']['libs'] = set(['lib-a', 'lib-b'])
+        self.assertEqual(spec['depends']['libs'], ['lib-a'])
+        self.assertEqual(overlay.name, 'app-a')
@@ -6,8 +6,10 @@ import git
 from mock import Mock, patch
 
 from ..testcases import DustyTestCase
+from dusty import constants
 from dusty.commands.repos import override_repo
-from dusty.source import Repo, git_error_handling
+from dusty.config import save_config_value
+from dusty.source import Repo, RepoIndex, git_error_handling
 from dusty.compiler.spec_assembler import get_all_repos
 
 class TestSource(DustyTestCase):
@@ -40,6 +42,20 @@ class TestSource(DustyTestCase):
         with self.assertRaises(RuntimeError):
             Repo.resolve(get_all_repos(), 'definitely-not-a-repo')
 
+    def test_repo_index_resolve(self):
+        index = RepoIndex([Repo('github.com/app/a'), Repo('github.com/lib/a'), Repo('/gc/b.git')])
+        self.assertEqual(index.resolve('github.com/lib/a'), Repo('github.com/lib/a'))
+        self.assertEqual(index.resolve('b'), Repo('/gc/b.git'))
+        with self.assertRaises(RuntimeError):
+            index.resolve('a')
+
+    def test_repo_index_mounted_by_unknown_repo(self):
+        index = RepoIndex()
+        index.add(Repo('github.com/app/a'), apps=['app-a'])
+        index.add(Repo('github.com/app/a'), libs=['lib-a'])
+        self.assertEqual(index.mounted_by(Repo('github.com/app/a')), {'apps': set(['app-a']), 'libs': set(['lib-a'])})
+        self.assertEqual(index.mounted_by(Repo('github.com/app/b')), {'apps': set(), 'libs': set()})
+
     def test_is_local_repo(self):
         self.assertFalse(Repo('github.com/app/a').is_local_repo)
         self.assertTrue(Repo('/gc/repos/dusty').is_local_repo)
@@ -97,6 +113,12 @@ class TestSource(DustyTestCase):
         self.assertEqual(Repo('github.com/app/a').vm_path, '/dusty_repos/github.com/app/a')
         self.assertEqual(Repo('/tmp/repo-c').vm_path, '/dusty_repos/tmp/repo-c')
 
+    def test_vm_path_of_rsynced_repo(self):
+        save_config_value(constants.CONFIG_REPO_SYNC_METHODS_KEY, {'github.com/app/a': constants.SYNC_METHOD_RSYNC})
+        self.assertEqual(Repo('github.com/app/a').sync_method, constants.SYNC_METHOD_RSYNC)
+        self.assertEqual(Repo('github.com/app/a').vm_path, '/persist/dusty_synced_repos/github.com/app/a')
+        self.assertEqual(Repo('github.com/app/b').sync_method, constants.SYNC_METHOD_NFS)
+
     def test_repo_is_overridden_true(self):
         override_repo('github.com/app/a', self.temp_dir)
         self.assertTrue(Repo('github.com/app/a').is_overridden)
@@ -0,0 +1,95 @@
+from mock import Mock, patch
+
+from dusty import constants
+from dusty.config import save_config_value
+
+from ....testcases import DustyTestCase
+from dusty.systems.docker import ContainerSnapshot
+from dusty.systems.docker.compose import (_compose_restart, update_running_containers_from_spec,
+                                          stop_running_services, rm_containers)
+
+def _container(name, status='Up 2 hours'):
+    return {'Id': '{}-id'.format(name), 'Names': ['/dusty_{}_1'.format(name)], 'Status': status}
+
+@patch('dusty.systems.docker.compose.links_for_app_or_service')
+@patch('dusty.systems.docker.compose.get_assembled_specs')
+@patch('dusty.systems.docker.compose.get_docker_client')
+@patch('dusty.systems.docker.get_container_snapshot')
+class TestComposeRestart(DustyTestCase):
+    def _restarted(self, fake_get_client):
+        return [call[0][0] for call in fake_get_client.return_value.restart.call_args_list]
+
+    def test_restarts_in_link_order(self, fake_snapshot, fake_get_client, fake_specs, fake_links):
+        fake_snapshot.return_value = ContainerSnapshot([_container('app'), _container('api'), _container('db')])
+        links = {'app': ['api'], 'api': ['db'], 'db': []}
+        fake_links.side_effect = lambda service, specs: links[service]
+        _compose_restart(['app', 'api', 'db'])
+        self.assertEqual(self._restarted(fake_get_client), ['db-id', 'api-id', 'app-id'])
+
+    def test_exited_linked_container_restarted_first(self, fake_snapshot, fake_get_client, fake_specs, fake_links):
+        fake_snapshot.return_value = ContainerSnapshot([_container('app'), _container('db', status='Exited (0) 1 minute ago')])
+        links = {'app': ['db'], 'db': []}
+        fake_links.side_effect = lambda service, specs: links[service]
+        _compose_restart(['app', 'db'])
+        self.assertEqual(self._restarted(fake_get_client), ['db-id', 'app-id'])
+
+    def test_skips_container_linking_to_stopped_container(self, fake_snapshot, fake_get_client, fake_specs, fake_links):
+        fake_snapshot.return_value = ContainerSnapshot([_container('app'), _container('api'),
+                                                        _container('db', status='Exited (0) 1 minute ago')])
+        links = {'app': ['db'], 'api': []}
+        fake_links.side_effect = lambda service, specs: links[service]
+        _compose_restart(['app', 'api'])
+        self.assertEqual(self._restarted(fake_get_client), ['api-id'])
+
+    def test_skips_container_linking_to_skipped_container(self, fake_snapshot, fake_get_client, fake_specs, fake_links):
+        fake_snapshot.return_value = ContainerSnapshot([_container('api'), _container('web', status='Exited (0) 1 minute ago'),
+                                                        _container('db', status='Exited (0) 1 minute ago'), _container('cache')])
+        links = {'api': ['web'], 'web': ['db'], 'cache': []}
+        fake_links.side_effect = lambda service, specs: links[service]
+        _compose_restart(['api', 'web', 'cache'])
+        self.assertEqual(self._restarted(fake_get_client), ['cache-id'])
+
+    def test_missing_container(self, fake_snapshot, fake_get_client, fake_specs, fake_links):
+        fake_snapshot.return_value = ContainerSnapshot([_container('api')])
+        fake_links.return_value = []
+        _compose_restart(['app', 'api'])
+        self.assertEqual(self._restarted(fake_get_client), ['api-id'])
+
+@patch('dusty.systems.docker.compose.write_composefile')
+@patch('dusty.systems.docker.compose.compose_up')
+@patch('dusty.systems.docker.compose.engine')
+class TestContainerEngine(DustyTestCase):
+    def test_compose_by_default(self, fake_engine, fake_compose_up, fake_write):
+        update_running_containers_from_spec({'app': {'image': 'app'}})
+        self.assertTrue(fake_compose_up.called)
+        self.assertFalse(fake_engine.up.called)
+
+    def test_api_engine(self, fake_engine, fake_compose_up, fake_write):
+        save_config_value(constants.CONFIG_CONTAINER_ENGINE_KEY, constants.CONTAINER_ENGINE_API)
+        fake_engine.unsupported_keys.return_value = []
+        update_running_containers_from_spec({'app': {'image': 'app'}}, recreate_containers=False)
+        fake_engine.up.assert_called_once_with({'app': {'image': 'app'}}, recreate_containers=False)
+        self.assertFalse(fake_compose_up.called)
+
+    def test_api_engine_falls_back_on_unsupported_keys(self, fake_engine, fake_compose_up, fake_write):
+        save_config_value(constants.CONFIG_CONTAINER_ENGINE_KEY, constants.CONTAINER_ENGINE_API)
+        fake_engine.unsupported_keys.return_value = ['build']
+        update_running_containers_from_spec({'app': {'build': '/app'}})
+        self.assertFalse(fake_engine.up.called)
+        self.assertTrue(fake_compose_up.called)
+
+    def test_unknown_engine(self, fake_engine, fake_compose_up, fake_write):
+        save_config_value(constants.CONFIG_CONTAINER_ENGINE_KEY, 'swarm')
+        with self.assertRaises(RuntimeError):
+            update_running_containers_from_spec({'app': {'image': 'app'}})
+
+    @patch('dusty.systems.docker.compose._compose_stop')
+    @patch('dusty.systems.docker.compose._compose_rm')
+    def test_api_engine_stop_and_rm(self, fake_compose_rm, fake_compose_stop, fake_engine, fake_compose_up, fake_write):
+        save_config_value(constants.CONFIG_CONTAINER_ENGINE_KEY, constants.CONTAINER_ENGINE_API)
+        stop_running_services(['app'])
+        rm_containers(['app'])
+        fake_engine.stop.assert_called_once_with(['app'])
+        fake_engine.rm.assert_called_once_with(['app'])
+        self.assertFalse(fake_compose_stop.called)
+        self.assertFalse(fake_compose_rm.called)
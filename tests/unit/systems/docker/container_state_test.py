@@ -0,0 +1,100 @@
+from mock import Mock, patch
+
+from ....testcases import DustyTestCase
+from dusty.systems.docker import container_state
+from dusty.systems.docker.container_state import ContainerTable, live_containers, record_listing, mark_stale
+
+def _container(container_id, name, status='Up 2 hours'):
+    return {'Id': container_id, 'Names': ['/{}'.format(name)], 'Status': status}
+
+class TestContainerTable(DustyTestCase):
+    def setUp(self):
+        super(TestContainerTable, self).setUp()
+        self.client = Mock()
+        self.table = ContainerTable(self.client)
+        self.table.seed([_container('a', 'dusty_app-a_1'), _container('x', 'some-random-container')])
+
+    def test_seed_keeps_dusty_containers(self):
+        self.assertEqual(self.table.containers(), [_container('a', 'dusty_app-a_1')])
+
+    def test_stale_table_does_not_answer(self):
+        self.table.mark_stale()
+        self.assertIsNone(self.table.containers())
+
+    def test_event_rereads_container(self):
+        self.client.containers.return_value = [_container('a', 'dusty_app-a_1', status='Exited (137) 1 second ago')]
+        self.table.handle_event({'status': 'die', 'id': 'a', 'from': 'app/a'})
+        self.client.containers.assert_called_once_with(all=True, filters={'id': 'a'})
+        self.assertEqual(self.table.containers()[0]['Status'], 'Exited (137) 1 second ago')
+
+    def test_create_event_adds_container(self):
+        self.client.containers.return_value = [_container('b', 'dusty_app-b_1')]
+        self.table.handle_event({'status': 'create', 'id': 'b', 'from': 'app/b'})
+        self.assertItemsEqual([container['Id'] for container in self.table.containers()], ['a', 'b'])
+
+    def test_destroy_event_removes_container(self):
+        self.table.handle_event({'status': 'destroy', 'id': 'a', 'from': 'app/a'})
+        self.assertFalse(self.client.containers.called)
+        self.assertEqual(self.table.containers(), [])
+
+    def test_image_event_ignored(self):
+        self.table.handle_event({'status': 'untag', 'id': 'sha256:abc'})
+        self.assertFalse(self.client.containers.called)
+
+    @patch('dusty.systems.docker.container_state.time.sleep')
+    def test_gives_up_after_repeated_failures(self, fake_sleep):
+        self.client.events.side_effect = Exception('VM is down')
+        self.table._run()
+        self.assertEqual(self.client.events.call_count, container_state.RECONNECT_ATTEMPTS)
+        self.assertFalse(self.table.running)
+        self.assertIsNone(self.table.containers())
+
+    @patch('dusty.systems.docker.container_state.time.sleep')
+    def test_rebuilds_after_stream_ends(self, fake_sleep):
+        self.client.containers.return_value = []
+        self.client.events.side_effect = [iter([]), iter([]), Exception('VM is down'), Exception('VM is down')]
+        self.table._run()
+        self.assertEqual(self.client.containers.call_count, 2)
+        self.assertEqual(self.client.events.call_count, 4)
+
+@patch('dusty.systems.docker.container_state.ContainerTable.start')
+class TestLiveContainers(DustyTestCase):
+    def setUp(self):
+        super(TestLiveContainers, self).setUp()
+        container_state._enabled = True
+        container_state._table = None
+        self.client = Mock()
+
+    def tearDown(self):
+        super(TestLiveContainers, self).tearDown()
+        container_state._enabled = False
+        container_state._table = None
+
+    def test_disabled(self, fake_start):
+        container_state._enabled = False
+        self.assertIsNone(live_containers(self.client))
+        self.assertFalse(fake_start.called)
+
+    def test_first_lookup_starts_table(self, fake_start):
+        self.assertIsNone(live_containers(self.client))
+        self.assertEqual(fake_start.call_count, 1)
+
+    def test_answers_once_seeded(self, fake_start):
+        live_containers(self.client)
+        record_listing(self.client, [_container('a', 'dusty_app-a_1')])
+        self.assertEqual(live_containers(self.client), [_container('a', 'dusty_app-a_1')])
+        self.assertEqual(fake_start.call_count, 1)
+
+    def test_mark_stale(self, fake_start):
+        live_containers(self.client)
+        record_listing(self.client, [_container('a', 'dusty_app-a_1')])
+        mark_stale()
+        self.assertIsNone(live_containers(self.client))
+
+    def test_new_client_rebuilds_table(self, fake_start):
+        live_containers(self.client)
+        record_listing(self.client, [_container('a', 'dusty_app-a_1')])
+        old_table = container_state._table
+        self.assertIsNone(live_containers(Mock()))
+        self.assertFalse(old_table.running)
+        self.assertEqual(fake_start.call_count, 2)
@@ -0,0 +1,155 @@
+from mock import Mock, patch
+
+from ....testcases import DustyTestCase
+from dusty.systems.docker import ContainerSnapshot
+from dusty.systems.docker.engine import (link_levels, unsupported_keys, create_container_kwargs, config_hash,
+                                         up, stop, rm, CONFIG_HASH_LABEL, COMPOSE_PROJECT_LABEL)
+
+def _container(name, status='Up 2 hours', labels=None):
+    return {'Id': '{}-id'.format(name), 'Names': ['/dusty_{}_1'.format(name)], 'Status': status,
+            'Labels': labels if labels is not None else {COMPOSE_PROJECT_LABEL: 'dusty'}}
+
+class TestLinkLevels(DustyTestCase):
+    def test_no_links(self):
+        self.assertEqual(link_levels(['b', 'a'], {}), [['a', 'b']])
+
+    def test_chain(self):
+        self.assertEqual(link_levels(['app', 'db', 'api'], {'app': ['api'], 'api': ['db']}),
+                         [['db'], ['api'], ['app']])
+
+    def test_links_outside_services_ignored(self):
+        self.assertEqual(link_levels(['app', 'api'], {'app': ['api', 'db'], 'api': ['db']}),
+                         [['api'], ['app']])
+
+    def test_cycle(self):
+        self.assertEqual(link_levels(['a', 'b', 'c'], {'a': ['b'], 'b': ['a'], 'c': ['a']}),
+                         [['a', 'b', 'c']])
+
+    def test_cycle_after_independent(self):
+        self.assertEqual(link_levels(['a', 'b', 'db'], {'a': ['b', 'db'], 'b': ['a']}),
+                         [['db'], ['a', 'b']])
+
+class TestCreateContainerKwargs(DustyTestCase):
+    def test_unsupported_keys(self):
+        self.assertEqual(unsupported_keys({'app': {'image': 'app', 'build': '/app'}, 'db': {'image': 'db', 'volumes_from': ['app']}}),
+                         ['build', 'volumes_from'])
+
+    def test_config_hash_includes_image(self):
+        self.assertNotEqual(config_hash({'image': 'app'}, 'image-1'), config_hash({'image': 'app'}, 'image-2'))
+        self.assertEqual(config_hash({'image': 'app', 'user': 'root'}, 'image-1'),
+                         config_hash({'user': 'root', 'image': 'app'}, 'image-1'))
+
+    def test_kwargs(self):
+        kwargs = create_container_kwargs('app', {'image': 'app/image',
+                                                 'command': 'sh /command.sh',
+                                                 'user': 'root',
+                                                 'environment': {'A': 'b'},
+                                                 'links': ['db', 'cache:redis'],
+                                                 'volumes': ['/persist/cp/app:/cp', '/data', '/etc/conf:/conf:ro'],
+                                                 'ports': ['8000:80', '53/udp', '127.0.0.1:9000:90'],
+                                                 'restart': 'on-failure:3',
+                                                 'labels': ['team=web']}, 'abc123')
+        self.assertEqual(kwargs['image'], 'app/image')
+        self.assertEqual(kwargs['name'], 'dusty_app_1')
+        self.assertEqual(kwargs['command'], 'sh /command.sh')
+        self.assertEqual(kwargs['user'], 'root')
+        self.assertEqual(kwargs['environment'], {'A': 'b'})
+        self.assertEqual(kwargs['volumes'], ['/cp', '/data', '/conf'])
+        self.assertItemsEqual(kwargs['ports'], [80, (53, 'udp'), 90])
+        self.assertEqual(kwargs['labels']['team'], 'web')
+        self.assertEqual(kwargs['labels'][CONFIG_HASH_LABEL], 'abc123')
+        self.assertEqual(kwargs['labels']['com.docker.compose.service'], 'app')
+        host_config = kwargs['host_config']
+        self.assertItemsEqual(host_config['Binds'], ['/persist/cp/app:/cp:rw', '/etc/conf:/conf:ro'])
+        self.assertEqual(host_config['PortBindings']['80/tcp'], [{'HostIp': '', 'HostPort': '8000'}])
+        self.assertEqual(host_config['PortBindings']['90/tcp'], [{'HostIp': '127.0.0.1', 'HostPort': '9000'}])
+        self.assertIn('dusty_db_1:db', host_config['Links'])
+        self.assertIn('dusty_cache_1:redis', host_config['Links'])
+        self.assertIn('dusty_cache_1:cache_1', host_config['Links'])
+        self.assertEqual(host_config['RestartPolicy'], {'Name': 'on-failure', 'MaximumRetryCount': 3})
+
+    def test_kwargs_port_bound_twice(self):
+        kwargs = create_container_kwargs('app', {'image': 'app', 'ports': ['8000:80', '8001:80']}, 'abc123')
+        self.assertEqual(kwargs['host_config']['PortBindings']['80/tcp'], [{'HostIp': '', 'HostPort': '8000'},
+                                                                          {'HostIp': '', 'HostPort': '8001'}])
+
+    def test_kwargs_memory_limits_in_host_config(self):
+        kwargs = create_container_kwargs('app', {'image': 'app', 'mem_limit': '512m', 'memswap_limit': '1g'}, 'abc123')
+        self.assertNotIn('mem_limit', kwargs)
+        self.assertEqual(kwargs['host_config']['Memory'], 512 * 1024 * 1024)
+        self.assertEqual(kwargs['host_config']['MemorySwap'], 1024 * 1024 * 1024)
+
+@patch('dusty.systems.docker.pull.pull_images')
+@patch('dusty.systems.docker.engine.get_docker_client')
+@patch('dusty.systems.docker.get_container_snapshot')
+class TestEngine(DustyTestCase):
+    def _client(self, fake_get_client):
+        client = fake_get_client.return_value
+        client.inspect_image.return_value = {'Id': 'image-id'}
+        client.create_container.side_effect = lambda **kwargs: {'Id': '{}-new'.format(kwargs['name'])}
+        return client
+
+    def _hash(self, config):
+        return config_hash(config, 'image-id')
+
+    def test_up_creates_in_link_order(self, fake_snapshot, fake_get_client, fake_pull):
+        fake_snapshot.return_value = ContainerSnapshot([])
+        client = self._client(fake_get_client)
+        up({'app': {'image': 'app', 'links': ['db']}, 'db': {'image': 'db'}})
+        self.assertEqual([call[1]['name'] for call in client.create_container.call_args_list], ['dusty_db_1', 'dusty_app_1'])
+        self.assertEqual([call[0][0] for call in client.start.call_args_list], ['dusty_db_1-new', 'dusty_app_1-new'])
+        self.assertEqual(fake_pull.call_count, 1)
+        self.assertItemsEqual(fake_pull.call_args[0][0], ['app', 'db'])
+
+    def test_up_leaves_unchanged_container(self, fake_snapshot, fake_get_client, fake_pull):
+        config = {'image': 'app'}
+        fake_snapshot.return_value = ContainerSnapshot([_container('app', labels={CONFIG_HASH_LABEL: self._hash(config)})])
+        client = self._client(fake_get_client)
+        up({'app': config})
+        self.assertFalse(client.create_container.called)
+        self.assertFalse(client.start.called)
+        self.assertFalse(client.remove_container.called)
+
+    def test_up_starts_unchanged_stopped_container(self, fake_snapshot, fake_get_client, fake_pull):
+        config = {'image': 'app'}
+        fake_snapshot.return_value = ContainerSnapshot([_container('app', status='Exited (0) 1 minute ago',
+                                                                   labels={CONFIG_HASH_LABEL: self._hash(config)})])
+        client = self._client(fake_get_client)
+        up({'app': config})
+        self.assertFalse(client.create_container.called)
+        client.start.assert_called_once_with('app-id')
+
+    def test_up_recreates_changed_container(self, fake_snapshot, fake_get_client, fake_pull):
+        fake_snapshot.return_value = ContainerSnapshot([_container('app', labels={CONFIG_HASH_LABEL: 'old'})])
+        client = self._client(fake_get_client)
+        up({'app': {'image': 'app'}})
+        client.remove_container.assert_called_once_with('app-id', v=True, force=True)
+        client.start.assert_called_once_with('dusty_app_1-new')
+
+    def test_up_no_recreate(self, fake_snapshot, fake_get_client, fake_pull):
+        fake_snapshot.return_value = ContainerSnapshot([_container('app', labels={CONFIG_HASH_LABEL: 'old'})])
+        client = self._client(fake_get_client)
+        up({'app': {'image': 'app'}}, recreate_containers=False)
+        self.assertFalse(client.remove_container.called)
+        self.assertFalse(client.create_container.called)
+
+    def test_stop_all(self, fake_snapshot, fake_get_client, fake_pull):
+        fake_snapshot.return_value = ContainerSnapshot([_container('app'), _container('db', status='Exited (0) 1 minute ago'),
+                                                        _container('test', labels={})])
+        client = self._client(fake_get_client)
+        stop()
+        client.stop.assert_called_once_with('app-id', timeout=1)
+
+    def test_rm_only_removes_stopped(self, fake_snapshot, fake_get_client, fake_pull):
+        fake_snapshot.return_value = ContainerSnapshot([_container('app'), _container('db', status='Exited (0) 1 minute ago')])
+        client = self._client(fake_get_client)
+        rm(['app', 'db'])
+        client.remove_container.assert_called_once_with('db-id', v=True)
+
+    def test_stop_logs_canonical_name(self, fake_snapshot, fake_get_client, fake_pull):
+        container = _container('db')
+        container['Names'] = ['/dusty_app_1/db', '/dusty_db_1']
+        fake_snapshot.return_value = ContainerSnapshot([container])
+        self._client(fake_get_client)
+        stop(['db'])
+        self.assertEqual(self.last_client_output, 'Stopped dusty_db_1')
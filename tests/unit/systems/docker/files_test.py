@@ -0,0 +1,115 @@
+import os
+import pipes
+import shutil
+import subprocess
+import tempfile
+
+from mock import patch
+
+from ....testcases import DustyTestCase
+from dusty.systems.docker.files import _replace_from_staging_script, copy_path_between_containers
+
+class TestDockerFiles(DustyTestCase):
+    def setUp(self):
+        super(TestDockerFiles, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.staging_dir = os.path.join(self.temp_dir, '.dusty-cp-1')
+        os.mkdir(self.staging_dir)
+
+    def tearDown(self):
+        super(TestDockerFiles, self).tearDown()
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, path, contents):
+        with open(path, 'w') as f:
+            f.write(contents)
+
+    def _replace(self, name, dest_path):
+        return subprocess.call(['sh', '-c', _replace_from_staging_script(self.staging_dir, name, dest_path)])
+
+    def test_replace_dir(self):
+        os.mkdir(os.path.join(self.staging_dir, 'src'))
+        self._write(os.path.join(self.staging_dir, 'src', 'new'), 'new')
+        dest = os.path.join(self.temp_dir, 'dest')
+        os.mkdir(dest)
+        self._write(os.path.join(dest, 'old'), 'old')
+        self.assertEqual(self._replace('src', dest), 0)
+        self.assertEqual(os.listdir(dest), ['new'])
+        self.assertFalse(os.path.exists(self.staging_dir))
+
+    def test_replace_file_into_existing_dir(self):
+        self._write(os.path.join(self.staging_dir, 'file.txt'), 'new')
+        dest = os.path.join(self.temp_dir, 'dest')
+        os.mkdir(dest)
+        self.assertEqual(self._replace('file.txt', dest), 0)
+        self.assertTrue(os.path.isfile(os.path.join(dest, 'file.txt')))
+
+    def test_replace_file_with_new_name(self):
+        self._write(os.path.join(self.staging_dir, 'file.txt'), 'new')
+        dest = os.path.join(self.temp_dir, 'renamed.txt')
+        self.assertEqual(self._replace('file.txt', dest), 0)
+        with open(dest) as f:
+            self.assertEqual(f.read(), 'new')
+
+    def test_replace_missing_fails_and_cleans_up(self):
+        self.assertNotEqual(self._replace('missing', os.path.join(self.temp_dir, 'dest')), 0)
+        self.assertFalse(os.path.exists(self.staging_dir))
+
+    @patch('dusty.systems.docker.files.uuid.uuid1', return_value='1')
+    @patch('dusty.systems.docker.files.vm_ssh_command', side_effect=lambda command: ['ssh', command])
+    @patch('dusty.systems.docker.files.check_and_log_output_and_error_demoted')
+    @patch('dusty.systems.docker.files.get_container_for_app_or_service')
+    def test_copy_path_between_containers_in_one_vm_command(self, fake_get_container, fake_check, *args):
+        fake_get_container.side_effect = lambda name, **kwargs: {'Id': '{}-id'.format(name)}
+        copy_path_between_containers('website', '/tmp/a', 'api', '/tmp/b')
+        self.assertEqual(fake_check.call_count, 1)
+        command = fake_check.call_args[0][0][1]
+        self.assertIn('docker exec api-id mkdir -p /tmp/.dusty-cp-1 && ', command)
+        self.assertIn('docker cp website-id:/tmp/a -; echo $? >&3; } | docker cp - api-id:/tmp/.dusty-cp-1 >&2', command)
+        self.assertIn('docker exec api-id sh -c ', command)
+
+    def _run_copy_command(self, source_exit_code):
+        """Runs the command copy_path_between_containers sends to the VM
+        against a fake docker which records its arguments"""
+        bin_dir = os.path.join(self.temp_dir, 'bin')
+        os.mkdir(bin_dir)
+        calls_path = os.path.join(self.temp_dir, 'calls')
+        fake_docker = os.path.join(bin_dir, 'docker')
+        with open(fake_docker, 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'echo "$@" >> {}\n'
+                    'if [ "$1" = cp ] && [ "$3" = - ]; then echo partial; exit {}; fi\n'
+                    'if [ "$1" = cp ]; then cat > /dev/null; fi\n'.format(calls_path, source_exit_code))
+        os.chmod(fake_docker, 0755)
+        with patch('dusty.systems.docker.files.uuid.uuid1', return_value='1'), \
+             patch('dusty.systems.docker.files.vm_ssh_command', side_effect=lambda command: command), \
+             patch('dusty.systems.docker.files.check_and_log_output_and_error_demoted') as fake_check, \
+             patch('dusty.systems.docker.files.get_container_for_app_or_service') as fake_get_container:
+            fake_get_container.side_effect = lambda name, **kwargs: {'Id': '{}-id'.format(name)}
+            copy_path_between_containers('website', '/tmp/a', 'api', '/tmp/b')
+        env = dict(os.environ, PATH='{}:{}'.format(bin_dir, os.environ['PATH']))
+        exit_code = subprocess.call(['sh', '-c', fake_check.call_args[0][0]], env=env)
+        with open(calls_path) as f:
+            return exit_code, f.read().splitlines()
+
+    def test_copy_path_between_containers_replaces_destination(self):
+        exit_code, calls = self._run_copy_command(0)
+        self.assertEqual(exit_code, 0)
+        self.assertTrue(calls[-1].startswith('exec api-id sh -c '))
+
+    def test_copy_path_between_containers_source_failure(self):
+        exit_code, calls = self._run_copy_command(1)
+        self.assertNotEqual(exit_code, 0)
+        self.assertFalse(any(call.startswith('exec api-id sh -c ') for call in calls))
+        self.assertEqual(calls[-1], 'exec api-id rm -rf /tmp/.dusty-cp-1')
+
+    @patch('dusty.systems.docker.files.uuid.uuid1', return_value='1')
+    @patch('dusty.systems.docker.files.vm_ssh_command', side_effect=lambda command: ['ssh', command])
+    @patch('dusty.systems.docker.files.check_and_log_output_and_error_demoted')
+    @patch('dusty.systems.docker.files.get_container_for_app_or_service')
+    def test_copy_path_between_containers_trailing_slash(self, fake_get_container, fake_check, *args):
+        fake_get_container.side_effect = lambda name, **kwargs: {'Id': '{}-id'.format(name)}
+        copy_path_between_containers('website', '/app/data/', 'api', '/tmp/b')
+        command = fake_check.call_args[0][0][1]
+        self.assertIn('docker cp website-id:/app/data -; ', command)
+        self.assertIn(pipes.quote(_replace_from_staging_script('/tmp/.dusty-cp-1', 'data', '/tmp/b')), command)
@@ -7,7 +7,8 @@ import yaml
 
 from dusty import constants
 from dusty.systems.docker import (get_docker_env, get_dusty_containers, get_dusty_images, get_container_for_app_or_service,
-                                  get_canonical_container_name, exec_in_container)
+                                  get_canonical_container_name, exec_in_container, get_container_snapshot,
+                                  ensure_image_pulled)
 
 from dusty.systems.docker.compose import write_composefile
 from dusty.systems.docker.cleanup import get_exited_dusty_containers
@@ -25,9 +26,9 @@ class TestComposeSystem(DustyTestCase):
         constants.COMPOSEFILE_PATH = self.temp_compose_path
         self.test_spec = {'app-a': {'image': 'app/a'}}
 
-        self.containers_return = [{'Names': ['/dusty_app-a_1'], 'Status': 'Exited'},
-                                  {'Names': ['/dusty_app-b_1', '/dusty_app-a_1/dusty_app-b_1'], 'Status': 'Running'},
-                                  {'Names': ['/some-random-image']}]
+        self.containers_return = [{'Names': ['/dusty_app-a_1'], 'Status': 'Exited (0) 3 minutes ago'},
+                                  {'Names': ['/dusty_app-b_1', '/dusty_app-a_1/dusty_app-b_1'], 'Status': 'Up 2 hours'},
+                                  {'Names': ['/some-random-image'], 'Status': 'Up 2 hours'}]
         self.fake_docker_client = Mock()
         self.fake_docker_client.containers.return_value = self.containers_return
 
@@ -74,12 +75,37 @@ class TestComposeSystem(DustyTestCase):
     @patch('dusty.systems.docker.get_docker_client')
     def test_get_dusty_containers_falsy(self, patch_docker_client):
         patch_docker_client.return_value = self.fake_docker_client
-        self.assertEqual(get_dusty_containers([]), self.containers_return[:-1])
+        self.assertEqual(get_dusty_containers([], include_exited=True), self.containers_return[:-1])
+
+    @patch('dusty.systems.docker.get_docker_client')
+    def test_get_dusty_containers_running_only(self, patch_docker_client):
+        patch_docker_client.return_value = self.fake_docker_client
+        self.assertEqual(get_dusty_containers([]), [self.containers_return[1]])
 
     @patch('dusty.systems.docker.get_docker_client')
     def test_get_dusty_containers_short_name(self, patch_docker_client):
         patch_docker_client.return_value = self.fake_docker_client
-        self.assertEqual(get_dusty_containers(['app-a']), [self.containers_return[0]])
+        self.assertEqual(get_dusty_containers(['app-a'], include_exited=True), [self.containers_return[0]])
+
+    @patch('dusty.systems.docker.get_docker_client')
+    def test_get_dusty_containers_exited_excluded(self, patch_docker_client):
+        patch_docker_client.return_value = self.fake_docker_client
+        self.assertEqual(get_dusty_containers(['app-a']), [])
+
+    @patch('dusty.systems.docker.get_docker_client')
+    def test_containers_listed_once(self, patch_docker_client):
+        patch_docker_client.return_value = self.fake_docker_client
+        get_dusty_containers(['app-a', 'app-b'])
+        get_container_for_app_or_service('app-b')
+        self.assertEqual(self.fake_docker_client.containers.call_count, 1)
+
+    @patch('dusty.systems.docker.get_docker_client')
+    def test_container_snapshot_invalidated(self, patch_docker_client):
+        patch_docker_client.return_value = self.fake_docker_client
+        get_dusty_containers(['app-a'])
+        get_container_snapshot.invalidate()
+        get_dusty_containers(['app-a'])
+        self.assertEqual(self.fake_docker_client.containers.call_count, 2)
 
     @patch('dusty.systems.docker.get_docker_client')
     def test_get_dusty_containers_long_name(self, patch_docker_client):
@@ -100,8 +126,8 @@ class TestComposeSystem(DustyTestCase):
     @patch('dusty.systems.docker.get_docker_client')
     def test_get_container_for_app_or_service(self, patch_docker_client):
         patch_docker_client.return_value = self.fake_docker_client
-        result = get_container_for_app_or_service('app-a')
-        self.assertIn('/dusty_app-a_1', result['Names'])
+        result = get_container_for_app_or_service('app-b')
+        self.assertIn('/dusty_app-b_1', result['Names'])
 
     @patch('dusty.systems.docker.get_docker_client')
     def test_get_container_for_app_or_service_none_found(self, patch_docker_client):
@@ -130,3 +156,14 @@ class TestComposeSystem(DustyTestCase):
         fake_container = {'Id': 'container-id'}
         exec_in_container(fake_container, 'ls')
         self.fake_docker_client.exec_create.assert_called_once_with('container-id', 'ls')
+
+    @patch('dusty.systems.docker.pull.pull_image')
+    @patch('dusty.systems.docker.pull.get_docker_client')
+    def test_ensure_image_pulled_by_digest(self, patch_docker_client, fake_pull_image):
+        patch_docker_client.return_value = self.fake_docker_client
+        self.fake_docker_client.images.return_value = [{'RepoTags': ['ubuntu:latest'], 'RepoDigests': ['app@sha256:abc']}]
+        ensure_image_pulled('app@sha256:abc')
+        ensure_image_pulled('docker.io/library/ubuntu')
+        self.assertFalse(fake_pull_image.called)
+        ensure_image_pulled('registry:5000/app@sha256:def')
+        fake_pull_image.assert_called_once_with(self.fake_docker_client, 'registry:5000/app@sha256:def')
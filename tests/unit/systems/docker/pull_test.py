@@ -0,0 +1,90 @@
+import json
+
+from mock import Mock, patch
+
+from ....testcases import DustyTestCase
+from dusty.systems.docker.pull import (full_image_name, missing_images, PullProgress, pull_image,
+                                      pull_images, split_image_name)
+
+def _stream(*messages):
+    return [json.dumps(message) + '\r\n' for message in messages]
+
+class TestPull(DustyTestCase):
+    def setUp(self):
+        super(TestPull, self).setUp()
+        self.client = Mock()
+        self.client.images.return_value = [{'RepoTags': ['app/a:latest', 'app/a:1.0']}, {'RepoTags': None},
+                                           {'RepoTags': ['ubuntu:14.04'], 'RepoDigests': ['app/d@sha256:abc']}]
+
+    def test_full_image_name(self):
+        self.assertEqual(full_image_name('app/a'), 'app/a:latest')
+        self.assertEqual(full_image_name('app/a:1.0'), 'app/a:1.0')
+        self.assertEqual(full_image_name('registry:5000/app/a'), 'registry:5000/app/a:latest')
+        self.assertEqual(full_image_name('app/a@sha256:abc'), 'app/a@sha256:abc')
+
+    def test_split_image_name(self):
+        self.assertEqual(split_image_name('app/a'), ('app/a', 'latest'))
+        self.assertEqual(split_image_name('registry:5000/app/a:1.0'), ('registry:5000/app/a', '1.0'))
+        self.assertEqual(split_image_name('app/a@sha256:abc'), ('app/a', 'sha256:abc'))
+
+    def test_missing_images(self):
+        self.assertEqual(missing_images(self.client, ['app/a', 'app/a:1.0', 'app/b', 'app/b:latest', 'app/c:2']),
+                         ['app/b:latest', 'app/c:2'])
+        self.assertEqual(self.client.images.call_count, 1)
+
+    def test_missing_images_normalizes_docker_hub_names(self):
+        self.assertEqual(missing_images(self.client, ['ubuntu:14.04', 'docker.io/ubuntu:14.04',
+                                                      'library/ubuntu:14.04', 'docker.io/library/ubuntu:14.04',
+                                                      'docker.io/app/a', 'docker.io/ubuntu:15.04', 'ubuntu:15.04']),
+                         ['docker.io/ubuntu:15.04'])
+
+    def test_missing_images_with_digests(self):
+        self.assertEqual(missing_images(self.client, ['app/d@sha256:abc', 'app/d@sha256:def']),
+                         ['app/d@sha256:def'])
+
+    def test_progress(self):
+        progress = PullProgress('app/b:latest')
+        for message in [{'status': 'Pulling from app/b', 'id': 'latest'},
+                        {'status': 'Already exists', 'id': 'layer1'},
+                        {'status': 'Pulling fs layer', 'id': 'layer2'},
+                        {'status': 'Downloading', 'id': 'layer2', 'progressDetail': {'current': 1048576, 'total': 2097152}},
+                        {'status': 'Pulling fs layer', 'id': 'layer3'}]:
+            progress.update(message)
+        self.assertTrue(progress.describe().startswith('app/b:latest: 1/3 layers, 1.0 of 2.0 MB'))
+        progress.update({'status': 'Download complete', 'id': 'layer2'})
+        progress.update({'status': 'Pull complete', 'id': 'layer2'})
+        self.assertTrue(progress.describe().startswith('app/b:latest: 2/3 layers, 2.0 of 2.0 MB'))
+
+    def test_progress_error(self):
+        with self.assertRaises(RuntimeError):
+            PullProgress('app/b:latest').update({'error': 'not found'})
+
+    def test_pull_image_logs_one_line(self):
+        self.client.pull.return_value = _stream({'status': 'Pulling from app/b', 'id': 'latest'},
+                                                {'status': 'Pull complete', 'id': 'layer1'},
+                                                {'status': 'Status: Downloaded newer image for app/b:latest'})
+        pull_image(self.client, 'app/b:latest')
+        self.client.pull.assert_called_once_with('app/b', 'latest', stream=True, insecure_registry=True)
+        self.assertEqual(len(self.client_output), 1)
+        self.assertTrue(self.client_output[0].startswith('Pulled app/b:latest: 1/1 layers'))
+
+    def test_pull_image_by_digest(self):
+        self.client.pull.return_value = _stream({'status': 'Pulling from app/d', 'id': 'sha256:abc'},
+                                                {'status': 'Pull complete', 'id': 'layer1'})
+        pull_image(self.client, 'app/d@sha256:abc')
+        self.client.pull.assert_called_once_with('app/d', 'sha256:abc', stream=True, insecure_registry=True)
+        self.assertTrue(self.client_output[0].startswith('Pulled app/d@sha256:abc: 1/1 layers'))
+
+    @patch('dusty.systems.docker.pull.pull_image')
+    @patch('dusty.systems.docker.pull.get_docker_client')
+    def test_pull_images_skips_present(self, fake_get_client, fake_pull_image):
+        fake_get_client.return_value = self.client
+        pull_images(['app/a', 'app/b', 'app/c:2'])
+        self.assertItemsEqual([call[0][1] for call in fake_pull_image.call_args_list], ['app/b:latest', 'app/c:2'])
+
+    @patch('dusty.systems.docker.pull.pull_image')
+    @patch('dusty.systems.docker.pull.get_docker_client')
+    def test_pull_images_nothing_to_pull(self, fake_get_client, fake_pull_image):
+        fake_get_client.return_value = self.client
+        pull_images(['app/a:1.0'])
+        self.assertFalse(fake_pull_image.called)
@@ -17,13 +17,15 @@ class TestTestingImages(DustyTestCase):
         app['test'] = {'once': ['npm install']}
         self.specs = {'apps': {'fake-app': app}}
 
+    @patch('dusty.systems.docker.testing_image.ensure_image_pulled')
     @patch('dusty.systems.docker.testing_image._testing_spec')
     @patch('dusty.systems.docker.testing_image.get_docker_client')
-    def test_ensure_base_image_image(self, fake_docker_client, fake_testing_spec, fake_expanded_libs):
+    def test_ensure_base_image_image(self, fake_docker_client, fake_testing_spec, fake_ensure_pulled, fake_expanded_libs):
         fake_docker_client = Mock()
         testing_spec = {'image': 'dusty/image'}
         fake_testing_spec.return_value = testing_spec
         self.assertEquals(_ensure_base_image(testing_spec), 'dusty/image')
+        fake_ensure_pulled.assert_called_once_with('dusty/image')
 
     @patch('dusty.systems.docker.testing_image._testing_spec')
     @patch('dusty.systems.docker.testing_image.get_docker_client')
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+
+from mock import Mock, patch
+
+from dusty.systems.nfs import bench
+from ....testcases import DustyTestCase
+
+class TestBench(DustyTestCase):
+    def setUp(self):
+        super(TestBench, self).setUp()
+        self.local_path = tempfile.mkdtemp()
+        self.repo = Mock(local_path=self.local_path, vm_path='/dusty_repos/github.com/org/a')
+        self.client = Mock()
+        self.client.exec_create.side_effect = lambda container_id, command: {'Id': command[2]}
+        self.client.exec_inspect.return_value = {'ExitCode': 0}
+        self.client.create_container.return_value = {'Id': 'bench-container'}
+
+    def tearDown(self):
+        super(TestBench, self).tearDown()
+        shutil.rmtree(self.local_path)
+
+    @patch('dusty.systems.nfs.bench.time.time')
+    def test_run_workloads_subtracts_exec_overhead(self, fake_time):
+        # Every exec of `true` takes 1s, every workload 2s
+        durations = {'true': 1.0}
+        clock = [0.0]
+        def exec_start(exec_id):
+            clock[0] += durations.get(exec_id, 2.0)
+        fake_time.side_effect = lambda: clock[0]
+        self.client.exec_start.side_effect = exec_start
+        results = bench.run_workloads(self.client, 'bench-container')
+        self.assertEqual([workload.name for workload, _ in results], [workload.name for workload in bench.WORKLOADS])
+        for workload, rate in results:
+            self.assertAlmostEqual(rate, workload.amount)
+
+    def test_run_workloads_raises_on_failure(self):
+        self.client.exec_inspect.return_value = {'ExitCode': 1}
+        self.client.exec_start.return_value = 'sh: seq: not found'
+        with self.assertRaises(RuntimeError):
+            bench.run_workloads(self.client, 'bench-container')
+
+    @patch('dusty.systems.nfs.bench.sync_repos')
+    @patch('dusty.systems.nfs.bench.ensure_image_pulled')
+    @patch('dusty.systems.nfs.bench.run_workloads')
+    @patch('dusty.systems.nfs.bench.get_docker_client')
+    def test_bench_repo_mount_cleans_up(self, fake_get_client, fake_run_workloads, fake_ensure_pulled, fake_sync_repos):
+        fake_get_client.return_value = self.client
+        def check_files(client, container_id):
+            bench_dir = os.path.join(self.local_path, bench.BENCH_DIR_NAME)
+            self.assertEqual(len(os.listdir(os.path.join(bench_dir, 'small'))), bench.SMALL_FILE_COUNT)
+            self.assertEqual(os.path.getsize(os.path.join(bench_dir, 'large')), bench.LARGE_FILE_MB * 1024 * 1024)
+            raise RuntimeError('workload failed')
+        fake_run_workloads.side_effect = check_files
+        with self.assertRaises(RuntimeError):
+            bench.bench_repo_mount(self.repo)
+        self.client.remove_container.assert_called_once_with(container='bench-container', force=True)
+        self.assertEqual(os.listdir(self.local_path), [])
@@ -1,5 +1,9 @@
+from subprocess import CalledProcessError
+
 from mock import Mock, patch
 
+from dusty import constants
+from dusty.config import save_config_value
 from dusty.systems.nfs import client
 from ....testcases import DustyTestCase
 
@@ -12,3 +16,91 @@ class TestNFSClient(DustyTestCase):
         fake_repo.vm_path = '/persist/repos/remote/path'
         expected_mount_args = '-t nfs -o async,udp,noatime 192.168.59.3:/repo/local/path /persist/repos/remote/path'
         self.assertEqual(expected_mount_args, client._nfs_mount_args_string(fake_repo))
+
+    @patch('dusty.systems.nfs.client.get_spec_nfs_mount_profiles')
+    def test_nfs_mount_profile(self, fake_spec_profiles):
+        fake_spec_profiles.return_value = {'github.com/app/a': 'cached', 'github.com/app/b': 'cached'}
+        save_config_value(constants.CONFIG_NFS_MOUNT_PROFILES_KEY, {'github.com/app/a': 'tcp'})
+        self.assertEqual(client.nfs_mount_profile(Mock(remote_path='github.com/app/a')), 'tcp')
+        self.assertEqual(client.nfs_mount_profile(Mock(remote_path='github.com/app/b')), 'cached')
+        self.assertEqual(client.nfs_mount_profile(Mock(remote_path='github.com/app/c')), 'default')
+
+def _fake_repo(name, local_path):
+    repo = Mock()
+    repo.short_name = name
+    repo.remote_path = 'github.com/org/{}'.format(name)
+    repo.local_path = local_path
+    repo.vm_path = '/dusty_repos/github.com/org/{}'.format(name)
+    return repo
+
+@patch('dusty.systems.nfs.client.vm_ssh_command', side_effect=lambda command: ['ssh', command])
+@patch('dusty.systems.nfs.client.get_host_ip', return_value='192.168.59.3')
+@patch('dusty.systems.nfs.client.check_output_demoted')
+class TestNFSClientRemount(DustyTestCase):
+    mount_table = ('192.168.59.3:/repos/a on /dusty_repos/github.com/org/a type nfs (rw,noatime,vers=3,proto=udp)\n'
+                   '192.168.59.3:/old/b on /dusty_repos/github.com/org/b type nfs (rw,noatime,vers=3,proto=udp)\n')
+
+    def setUp(self):
+        super(TestNFSClientRemount, self).setUp()
+        self.repos = [_fake_repo('a', '/repos/a'), _fake_repo('b', '/repos/b'), _fake_repo('c', '/repos/c')]
+
+    def test_get_vm_mounts(self, fake_check_output, fake_get_host_ip, fake_ssh):
+        fake_check_output.return_value = self.mount_table + 'dusty-unreadable /dusty_repos/github.com/org/a\n'
+        mounts, unreadable = client._get_vm_mounts(['/dusty_repos/github.com/org/a'])
+        self.assertEqual({target: mount.source for target, mount in mounts.iteritems()},
+                         {'/dusty_repos/github.com/org/a': '192.168.59.3:/repos/a',
+                          '/dusty_repos/github.com/org/b': '192.168.59.3:/old/b'})
+        self.assertIn('proto=udp', mounts['/dusty_repos/github.com/org/a'].options)
+        self.assertEqual(unreadable, set(['/dusty_repos/github.com/org/a']))
+
+    def test_remount_only_fixes_wrong_and_missing_mounts(self, fake_check_output, fake_get_host_ip, fake_ssh):
+        fake_check_output.side_effect = [self.mount_table, '']
+        client.remount_repos(self.repos)
+        self.assertEqual(fake_check_output.call_count, 2)
+        script = fake_check_output.call_args[0][0][1]
+        self.assertNotIn('/repos/a', script)
+        self.assertIn('sudo umount -l /dusty_repos/github.com/org/b\n', script)
+        self.assertIn('dusty_mount -t nfs -o async,udp,noatime 192.168.59.3:/repos/b /dusty_repos/github.com/org/b', script)
+        self.assertNotIn('sudo umount -l /dusty_repos/github.com/org/c', script)
+        self.assertIn('sudo mkdir -p /dusty_repos/github.com/org/c', script)
+
+    @patch('dusty.systems.nfs.client.get_all_repos')
+    def test_active_repos_to_mount(self, fake_get_all_repos, fake_check_output, fake_get_host_ip, fake_ssh):
+        for repo in self.repos:
+            repo.sync_method = constants.SYNC_METHOD_NFS
+        fake_get_all_repos.return_value = self.repos
+        fake_check_output.return_value = self.mount_table
+        self.assertEqual(client.active_repos_to_mount(), self.repos[1:])
+        self.assertEqual(fake_check_output.call_count, 1)
+
+    def test_remount_does_nothing_when_mounted(self, fake_check_output, fake_get_host_ip, fake_ssh):
+        fake_check_output.return_value = self.mount_table
+        client.remount_repos(self.repos[:1])
+        self.assertEqual(fake_check_output.call_count, 1)
+
+    def test_remount_when_profile_changed(self, fake_check_output, fake_get_host_ip, fake_ssh):
+        save_config_value(constants.CONFIG_NFS_MOUNT_PROFILES_KEY, {'github.com/org/a': 'read-mostly'})
+        fake_check_output.side_effect = [self.mount_table, '']
+        client.remount_repos(self.repos[:1])
+        script = fake_check_output.call_args[0][0][1]
+        self.assertIn('sudo umount -l /dusty_repos/github.com/org/a', script)
+        self.assertIn('-o async,tcp,noatime,rsize=65536,wsize=65536,actimeo=60,nocto 192.168.59.3:/repos/a', script)
+
+    def test_remount_does_nothing_when_mounted_with_profile(self, fake_check_output, fake_get_host_ip, fake_ssh):
+        save_config_value(constants.CONFIG_NFS_MOUNT_PROFILES_KEY, {'github.com/org/a': 'read-mostly'})
+        fake_check_output.return_value = ('192.168.59.3:/repos/a on /dusty_repos/github.com/org/a type nfs '
+                                          '(rw,nocto,noatime,vers=3,rsize=65536,wsize=65536,acregmin=60,'
+                                          'acregmax=60,acdirmin=60,acdirmax=60,proto=tcp)\n')
+        client.remount_repos(self.repos[:1])
+        self.assertEqual(fake_check_output.call_count, 1)
+
+    def test_remount_unreadable_mount(self, fake_check_output, fake_get_host_ip, fake_ssh):
+        fake_check_output.side_effect = [self.mount_table + 'dusty-unreadable /dusty_repos/github.com/org/a\n', '']
+        client.remount_repos(self.repos[:1])
+        self.assertIn('sudo umount -l /dusty_repos/github.com/org/a', fake_check_output.call_args[0][0][1])
+
+    def test_remount_failure(self, fake_check_output, fake_get_host_ip, fake_ssh):
+        fake_check_output.side_effect = [self.mount_table, CalledProcessError(1, 'ssh', 'mount: permission denied')]
+        with self.assertRaises(RuntimeError):
+            client.remount_repos(self.repos)
+        self.assertIn('mount: permission denied', self.client_output)
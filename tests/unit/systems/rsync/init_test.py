@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+from dusty.systems import rsync
+from ....testcases import DustyTestCase
+
+@patch('dusty.systems.rsync.check_and_log_output_and_error')
+@patch('dusty.systems.rsync.vm_ssh_options', return_value=['-i', '/key'])
+@patch('dusty.systems.rsync.get_docker_vm_ip', return_value='192.168.99.100')
+class TestRsync(DustyTestCase):
+    def test_sync_dir_creates_it_in_the_same_invocation(self, fake_get_ip, fake_ssh_options, fake_check_output):
+        local_dir = tempfile.mkdtemp()
+        try:
+            rsync.sync_local_path_to_vm(local_dir, '/persist/some dir')
+        finally:
+            os.rmdir(local_dir)
+        self.assertEqual(fake_check_output.call_count, 1)
+        command = fake_check_output.call_args[0][0]
+        self.assertEqual(command[command.index('--rsync-path') + 1],
+                         "sudo mkdir -p '/persist/some dir' && sudo chown docker '/persist/some dir' && sudo rsync")
+        self.assertEqual(command[-2:], ['{}/'.format(local_dir), 'docker@192.168.99.100:/persist/some dir'])
+
+    def test_sync_keeping_ignored_files(self, fake_get_ip, fake_ssh_options, fake_check_output):
+        local_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(local_dir, '.gitignore'), 'w') as f:
+                f.write('node_modules/\n')
+            rsync.sync_local_path_to_vm(local_dir, '/persist/repo', keep_ignored=True)
+            rsync.sync_local_dirs_to_vm(local_dir, '/persist/repo', ['src'], keep_ignored=True)
+        finally:
+            shutil.rmtree(local_dir)
+        full_sync, dirs_sync = [args[0][0] for args in fake_check_output.call_args_list]
+        for command in full_sync, dirs_sync:
+            self.assertIn('--del', command)
+            self.assertEqual(command[command.index('--filter') + 1], ':- .gitignore')
+            self.assertIn('merge,- {}/.gitignore'.format(local_dir), command)
+        self.assertEqual(full_sync[-2:], ['{}/'.format(local_dir), 'docker@192.168.99.100:/persist/repo'])
+
+    def test_sync_deletes_ignored_files_by_default(self, fake_get_ip, fake_ssh_options, fake_check_output):
+        rsync.sync_local_path_to_vm('/etc/hosts', '/persist/assets/hosts')
+        self.assertNotIn('--filter', fake_check_output.call_args[0][0])
+
+    def test_sync_file_creates_its_parent(self, fake_get_ip, fake_ssh_options, fake_check_output):
+        rsync.sync_local_path_to_vm('/etc/hosts', '/persist/assets/hosts')
+        command = fake_check_output.call_args[0][0]
+        self.assertTrue(command[command.index('--rsync-path') + 1].startswith('sudo mkdir -p /persist/assets &&'))
+
+    def test_sync_from_vm_creates_nothing(self, fake_get_ip, fake_ssh_options, fake_check_output):
+        rsync.sync_local_path_from_vm('/tmp/backup', '/persist')
+        command = fake_check_output.call_args[0][0]
+        self.assertEqual(command[command.index('--rsync-path') + 1], 'sudo rsync')
+
+    def test_connection_params_are_cached(self, fake_get_ip, fake_ssh_options, fake_check_output):
+        rsync.sync_local_path_to_vm('/etc/hosts', '/persist/assets/hosts')
+        rsync.sync_local_path_to_vm('/etc/hosts', '/persist/assets/hosts')
+        self.assertEqual(fake_ssh_options.call_count, 1)
+        self.assertEqual(fake_check_output.call_args[0][0][2], 'ssh -i /key')
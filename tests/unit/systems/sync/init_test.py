@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+
+from mock import Mock, patch
+
+from dusty import constants
+from dusty.systems import sync
+from dusty.systems.sync import dirs_to_sync, sync_repos, stop_syncing_repos
+from ....testcases import DustyTestCase
+
+def _fake_repo(name, sync_method=constants.SYNC_METHOD_RSYNC):
+    repo = Mock()
+    repo.remote_path = 'github.com/org/{}'.format(name)
+    repo.short_name = name
+    repo.local_path = '/repos/{}'.format(name)
+    repo.sync_method = sync_method
+    return repo
+
+class TestDirsToSync(DustyTestCase):
+    def setUp(self):
+        super(TestDirsToSync, self).setUp()
+        self.root = tempfile.mkdtemp()
+        for directory in ['a/b/c', 'a/d', 'e', '.git/objects']:
+            os.makedirs(os.path.join(self.root, directory))
+
+    def tearDown(self):
+        super(TestDirsToSync, self).tearDown()
+        shutil.rmtree(self.root)
+
+    def _paths(self, *rel_paths):
+        return [os.path.join(self.root, rel_path) for rel_path in rel_paths]
+
+    def test_changed_files_sync_their_directories(self):
+        self.assertEqual(dirs_to_sync(self.root, self._paths('a/d/file.py', 'e/other.py')), ['a/d', 'e'])
+
+    def test_nested_directories_are_covered_by_parents(self):
+        self.assertEqual(dirs_to_sync(self.root, self._paths('a/b/c/file.py', 'a/b/file.py', 'a')), ['a'])
+
+    def test_deleted_paths_sync_nearest_existing_parent(self):
+        self.assertEqual(dirs_to_sync(self.root, self._paths('a/b/gone/deeper/file.py')), ['a/b'])
+
+    def test_git_changes_are_ignored(self):
+        self.assertEqual(dirs_to_sync(self.root, self._paths('.git/objects/ab', '.git/index')), [])
+
+    def test_change_at_root_syncs_everything(self):
+        self.assertIsNone(dirs_to_sync(self.root, self._paths('a/d/file.py', 'setup.py')))
+
+    @patch('dusty.systems.sync.MAX_DIRS_PER_BATCH', 1)
+    def test_too_many_dirs_syncs_everything(self):
+        self.assertIsNone(dirs_to_sync(self.root, self._paths('a/d/file.py', 'e/other.py')))
+
+@patch('dusty.systems.sync.RepoSyncer')
+class TestSyncRepos(DustyTestCase):
+    def tearDown(self):
+        super(TestSyncRepos, self).tearDown()
+        stop_syncing_repos()
+
+    def test_only_rsync_repos_are_synced(self, fake_syncer_class):
+        sync_repos([_fake_repo('a'), _fake_repo('b', sync_method=constants.SYNC_METHOD_NFS)])
+        fake_syncer_class.assert_called_once_with(_fake_repo_matching('a'))
+        syncer = fake_syncer_class.return_value
+        syncer.watch.assert_called_once_with()
+        syncer.sync_all.assert_called_once_with()
+        syncer.start.assert_called_once_with()
+
+    def test_existing_syncer_is_resynced_not_restarted(self, fake_syncer_class):
+        fake_syncer_class.return_value.local_path = '/repos/a'
+        sync_repos([_fake_repo('a')])
+        sync_repos([_fake_repo('a')])
+        syncer = fake_syncer_class.return_value
+        self.assertEqual(fake_syncer_class.call_count, 1)
+        self.assertEqual(syncer.sync_all.call_count, 2)
+        syncer.start.assert_called_once_with()
+
+    def test_syncer_restarted_when_local_path_changes(self, fake_syncer_class):
+        fake_syncer_class.return_value.local_path = '/somewhere/else'
+        sync_repos([_fake_repo('a')])
+        sync_repos([_fake_repo('a')])
+        self.assertEqual(fake_syncer_class.call_count, 2)
+        fake_syncer_class.return_value.stop.assert_called_once_with()
+
+class _fake_repo_matching(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return other.short_name == self.name
+
+@patch('dusty.systems.sync.sync_local_dirs_to_vm')
+@patch('dusty.systems.sync.sync_local_path_to_vm')
+class TestRepoSyncer(DustyTestCase):
+    def setUp(self):
+        super(TestRepoSyncer, self).setUp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'src'))
+        self.repo = _fake_repo('a')
+        self.repo.local_path = self.root
+        self.repo.vm_path = '/persist/dusty_synced_repos/github.com/org/a'
+
+    def tearDown(self):
+        super(TestRepoSyncer, self).tearDown()
+        shutil.rmtree(self.root)
+
+    def test_sync_changes_syncs_changed_dirs(self, fake_sync_path, fake_sync_dirs):
+        sync.RepoSyncer(self.repo).sync_changes([os.path.join(self.root, 'src', 'file.py')])
+        fake_sync_dirs.assert_called_once_with(self.root, self.repo.vm_path, ['src'], keep_ignored=True)
+        self.assertFalse(fake_sync_path.called)
+
+    def test_sync_changes_falls_back_to_full_sync(self, fake_sync_path, fake_sync_dirs):
+        sync.RepoSyncer(self.repo).sync_changes([os.path.join(self.root, 'file.py')])
+        fake_sync_path.assert_called_once_with(self.root, self.repo.vm_path, keep_ignored=True)
+        self.assertFalse(fake_sync_dirs.called)
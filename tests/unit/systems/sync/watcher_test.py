@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+
+from dusty.systems.sync.watcher import PollingWatcher, changed_paths, snapshot
+from ....testcases import DustyTestCase
+
+class TestPollingWatcher(DustyTestCase):
+    def setUp(self):
+        super(TestPollingWatcher, self).setUp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, '.git'))
+        self._write('kept.py', 'kept')
+        self._write('changed.py', 'before')
+        self._write('removed.py', 'removed')
+
+    def tearDown(self):
+        super(TestPollingWatcher, self).tearDown()
+        shutil.rmtree(self.root)
+
+    def _write(self, rel_path, contents):
+        with open(os.path.join(self.root, rel_path), 'w') as f:
+            f.write(contents)
+
+    def test_snapshot_skips_git(self):
+        self._write('.git/index', 'index')
+        self.assertNotIn(os.path.join(self.root, '.git'), snapshot(self.root))
+        self.assertNotIn(os.path.join(self.root, '.git', 'index'), snapshot(self.root))
+
+    def test_changed_paths(self):
+        old = {'a': (1, 1), 'b': (1, 1), 'c': (1, 1)}
+        new = {'a': (1, 1), 'b': (2, 1), 'd': (1, 1)}
+        self.assertEqual(changed_paths(old, new), set(['b', 'c', 'd']))
+
+    def test_poll_reports_changes(self):
+        changes = []
+        watcher = PollingWatcher(self.root, changes.append)
+        watcher._snapshot = snapshot(self.root)
+        self._write('changed.py', 'after, and longer')
+        os.remove(os.path.join(self.root, 'removed.py'))
+        self._write('added.py', 'added')
+        watcher.poll()
+        self.assertItemsEqual(changes, [os.path.join(self.root, name)
+                                        for name in ['changed.py', 'removed.py', 'added.py']])
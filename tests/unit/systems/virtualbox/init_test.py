@@ -1,6 +1,15 @@
+import os
+import shutil
+import stat
+import tempfile
+
 from mock import patch, call
 
-from dusty.systems.virtualbox import get_host_ip
+from dusty import constants
+from dusty.memoize import reset_memoize_cache, set_scope_key, SCOPE_VM
+from dusty.systems.virtualbox import (get_host_ip, vm_ssh_command, close_vm_ssh_connections, _start_docker_vm,
+                                      enable_vm_state_check, get_docker_vm_ip,
+                                      initialize_docker_vm)
 from ....testcases import DustyTestCase
 
 @patch('dusty.systems.virtualbox.get_vm_hostonly_adapter')
@@ -69,3 +78,101 @@ class TestVirtualbox(DustyTestCase):
         fake_get_adapter.return_value = 'vboxnet1'
         with self.assertRaises(RuntimeError):
             get_host_ip()
+
+@patch('dusty.systems.virtualbox.os.chown')
+@patch('dusty.systems.virtualbox._ssh_uid', side_effect=lambda demote: 501 if demote else 0)
+@patch('dusty.systems.virtualbox.get_docker_vm_ip', return_value='192.168.99.100')
+class TestVMSSH(DustyTestCase):
+    def setUp(self):
+        super(TestVMSSH, self).setUp()
+        self.temp_run_dir = tempfile.mkdtemp()
+        self.old_control_dir = constants.VM_SSH_CONTROL_DIR
+        constants.VM_SSH_CONTROL_DIR = os.path.join(self.temp_run_dir, 'ssh')
+
+    def tearDown(self):
+        super(TestVMSSH, self).tearDown()
+        constants.VM_SSH_CONTROL_DIR = self.old_control_dir
+        shutil.rmtree(self.temp_run_dir)
+
+    def test_vm_ssh_command_uses_control_socket(self, fake_get_ip, fake_uid, fake_chown):
+        command = vm_ssh_command('ls /')
+        self.assertEqual(command[0], 'ssh')
+        self.assertEqual(command[-2:], ['docker@192.168.99.100', 'ls /'])
+        self.assertIn('ControlPath={}/501/%r@%h:%p'.format(constants.VM_SSH_CONTROL_DIR), command)
+        self.assertIn('ControlMaster=auto', command)
+        self.assertNotIn('LogLevel=quiet', command)
+
+    def test_control_dirs_are_per_user_and_private(self, fake_get_ip, fake_uid, fake_chown):
+        vm_ssh_command('ls /')
+        self.assertIn('ControlPath={}/0/%r@%h:%p'.format(constants.VM_SSH_CONTROL_DIR), vm_ssh_command('ls /', demote=False))
+        for uid in (0, 501):
+            control_dir = os.path.join(constants.VM_SSH_CONTROL_DIR, str(uid))
+            self.assertEqual(stat.S_IMODE(os.stat(control_dir).st_mode), 0700)
+        fake_chown.assert_any_call(os.path.join(constants.VM_SSH_CONTROL_DIR, '501'), 501, -1)
+
+    def test_vm_ssh_command_reuses_connection_params(self, fake_get_ip, fake_uid, fake_chown):
+        vm_ssh_command('ls /')
+        self.assertEqual(vm_ssh_command('true')[-1], 'true')
+        self.assertEqual(fake_get_ip.call_count, 1)
+
+    @patch('dusty.systems.virtualbox.call')
+    def test_close_vm_ssh_connections_as_their_owners(self, fake_call, fake_get_ip, fake_uid, fake_chown):
+        vm_ssh_command('ls /')
+        vm_ssh_command('ls /', demote=False)
+        for uid in ('0', '501'):
+            open(os.path.join(constants.VM_SSH_CONTROL_DIR, uid, 'docker@192.168.99.100:22'), 'w').close()
+        close_vm_ssh_connections()
+        self.assertEqual(fake_call.call_count, 2)
+        for uid, demote in (('0', False), ('501', True)):
+            control_path = os.path.join(constants.VM_SSH_CONTROL_DIR, uid, 'docker@192.168.99.100:22')
+            fake_call.assert_any_call(['ssh', '-o', 'ControlPath={}'.format(control_path), '-O', 'exit', 'docker@dusty'],
+                                      demote=demote, redirect_stderr=True)
+
+    @patch('dusty.systems.virtualbox.close_vm_ssh_connections')
+    @patch('dusty.systems.virtualbox.check_and_log_output_and_error_demoted')
+    @patch('dusty.systems.virtualbox._apply_nat_net_less_greedy_subnet')
+    @patch('dusty.systems.virtualbox._apply_nat_dns_host_resolver')
+    @patch('dusty.systems.virtualbox.docker_vm_is_running', return_value=False)
+    def test_starting_vm_reconnects(self, fake_is_running, fake_dns, fake_subnet, fake_check, fake_close, fake_get_ip, fake_uid, fake_chown):
+        vm_ssh_command('ls /')
+        _start_docker_vm()
+        vm_ssh_command('ls /')
+        fake_close.assert_called_once_with()
+        self.assertEqual(fake_get_ip.call_count, 2)
+
+@patch('dusty.systems.virtualbox.ensure_docker_vm_is_started')
+@patch('dusty.systems.virtualbox._run_command_on_vm')
+class TestInitializeVM(DustyTestCase):
+    def test_vm_is_prepared_in_one_command(self, fake_run_command, fake_ensure_started):
+        initialize_docker_vm()
+        self.assertEqual(fake_run_command.call_count, 1)
+        script = fake_run_command.call_args[0][0].splitlines()
+        self.assertEqual(script[0], 'set -e')
+        self.assertIn('which rsync || tce-load -wi rsync || tce-load -wi rsync', script)
+        self.assertIn('if [ ! -d /persist ]; then sudo ln -s /mnt/sda1/persist /persist; fi', script)
+        self.assertIn('if [ ! -d /persist/dusty_assets ]; then sudo mkdir /persist/dusty_assets; fi', script)
+
+@patch('dusty.systems.virtualbox.close_vm_ssh_connections')
+@patch('dusty.systems.virtualbox._get_vm_config')
+@patch('dusty.systems.virtualbox.check_output_demoted')
+class TestVMStateCheck(DustyTestCase):
+    def setUp(self):
+        super(TestVMStateCheck, self).setUp()
+        enable_vm_state_check()
+
+    def tearDown(self):
+        super(TestVMStateCheck, self).tearDown()
+        set_scope_key(SCOPE_VM, None)
+
+    def test_vm_restarted_outside_dusty(self, fake_check_output, fake_vm_config, fake_close):
+        fake_vm_config.return_value = ['name="dusty"', 'VMState="running"', 'VMStateChangeTime="2015-10-01T10:00:00.000000000"']
+        fake_check_output.return_value = '192.168.99.100\n'
+        get_docker_vm_ip()
+        reset_memoize_cache()
+        fake_check_output.return_value = '192.168.99.101\n'
+        self.assertEqual(get_docker_vm_ip(), '192.168.99.100')
+        self.assertFalse(fake_close.called)
+        reset_memoize_cache()
+        fake_vm_config.return_value = ['name="dusty"', 'VMState="running"', 'VMStateChangeTime="2015-10-01T11:00:00.000000000"']
+        self.assertEqual(get_docker_vm_ip(), '192.168.99.101')
+        fake_close.assert_called_once_with()
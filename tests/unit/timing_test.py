@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+from ..testcases import DustyTestCase
+from dusty import constants
+from dusty.context import RequestContext, bound_context
+from dusty.commands.dump import _format_profile_history
+from dusty.parallel import TaskGraph, parallel_task_queue
+from dusty.subprocess import check_output
+from dusty.timing import (Profile, current_phase, profiled_phase, format_profile,
+                          read_profile_history, save_profile, PROFILE_HISTORY_LENGTH)
+
+class TestTiming(DustyTestCase):
+    def setUp(self):
+        super(TestTiming, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.old_history_path = constants.PROFILE_HISTORY_PATH
+        constants.PROFILE_HISTORY_PATH = os.path.join(self.temp_dir, 'profile_history.json')
+        self.context = RequestContext()
+        self.context.profile = self.profile = Profile('up')
+
+    def tearDown(self):
+        super(TestTiming, self).tearDown()
+        constants.PROFILE_HISTORY_PATH = self.old_history_path
+        shutil.rmtree(self.temp_dir)
+
+    def test_phases_and_subprocesses_are_recorded(self):
+        with bound_context(self.context):
+            with profiled_phase('check'):
+                check_output(['true'], demote=False)
+            check_output(['echo', 'hi'], demote=False)
+        self.assertItemsEqual(self.profile.phases.keys(), ['check'])
+        self.assertEqual([(subprocess['phase'], subprocess['command']) for subprocess in self.profile.subprocesses],
+                         [('check', 'true'), (None, 'echo hi')])
+
+    def test_nothing_is_recorded_without_a_profile(self):
+        with profiled_phase('check'):
+            check_output(['true'], demote=False)
+        self.assertEqual(self.profile.subprocesses, [])
+
+    def test_task_graph_steps_are_phases_of_their_worker_tasks(self):
+        def pull():
+            with parallel_task_queue() as queue:
+                queue.enqueue_task(check_output, ['true'], demote=False)
+        task_graph = TaskGraph()
+        task_graph.add_task('pull', pull)
+        task_graph.add_task('after', lambda: None, depends=['pull'])
+        with bound_context(self.context):
+            task_graph.execute()
+        self.assertItemsEqual(self.profile.phases.keys(), ['pull', 'after'])
+        self.assertEqual(self.profile.subprocesses[0]['phase'], 'pull')
+        self.assertIsNone(current_phase())
+
+    def test_history_is_trimmed(self):
+        for _ in range(PROFILE_HISTORY_LENGTH + 2):
+            save_profile(self.profile)
+        self.assertEqual(len(read_profile_history()), PROFILE_HISTORY_LENGTH)
+
+    def test_format_profile(self):
+        self.profile.record_phase('pull_repos', 0, 2)
+        self.profile.record_phase('init_vm', 0, 1)
+        self.profile.record_subprocess('pull_repos', ['git', 'pull'], 0, 1.5)
+        self.profile.finish(succeeded=True)
+        lines = format_profile(self.profile.to_dict()).splitlines()
+        self.assertEqual(lines[1:], ['  pull_repos: 2.00s', '      1.50s  git pull', '  init_vm: 1.00s'])
+
+    def test_format_profile_history(self):
+        self.profile.record_phase('pull_repos', 0, 2)
+        self.profile.finish(succeeded=False)
+        second = Profile('up')
+        second.record_phase('init_vm', 0, 1)
+        second.finish(succeeded=True)
+        table = _format_profile_history([self.profile.to_dict(), second.to_dict()])
+        self.assertIn('pull_repos', table)
+        self.assertIn('(failed)', table)
+        self.assertEqual(len(table.splitlines()), 7)
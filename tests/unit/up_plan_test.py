@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+from ..testcases import DustyTestCase
+from dusty import constants
+from dusty.up_plan import UpPlan, get_up_plan, record_applied_plan, service_fingerprints
+
+class TestUpPlan(DustyTestCase):
+    def setUp(self):
+        super(TestUpPlan, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.temp_state_path = os.path.join(self.temp_dir, 'compose', 'up_state.json')
+        self.old_state_path = constants.UP_STATE_PATH
+        constants.UP_STATE_PATH = self.temp_state_path
+        self.compose_config = {'app-a': {'image': 'app', 'links': ['app-b', 'mongo:db']},
+                               'app-b': {'image': 'app', 'links': ['mongo']},
+                               'mongo': {'image': 'mongo'},
+                               constants.DUSTY_NGINX_NAME: {'image': 'nginx'}}
+        self.command_files = {'app-a': 'run a', 'app-b': 'run b'}
+        self.nginx_config = {'http': '', 'stream': ''}
+
+    def tearDown(self):
+        super(TestUpPlan, self).tearDown()
+        constants.UP_STATE_PATH = self.old_state_path
+        shutil.rmtree(self.temp_dir)
+
+    def _apply_initial_plan(self):
+        record_applied_plan(get_up_plan(self.compose_config, self.command_files, self.nginx_config))
+
+    def test_no_previous_state_is_full(self):
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config)
+        self.assertTrue(plan.is_full)
+        self.assertIsNone(plan.services_to_stop)
+
+    def test_nothing_changed(self):
+        self._apply_initial_plan()
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config)
+        self.assertFalse(plan.has_changes)
+        self.assertEqual(plan.services_to_stop, [])
+
+    def test_command_file_change_recreates_app_and_linking_apps(self):
+        self._apply_initial_plan()
+        self.command_files['app-b'] = 'run b differently'
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config)
+        self.assertEqual(plan.to_recreate, {'app-b': 'config changed', 'app-a': 'links to app-b'})
+        self.assertEqual(plan.unchanged, set(['mongo', constants.DUSTY_NGINX_NAME]))
+
+    def test_aliased_link_is_followed(self):
+        self._apply_initial_plan()
+        self.compose_config['mongo']['environment'] = {'A': 'b'}
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config)
+        self.assertItemsEqual(plan.to_recreate.keys(), ['mongo', 'app-a', 'app-b'])
+
+    def test_nginx_config_change_recreates_nginx(self):
+        self._apply_initial_plan()
+        plan = get_up_plan(self.compose_config, self.command_files, {'http': 'server {}', 'stream': ''})
+        self.assertEqual(plan.to_recreate, {constants.DUSTY_NGINX_NAME: 'config changed'})
+
+    def test_image_id_change_recreates_service(self):
+        record_applied_plan(get_up_plan(self.compose_config, self.command_files, self.nginx_config,
+                                        image_ids={'mongo': 'sha256:1'}))
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config, image_ids={'mongo': 'sha256:2'})
+        self.assertItemsEqual(plan.to_recreate.keys(), ['mongo', 'app-a', 'app-b'])
+
+    def test_repo_state_change_recreates_app(self):
+        repo_states = {'app-a': [['github.com/app/a', '/managed/a', 'nfs', 'default']]}
+        record_applied_plan(get_up_plan(self.compose_config, self.command_files, self.nginx_config, repo_states=repo_states))
+        repo_states = {'app-a': [['github.com/app/a', '/override/a', 'nfs', 'default']]}
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config, repo_states=repo_states)
+        self.assertEqual(plan.to_recreate, {'app-a': 'config changed'})
+
+    def test_forced_recreates(self):
+        self._apply_initial_plan()
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config,
+                           forced_recreates={'app-b': 'repo b will be remounted', 'app-c': 'not running'})
+        self.assertEqual(plan.to_recreate, {'app-b': 'repo b will be remounted', 'app-a': 'links to app-b'})
+
+    def test_added_and_removed_services(self):
+        self._apply_initial_plan()
+        del self.compose_config['mongo']
+        self.compose_config['redis'] = {'image': 'redis'}
+        self.compose_config['app-b']['links'] = ['redis']
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config)
+        self.assertEqual(plan.to_create, set(['redis']))
+        self.assertEqual(plan.to_remove, set(['mongo']))
+        self.assertEqual(plan.services_to_stop, ['app-a', 'app-b', 'mongo'])
+
+    def test_restarted_services_are_replanned(self):
+        self._apply_initial_plan()
+        self.command_files['app-b'] = 'run b differently'
+        record_applied_plan(get_up_plan(self.compose_config, self.command_files, self.nginx_config), recreated=False)
+        plan = get_up_plan(self.compose_config, self.command_files, self.nginx_config)
+        self.assertItemsEqual(plan.to_recreate.keys(), ['app-a', 'app-b'])
+
+    def test_describe(self):
+        plan = UpPlan({'a': '1', 'b': '2', 'c': '3'}, {'a': '1', 'b': '1', 'c': '3', 'd': '1'}, {'c': set(['b'])})
+        self.assertEqual(plan.describe(), 'Planned container changes:\n'
+                                          '  Recreate: b (config changed), c (links to b)\n'
+                                          '  Remove: d\n'
+                                          '  Unchanged: a')
+
+class TestStopPlannedServices(DustyTestCase):
+    @patch('dusty.commands.run.stop_apps_or_services')
+    @patch('os.path.exists', return_value=True)
+    def test_only_replaced_services_are_stopped(self, fake_exists, fake_stop):
+        from dusty.commands.run import _stop_planned_services
+        plan = UpPlan({'a': '1', 'b': '2'}, {'a': '1', 'b': '1', 'c': '1'}, {})
+        self.assertTrue(_stop_planned_services(plan, True))
+        fake_stop.assert_called_once_with(['b', 'c'], rm_containers=True)
+
+    @patch('dusty.commands.run.stop_apps_or_services')
+    @patch('os.path.exists', return_value=True)
+    def test_unchanged_plan_stops_nothing(self, fake_exists, fake_stop):
+        from dusty.commands.run import _stop_planned_services
+        plan = UpPlan({'a': '1'}, {'a': '1'}, {})
+        self.assertTrue(_stop_planned_services(plan, True))
+        self.assertFalse(fake_stop.called)